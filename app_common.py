@@ -0,0 +1,853 @@
+# What the pages share: the engine, caches, schema migrations and the
+# helpers several pages call. Imported once per process, on the first
+# run of app.py; pandas and each page's own modules are left to the pages.
+
+import streamlit as st
+import re
+import json
+import time
+from sqlalchemy import create_engine, text
+from datetime import datetime
+
+import bank_import
+import exporter
+import migrations
+import promotion
+import snapshot
+import fee_schedule
+from query_cache import QueryCache
+from query_log import QUERY_LOG
+
+# =========================================================
+# DATABASE CONNECTION
+# =========================================================
+DATABASE_URL = st.secrets["DATABASE_URL"]
+
+
+@st.cache_resource
+def get_query_cache():
+    # One cache per process, shared by every user session.
+    return QueryCache()
+
+
+@st.cache_resource
+def get_engine(database_url):
+    # One engine, and so one connection pool, per process. Made on every
+    # rerun it opened new connections each time a widget changed. Every
+    # statement is timed; see the Query Performance page.
+    engine = create_engine(database_url, pool_pre_ping=True)
+    get_query_cache().watch(engine)
+    QUERY_LOG.watch(engine)
+    return engine
+
+
+engine = get_engine(DATABASE_URL)
+query_cache = get_query_cache()
+
+
+def run_query(query, params=None, fetch=False, cache=True):
+    # cache=False for reads whose parameters must not be kept in memory,
+    # such as credentials.
+    if fetch and cache:
+        hit, rows = query_cache.get(query, params)
+        if hit:
+            return rows
+
+    try:
+        version = query_cache.version
+
+        with engine.begin() as conn:
+            result = conn.execute(text(query), params or {})
+            if fetch:
+                rows = result.fetchall()
+
+        if fetch:
+            if cache:
+                query_cache.put(query, params, rows, version)
+            return rows
+    except Exception as e:
+        st.error(f"Database error: {e}")
+        return None
+
+
+@st.cache_data
+def table_columns(table):
+    # Columns only change when bootstrap() migrates, before any page runs,
+    # so information_schema is read once per table per process.
+    return exporter.table_columns(engine, table)
+
+
+#def run_query(query, params=None, fetch=False):
+#    with engine.begin() as conn:
+#        result = conn.execute(text(query), params or {})
+#        if fetch:
+#            return result.fetchall()
+
+
+# =========================================================
+# RUNNING BALANCES
+# =========================================================
+# student_balances holds SUM(payments.balance) per student (and
+# student_session_balances per student + session). A trigger on payments
+# keeps both current, so debt reads are point lookups instead of scans.
+BALANCE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS student_balances (
+        student_id TEXT PRIMARY KEY,
+        student_name TEXT,
+        balance DOUBLE PRECISION NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS student_session_balances (
+        student_id TEXT NOT NULL,
+        session TEXT NOT NULL,
+        balance DOUBLE PRECISION NOT NULL DEFAULT 0,
+        PRIMARY KEY (student_id, session)
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_student_balances_debt
+    ON student_balances (balance)
+    WHERE balance > 0
+    """,
+    """
+    CREATE OR REPLACE FUNCTION maintain_student_balances()
+    RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE student_balances
+            SET balance = balance - COALESCE(OLD.balance, 0)
+            WHERE student_id = OLD.student_id;
+
+            UPDATE student_session_balances
+            SET balance = balance - COALESCE(OLD.balance, 0)
+            WHERE student_id = OLD.student_id
+            AND session = OLD.session;
+        END IF;
+
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.student_id IS NOT NULL THEN
+            INSERT INTO student_balances (student_id, student_name, balance)
+            VALUES (NEW.student_id, NEW.student_name, COALESCE(NEW.balance, 0))
+            ON CONFLICT (student_id) DO UPDATE
+            SET balance = student_balances.balance + EXCLUDED.balance,
+                student_name = COALESCE(EXCLUDED.student_name,
+                                        student_balances.student_name);
+
+            IF NEW.session IS NOT NULL THEN
+                INSERT INTO student_session_balances (student_id, session, balance)
+                VALUES (NEW.student_id, NEW.session, COALESCE(NEW.balance, 0))
+                ON CONFLICT (student_id, session) DO UPDATE
+                SET balance = student_session_balances.balance + EXCLUDED.balance;
+            END IF;
+        END IF;
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS payments_balance_trigger ON payments",
+    """
+    CREATE TRIGGER payments_balance_trigger
+    AFTER INSERT OR UPDATE OR DELETE ON payments
+    FOR EACH ROW EXECUTE FUNCTION maintain_student_balances()
+    """,
+]
+
+REBUILD_BALANCES = [
+    # Block payment writes while the totals are regenerated.
+    "LOCK TABLE payments IN SHARE MODE",
+    "DELETE FROM student_balances",
+    """
+    INSERT INTO student_balances (student_id, student_name, balance)
+    SELECT student_id, MAX(student_name), COALESCE(SUM(balance), 0)
+    FROM payments
+    WHERE student_id IS NOT NULL
+    GROUP BY student_id
+    """,
+    "DELETE FROM student_session_balances",
+    """
+    INSERT INTO student_session_balances (student_id, session, balance)
+    SELECT student_id, session, COALESCE(SUM(balance), 0)
+    FROM payments
+    WHERE student_id IS NOT NULL
+    AND session IS NOT NULL
+    GROUP BY student_id, session
+    """,
+]
+
+
+def rebuild_balances():
+    with engine.begin() as conn:
+        for statement in REBUILD_BALANCES:
+            conn.execute(text(statement))
+
+
+# =========================================================
+# REVENUE ROLLUPS
+# =========================================================
+# revenue_rollup holds payment count and SUM(amount_paid) per session,
+# term, section and day, and kpi_counters the headline totals. Triggers
+# on payments and students keep both current, so the dashboard reads a
+# few pre-aggregated rows. A payment counts under its student's section;
+# changing the section moves that student's payments across. Keys are
+# '' rather than NULL so they can be upserted.
+ROLLUP_SCHEMA = [
+    # Payments recorded before this column existed share its first day.
+    """
+    ALTER TABLE payments
+    ADD COLUMN IF NOT EXISTS created_at TIMESTAMP NOT NULL DEFAULT now()
+    """,
+    # Section changes re-aggregate one student's payments.
+    """
+    CREATE INDEX IF NOT EXISTS idx_payments_student_id
+    ON payments (student_id)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS revenue_rollup (
+        session TEXT NOT NULL,
+        term TEXT NOT NULL,
+        section TEXT NOT NULL,
+        day DATE NOT NULL,
+        payments BIGINT NOT NULL DEFAULT 0,
+        total_paid DOUBLE PRECISION NOT NULL DEFAULT 0,
+        PRIMARY KEY (session, term, section, day)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS kpi_counters (
+        name TEXT PRIMARY KEY,
+        value DOUBLE PRECISION NOT NULL DEFAULT 0
+    )
+    """,
+    # Statement triggers see every changed row at once through the
+    # transition tables, so a bulk insert touches each bucket once. Each
+    # changed row contributes sign -1 (old_rows) or +1 (new_rows).
+    """
+    CREATE OR REPLACE FUNCTION maintain_revenue_rollup()
+    RETURNS trigger AS $$
+    DECLARE
+        changes TEXT;
+    BEGIN
+        changes := CASE TG_OP
+            WHEN 'INSERT' THEN 'SELECT n.*, 1 AS sign FROM new_rows n'
+            WHEN 'DELETE' THEN 'SELECT o.*, -1 AS sign FROM old_rows o'
+            ELSE 'SELECT o.*, -1 AS sign FROM old_rows o
+                  UNION ALL SELECT n.*, 1 AS sign FROM new_rows n'
+        END;
+
+        EXECUTE format($sql$
+            WITH changes AS (%s),
+            buckets AS (
+                INSERT INTO revenue_rollup
+                (session, term, section, day, payments, total_paid)
+                SELECT COALESCE(c.session, ''), COALESCE(c.term, ''),
+                       COALESCE(s.section, ''), c.created_at::date,
+                       SUM(c.sign), SUM(c.sign * COALESCE(c.amount_paid, 0))
+                FROM changes c
+                LEFT JOIN LATERAL (
+                    SELECT section FROM students
+                    WHERE student_id = c.student_id LIMIT 1
+                ) s ON TRUE
+                GROUP BY 1, 2, 3, 4
+                ON CONFLICT (session, term, section, day) DO UPDATE
+                SET payments = revenue_rollup.payments + EXCLUDED.payments,
+                    total_paid = revenue_rollup.total_paid + EXCLUDED.total_paid
+            )
+            INSERT INTO kpi_counters (name, value)
+            SELECT 'payments', COALESCE(SUM(sign), 0) FROM changes
+            UNION ALL
+            SELECT 'revenue', COALESCE(SUM(sign * COALESCE(amount_paid, 0)), 0)
+            FROM changes
+            ON CONFLICT (name) DO UPDATE
+            SET value = kpi_counters.value + EXCLUDED.value
+        $sql$, changes);
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS payments_rollup_insert ON payments",
+    "DROP TRIGGER IF EXISTS payments_rollup_update ON payments",
+    "DROP TRIGGER IF EXISTS payments_rollup_delete ON payments",
+    """
+    CREATE TRIGGER payments_rollup_insert
+    AFTER INSERT ON payments
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_revenue_rollup()
+    """,
+    """
+    CREATE TRIGGER payments_rollup_update
+    AFTER UPDATE ON payments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_revenue_rollup()
+    """,
+    """
+    CREATE TRIGGER payments_rollup_delete
+    AFTER DELETE ON payments
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_revenue_rollup()
+    """,
+    # A student's payments leave their old section (or '' if they had
+    # no student row) and join the new one. Rows whose id and section
+    # did not change cancel out and are skipped.
+    """
+    CREATE OR REPLACE FUNCTION maintain_student_rollup()
+    RETURNS trigger AS $$
+    DECLARE
+        changes TEXT;
+    BEGIN
+        changes := CASE TG_OP
+            WHEN 'INSERT' THEN
+                'SELECT n.student_id, NULL AS section, -1 AS sign FROM new_rows n
+                 UNION ALL SELECT n.student_id, n.section, 1 FROM new_rows n'
+            WHEN 'DELETE' THEN
+                'SELECT o.student_id, o.section, -1 AS sign FROM old_rows o
+                 UNION ALL SELECT o.student_id, NULL, 1 FROM old_rows o'
+            ELSE
+                'WITH moved AS (
+                    SELECT o.student_id AS old_id, o.section AS old_section,
+                           n.student_id AS new_id, n.section AS new_section
+                    FROM old_rows o
+                    JOIN new_rows n ON n.id = o.id
+                    WHERE o.student_id IS DISTINCT FROM n.student_id
+                    OR o.section IS DISTINCT FROM n.section
+                 )
+                 SELECT old_id AS student_id, old_section AS section, -1 AS sign FROM moved
+                 UNION ALL SELECT old_id, NULL, 1 FROM moved
+                 UNION ALL SELECT new_id, NULL, -1 FROM moved
+                 UNION ALL SELECT new_id, new_section, 1 FROM moved'
+        END;
+
+        EXECUTE format($sql$
+            WITH changes AS (%s)
+            INSERT INTO revenue_rollup
+            (session, term, section, day, payments, total_paid)
+            SELECT COALESCE(p.session, ''), COALESCE(p.term, ''),
+                   COALESCE(c.section, ''), p.created_at::date,
+                   SUM(c.sign), SUM(c.sign * COALESCE(p.amount_paid, 0))
+            FROM changes c
+            -- OFFSET 0 keeps the per-student index lookup; the planner has
+            -- no statistics for transition tables and would hash join.
+            CROSS JOIN LATERAL (
+                SELECT session, term, created_at, amount_paid
+                FROM payments
+                WHERE student_id = c.student_id
+                OFFSET 0
+            ) p
+            GROUP BY 1, 2, 3, 4
+            ON CONFLICT (session, term, section, day) DO UPDATE
+            SET payments = revenue_rollup.payments + EXCLUDED.payments,
+                total_paid = revenue_rollup.total_paid + EXCLUDED.total_paid
+        $sql$, changes);
+
+        IF TG_OP <> 'UPDATE' THEN
+            EXECUTE format($sql$
+                INSERT INTO kpi_counters (name, value)
+                SELECT 'students', %s * COUNT(*) FROM %I
+                ON CONFLICT (name) DO UPDATE
+                SET value = kpi_counters.value + EXCLUDED.value
+            $sql$,
+            CASE TG_OP WHEN 'INSERT' THEN 1 ELSE -1 END,
+            CASE TG_OP WHEN 'INSERT' THEN 'new_rows' ELSE 'old_rows' END);
+        END IF;
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS students_rollup_insert ON students",
+    "DROP TRIGGER IF EXISTS students_rollup_update ON students",
+    "DROP TRIGGER IF EXISTS students_rollup_delete ON students",
+    """
+    CREATE TRIGGER students_rollup_insert
+    AFTER INSERT ON students
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_student_rollup()
+    """,
+    """
+    CREATE TRIGGER students_rollup_update
+    AFTER UPDATE ON students
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_student_rollup()
+    """,
+    """
+    CREATE TRIGGER students_rollup_delete
+    AFTER DELETE ON students
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_student_rollup()
+    """,
+]
+
+REBUILD_ROLLUPS = [
+    "LOCK TABLE payments, students IN SHARE MODE",
+    "DELETE FROM revenue_rollup",
+    """
+    INSERT INTO revenue_rollup (session, term, section, day, payments, total_paid)
+    SELECT COALESCE(p.session, ''), COALESCE(p.term, ''),
+           COALESCE(s.section, ''), p.created_at::date,
+           COUNT(*), COALESCE(SUM(p.amount_paid), 0)
+    FROM payments p
+    LEFT JOIN LATERAL (
+        SELECT section FROM students WHERE student_id = p.student_id LIMIT 1
+    ) s ON TRUE
+    GROUP BY 1, 2, 3, 4
+    """,
+    "DELETE FROM kpi_counters",
+    """
+    INSERT INTO kpi_counters (name, value)
+    SELECT 'students', COUNT(*) FROM students
+    UNION ALL
+    SELECT 'payments', COALESCE(SUM(payments), 0) FROM revenue_rollup
+    UNION ALL
+    SELECT 'revenue', COALESCE(SUM(total_paid), 0) FROM revenue_rollup
+    """,
+]
+
+
+def rebuild_rollups():
+    with engine.begin() as conn:
+        for statement in REBUILD_ROLLUPS:
+            conn.execute(text(statement))
+
+
+# =========================================================
+# FEE SCHEDULE
+# =========================================================
+def _load_fees():
+    # Oldest first, so the latest setting for a key is the one kept.
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT section, student_class, term, session, fee_amount
+            FROM school_fee_settings
+            ORDER BY id
+        """)).fetchall()
+
+
+@st.cache_resource
+def get_fee_schedule():
+    # One schedule per process, shared by every user session. The School
+    # Fee Settings page invalidates it after saving.
+    return fee_schedule.FeeSchedule(_load_fees)
+
+
+school_fees = get_fee_schedule()
+
+
+# =========================================================
+# PAYMENT POSTING
+# =========================================================
+# One statement reads the student, locks the student's balance row and
+# inserts the payment. The upsert creates the balance row for a first
+# payment, so there is always a row to lock. A second cashier posting
+# for the same student waits on it and then reads the committed balance,
+# so previous_debt is never read twice. The term's fees come from the
+# fee schedule as a {section: {class: fee}} JSON object, so no fee query
+# is made: the student's class fee if set, otherwise their section's.
+POST_PAYMENT = """
+    WITH student AS (
+        SELECT student_id, full_name, section, student_class
+        FROM students
+        WHERE student_id=:student_id
+        LIMIT 1
+    ),
+    fee AS (
+        SELECT CAST(COALESCE(
+            fees -> s.section ->> s.student_class,
+            fees -> s.section ->> ''
+        ) AS DOUBLE PRECISION) AS fee_amount
+        FROM student s, CAST(:fees AS JSONB) AS fees
+    ),
+    debt AS (
+        INSERT INTO student_balances (student_id, student_name, balance)
+        SELECT student_id, full_name, 0
+        FROM student
+        ON CONFLICT (student_id) DO UPDATE
+        SET student_name = student_balances.student_name
+        RETURNING balance
+    ),
+    paid AS (
+        INSERT INTO payments
+        (student_id, student_name, term, session, fee_amount,
+        previous_debt, amount_paid, balance)
+        SELECT s.student_id, s.full_name, :term, :session, f.fee_amount,
+        d.balance, :paid, f.fee_amount + d.balance - :paid
+        FROM student s, fee f, debt d
+        WHERE f.fee_amount IS NOT NULL
+        RETURNING id, student_id, student_name, fee_amount,
+        previous_debt, amount_paid, balance
+    )
+    SELECT EXISTS (SELECT 1 FROM student) AS student_found, paid.*
+    FROM (SELECT 1) AS one
+    LEFT JOIN paid ON TRUE
+"""
+
+
+class PaymentError(ValueError):
+    pass
+
+
+def post_payment(student_id, term, session, amount_paid):
+    # Returns the receipt row. Always one row comes back, so a missing
+    # student, a missing fee and a failed query can be told apart.
+    rows = run_query(
+        POST_PAYMENT,
+        {
+            "student_id": student_id,
+            "term": term,
+            "session": session,
+            "paid": amount_paid,
+            "fees": json.dumps(school_fees.for_term(term, session)),
+        },
+        fetch=True,
+    )
+
+    if rows is None:
+        # run_query has already shown the database error.
+        raise PaymentError("Payment not recorded")
+
+    receipt = rows[0]
+
+    if not receipt.student_found:
+        raise PaymentError("Student not found")
+
+    if receipt.id is None:
+        raise PaymentError("Fee not set")
+
+    return receipt
+
+
+# =========================================================
+# STUDENT SEARCH
+# =========================================================
+# Word-prefix search over names uses the built-in full text search, so no
+# extension is needed; ids are matched by prefix on a lower() index.
+# Postgres keeps both indexes in sync on insert, update and delete.
+SEARCH_SCHEMA = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_students_full_name_search
+    ON students USING gin (to_tsvector('simple', coalesce(full_name, '')))
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_students_student_id_prefix
+    ON students (lower(student_id) text_pattern_ops)
+    """,
+]
+
+_SEARCH_WORD = re.compile(r"[^\W_]+")
+
+
+def _escape_like(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_students(term, limit=20):
+    # Every word must prefix-match a word of the name, or the whole term
+    # must prefix the student id. Ranked: exact id, then name prefix, then
+    # full text rank.
+    term = term.strip()
+    if not term:
+        return []
+
+    words = _SEARCH_WORD.findall(term.lower())
+    escaped = _escape_like(term.lower())
+
+    name_match = (
+        "to_tsvector('simple', coalesce(full_name, '')) "
+        "@@ to_tsquery('simple', :tsquery)"
+        if words else "FALSE"
+    )
+
+    return run_query(
+        f"""
+        SELECT student_id, full_name, student_class, section, session
+        FROM students
+        WHERE {name_match}
+        OR lower(student_id) LIKE :id_prefix
+        ORDER BY
+            lower(student_id) = :term DESC,
+            lower(full_name) LIKE :id_prefix DESC,
+            ts_rank(
+                to_tsvector('simple', coalesce(full_name, '')),
+                to_tsquery('simple', :tsquery)
+            ) DESC,
+            full_name
+        LIMIT :limit
+        """,
+        {
+            "term": term.lower(),
+            "tsquery": " & ".join(f"{word}:*" for word in words) or "''",
+            "id_prefix": f"{escaped}%",
+            "limit": limit,
+        },
+        fetch=True,
+    ) or []
+
+
+# Matches offered by student_picker; the roster itself is never loaded.
+PICKER_LIMIT = 20
+
+
+def student_picker(label, key):
+    # Typeahead: the query box narrows the choices to the top matches of
+    # search_students. Returns the selected student_id or None.
+    query = st.text_input(label, key=f"{key}_query",
+                          placeholder="Type a name or student ID")
+
+    if not query.strip():
+        return None
+
+    matches = search_students(query, limit=PICKER_LIMIT)
+
+    if not matches:
+        st.info("No matching students")
+        return None
+
+    labels = {f"{m[1]} ({m[0]}) - {m[3]}": m[0] for m in matches}
+    selected = st.selectbox("Select Student", list(labels), key=f"{key}_select")
+
+    return labels[selected]
+
+
+# =========================================================
+# SCHEMA MIGRATIONS
+# =========================================================
+# Tables the app has always expected. Existing databases already have
+# them; new ones get them here.
+BASE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id SERIAL PRIMARY KEY,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT,
+        password_hash TEXT,
+        role TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS students (
+        id SERIAL PRIMARY KEY,
+        student_id TEXT,
+        full_name TEXT,
+        student_class TEXT,
+        section TEXT,
+        session TEXT,
+        admission_session TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS school_fee_settings (
+        id SERIAL PRIMARY KEY,
+        section TEXT,
+        term TEXT,
+        session TEXT,
+        fee_amount DOUBLE PRECISION
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS payments (
+        id SERIAL PRIMARY KEY,
+        student_id TEXT,
+        student_name TEXT,
+        term TEXT,
+        session TEXT,
+        fee_amount DOUBLE PRECISION,
+        previous_debt DOUBLE PRECISION,
+        amount_paid DOUBLE PRECISION,
+        balance DOUBLE PRECISION
+    )
+    """,
+]
+
+
+def _migrate_balances(conn):
+    is_new = conn.execute(text("SELECT to_regclass('student_balances') IS NULL")).scalar()
+
+    for statement in BALANCE_SCHEMA + (REBUILD_BALANCES if is_new else []):
+        conn.execute(text(statement))
+
+
+def _migrate_rollups(conn):
+    is_new = conn.execute(text("SELECT to_regclass('revenue_rollup') IS NULL")).scalar()
+
+    for statement in ROLLUP_SCHEMA + (REBUILD_ROLLUPS if is_new else []):
+        conn.execute(text(statement))
+
+
+def _migrate_promotion(conn):
+    for statement in promotion.PROMOTION_SCHEMA:
+        conn.execute(text(statement))
+
+    promotion.seed_progression(conn)
+
+
+# payments(student_id) becomes the prefix of an index that also covers
+# per-session balance sums. Both steps run CONCURRENTLY, so payment
+# writes are not blocked while the index builds.
+COVERING_INDEXES = [
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_payments_student_session
+    ON payments (student_id, session) INCLUDE (amount_paid, balance)
+    """,
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_payments_student_id",
+]
+
+POSTGRES_MIGRATIONS = [
+    (1, "base tables", BASE_SCHEMA),
+    (2, "running balances", _migrate_balances),
+    (3, "revenue rollups", _migrate_rollups),
+    (4, "bank import review queue", bank_import.REVIEW_QUEUE_SCHEMA),
+    (5, "student search indexes", SEARCH_SCHEMA),
+    (6, "class promotion", _migrate_promotion),
+    (7, "covering payment index", COVERING_INDEXES),
+    (8, "fee matrix", fee_schedule.FEE_MATRIX_SCHEMA),
+]
+
+
+# =========================================================
+# BOOTSTRAP
+# =========================================================
+SEED_ADMIN = """
+    INSERT INTO users (username, password, role)
+    SELECT 'admin', 'admin123', 'Admin'
+    WHERE NOT EXISTS (
+        SELECT 1 FROM users WHERE username='admin'
+    )
+"""
+
+
+def health_check():
+    # Seconds for a round trip on a pooled connection; raises if the
+    # database cannot answer.
+    started = time.perf_counter()
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    return time.perf_counter() - started
+
+
+@st.cache_resource
+def bootstrap():
+    # Once per process, so reruns do no setup work: check the database
+    # answers, apply pending migrations (other processes wait on the
+    # migration lock) and seed the default admin. A failure is not
+    # cached; the next rerun tries again.
+    latency = health_check()
+    applied = migrations.migrate_postgres(engine, POSTGRES_MIGRATIONS)
+
+    with engine.begin() as conn:
+        conn.execute(text(SEED_ADMIN))
+
+    return {
+        "started_at": datetime.now(),
+        "latency": latency,
+        "migrations_applied": applied,
+    }
+
+
+# =========================================================
+# KEYSET PAGINATION
+# =========================================================
+PAGE_SIZE = 50
+
+STUDENT_LIST_COLUMNS = [
+    "student_id", "full_name", "student_class", "section", "session",
+]
+PAYMENT_HISTORY_COLUMNS = [
+    "student_id", "student_name", "term", "session", "fee_amount",
+    "previous_debt", "amount_paid", "balance",
+]
+
+
+def paged_table(key, table, columns):
+    # Shows one page of `table` newest first. session_state keeps the id
+    # cursor of every page visited, so Previous just pops the stack and
+    # only PAGE_SIZE rows ever leave the database.
+    cursors = st.session_state.setdefault(f"{key}_cursors", [])
+    cursor = cursors[-1] if cursors else None
+
+    where = "WHERE id < :cursor" if cursor is not None else ""
+    rows = run_query(
+        f"""
+        SELECT id, {", ".join(columns)}
+        FROM {table}
+        {where}
+        ORDER BY id DESC
+        LIMIT :limit
+        """,
+        {"cursor": cursor, "limit": PAGE_SIZE + 1},
+        fetch=True,
+    ) or []
+
+    has_next = len(rows) > PAGE_SIZE
+    rows = rows[:PAGE_SIZE]
+
+    import pandas as pd
+
+    st.dataframe(pd.DataFrame(rows, columns=["id", *columns]))
+
+    prev_col, page_col, next_col = st.columns(3)
+
+    if prev_col.button("Previous", key=f"{key}_prev", disabled=not cursors):
+        cursors.pop()
+        st.rerun()
+
+    page_col.caption(f"Page {len(cursors) + 1}")
+
+    if next_col.button("Next", key=f"{key}_next", disabled=not has_next):
+        cursors.append(rows[-1][0])
+        st.rerun()
+
+
+# =========================================================
+# ANALYTICS SNAPSHOT
+# =========================================================
+# Reports can read a Parquet copy of students, fees and payments instead
+# of the live tables (see snapshot.py), so heavy analytics do not compete
+# with cashier writes. An admin refreshes it here, or a scheduled job
+# runs: python snapshot.py --database-url ...
+SNAPSHOT_DIR = st.secrets.get("SNAPSHOT_DIR", snapshot.SNAPSHOT_DIR)
+
+
+@st.cache_data(max_entries=32)
+def snapshot_report(report, refreshed_at, *args):
+    # refreshed_at only keys the cache, so a refresh is picked up at once.
+    return getattr(snapshot, report)(SNAPSHOT_DIR, *args)
+
+
+def snapshot_controls(key):
+    # Shows when the snapshot was taken and lets an admin refresh it.
+    # Returns the state, or None when there is no snapshot yet.
+    if st.session_state.role == "Admin" and st.button("Refresh Snapshot", key=key):
+        with st.spinner("Copying new rows..."):
+            summary = snapshot.refresh_snapshot(engine, SNAPSHOT_DIR)
+
+        if summary is None:
+            st.info("A refresh is already running; its snapshot will show when it finishes.")
+        else:
+            st.success(
+                f"Snapshot refreshed in {summary['seconds']:.1f}s: "
+                f"{summary['new_payments']:,} new payments"
+            )
+
+    state = snapshot.load_state(SNAPSHOT_DIR)
+
+    if state:
+        st.caption(
+            f"Snapshot taken {state['refreshed_at']}, "
+            f"{state['rows']['payments']:,} payments"
+        )
+
+    return state
+
+
+def report_source(key):
+    # "Live" or "Snapshot"; the choice is offered once a snapshot exists.
+    state = snapshot_controls(f"{key}_refresh")
+
+    if not state:
+        return "Live", None
+
+    source = st.radio("Source", ["Live", "Snapshot"], horizontal=True, key=key)
+    return source, state["refreshed_at"]
@@ -0,0 +1,17 @@
+# Sidebar pages as (title, script, admin only), in menu order. app.py
+# hands them to st.navigation, which runs only the viewed page's script,
+# so a page's imports and queries cost nothing until it is opened.
+PAGES = [
+    ("Dashboard", "app_pages/dashboard.py", False),
+    ("Register Student", "app_pages/register_student.py", False),
+    ("Student List", "app_pages/student_list.py", False),
+    ("Student Payment", "app_pages/student_payment.py", False),
+    ("Bank Import", "app_pages/bank_statement_import.py", False),
+    ("Payment History", "app_pages/payment_history.py", False),
+    ("School Fee Settings", "app_pages/school_fee_settings.py", False),
+    ("Revenue Dashboard", "app_pages/revenue_dashboard.py", False),
+    ("Debt Report", "app_pages/debt_report.py", False),
+    ("Collection Report", "app_pages/collection_report.py", False),
+    ("Promote Students", "app_pages/promote_students.py", False),
+    ("Query Performance", "app_pages/query_performance.py", True),
+]
@@ -0,0 +1,58 @@
+import streamlit as st
+import pandas as pd
+
+import bank_import
+from app_common import engine
+
+st.subheader("Bank Statement Import")
+
+statement = st.file_uploader(
+    "Bank statement (CSV or Excel)", type=["csv", "xlsx"]
+)
+term = st.selectbox("Term", ["First Term", "Second Term", "Third Term"])
+session = st.text_input("Session")
+
+if statement is not None and session and st.button("Reconcile Statement"):
+    with st.spinner("Reconciling..."):
+        report = bank_import.reconcile_statement(
+            engine, statement, statement.name, term, session
+        )
+
+    st.success(
+        f"Posted {len(report['posted'])} of {report['lines']} lines, "
+        f"{len(report['review'])} sent for review, "
+        f"{len(report['duplicates'])} already imported"
+    )
+
+    if report["posted"]:
+        st.dataframe(pd.DataFrame(report["posted"]))
+
+    if report["review"]:
+        st.dataframe(pd.DataFrame(report["review"])[
+            ["row", "date", "reference", "amount", "reason"]
+        ])
+
+st.subheader("Review Queue")
+
+queue = bank_import.get_review_queue(engine)
+
+if queue:
+    st.dataframe(pd.DataFrame(
+        queue,
+        columns=["ID", "Date", "Reference", "Amount", "Term", "Session", "Reason"],
+    ))
+
+    item_id = st.number_input("Queue ID", step=1, value=queue[0][0])
+    student_id = st.text_input("Assign to Student ID")
+
+    if st.button("Post Payment"):
+        payment = bank_import.resolve_review_item(
+            engine, int(item_id), student_id.strip()
+        )
+
+        if payment:
+            st.success(f"Posted to {payment['student_name']}")
+        else:
+            st.error("Could not post: check the student ID and fee settings")
+else:
+    st.info("Nothing waiting for review")
@@ -0,0 +1,29 @@
+import streamlit as st
+
+from app_common import snapshot_controls, snapshot_report
+
+# Fees billed against fees collected; computed from the snapshot only.
+st.subheader("Fee Collection Report")
+
+state = snapshot_controls("collection_refresh")
+
+if not state:
+    st.info("No snapshot yet. An admin can take one with Refresh Snapshot.")
+else:
+    sessions = snapshot_report("revenue_by_session", state["refreshed_at"])["Session"]
+    session = st.selectbox("Session", sessions.tolist()[::-1])
+
+    if session:
+        report = snapshot_report("collection_report", state["refreshed_at"], session)
+
+        expected_col, collected_col, rate_col = st.columns(3)
+        expected = report["Expected"].sum()
+        collected = report["Collected"].sum()
+        expected_col.metric("Billed", f"₦{expected:,.2f}")
+        collected_col.metric("Collected", f"₦{collected:,.2f}")
+        rate_col.metric(
+            "Collection rate",
+            f"{collected / expected:.1%}" if expected else "-",
+        )
+
+        st.dataframe(report)
@@ -0,0 +1,22 @@
+import streamlit as st
+
+from app_common import search_students
+
+st.subheader("Search Student")
+
+search = st.text_input("Search Student (Name or ID)")
+
+if search.strip():
+    result = search_students(search)
+
+    if result:
+        # Only a search needs pandas; the page opens without it.
+        import pandas as pd
+
+        df = pd.DataFrame(
+            result,
+            columns=["Student ID", "Name", "Class", "Section", "Session"],
+        )
+        st.dataframe(df)
+    else:
+        st.info("No matching students")
@@ -0,0 +1,32 @@
+import streamlit as st
+import pandas as pd
+
+from app_common import (
+    rebuild_balances, report_source, run_query, snapshot_report,
+)
+
+st.subheader("Student Debt Report")
+
+source, refreshed_at = report_source("debt_source")
+
+if source == "Snapshot":
+    df = snapshot_report("debt_report", refreshed_at)
+else:
+    data = run_query(
+        """
+    SELECT student_name, balance
+    FROM student_balances
+    WHERE balance > 0
+    ORDER BY balance DESC
+    """,
+        fetch=True,
+    )
+
+    df = pd.DataFrame(data, columns=["Student", "Debt"])
+
+st.dataframe(df)
+
+if st.session_state.role == "Admin":
+    if st.button("Rebuild Balances"):
+        rebuild_balances()
+        st.success("Balances rebuilt from payments")
@@ -0,0 +1,75 @@
+import streamlit as st
+import tempfile
+
+import exporter
+from app_common import (
+    PAYMENT_HISTORY_COLUMNS, engine, paged_table, run_query, table_columns,
+)
+
+st.subheader("Payment Records")
+
+paged_table("payment_history", "payments", PAYMENT_HISTORY_COLUMNS)
+
+with st.expander("Export"):
+    payment_columns = table_columns("payments")
+
+    export_format = st.selectbox("Format", list(exporter.EXPORT_FORMATS))
+    export_session = st.text_input("Session", key="export_session")
+    export_term = st.selectbox(
+        "Term",
+        ["All", "First Term", "Second Term", "Third Term"],
+        key="export_term",
+    )
+    export_section = st.selectbox(
+        "Section",
+        ["All", "Nursery", "Primary", "Secondary"],
+        key="export_section",
+    )
+
+    date_from = date_to = None
+    if exporter.date_column(payment_columns):
+        dates = st.date_input("Payment date", value=(), key="export_dates")
+        if len(dates) == 2:
+            date_from, date_to = dates
+
+    if st.button("Prepare Export"):
+        where, params = exporter.payment_filters(
+            payment_columns,
+            session=export_session.strip(),
+            term=None if export_term == "All" else export_term,
+            section=None if export_section == "All" else export_section,
+            date_from=date_from,
+            date_to=date_to,
+        )
+
+        # Rows stream from the database into a temporary file. Streamlit
+        # serves downloads from memory, so download_button still reads
+        # the finished file in once; the page keeps no copy of its own.
+        extension, mime = exporter.EXPORT_FORMATS[export_format]
+
+        with tempfile.NamedTemporaryFile() as output:
+            count = exporter.export_table(
+                engine, "payments", output, export_format,
+                where=where, params=params, columns=payment_columns,
+            )
+            output.flush()
+
+            st.caption(f"{count:,} payments")
+
+            with open(output.name, "rb") as export_file:
+                st.download_button(
+                    "Download",
+                    export_file,
+                    file_name=f"payments.{extension}",
+                    mime=mime,
+                )
+
+if st.session_state.role == "Admin":
+    delete_id = st.number_input("Delete Payment ID")
+
+    if st.button("Delete Payment"):
+        run_query(
+            "DELETE FROM payments WHERE id=:id",
+            {"id": delete_id},
+        )
+        st.success("Deleted")
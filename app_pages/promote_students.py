@@ -0,0 +1,61 @@
+import streamlit as st
+import pandas as pd
+
+import promotion
+from app_common import engine
+
+st.subheader("Promote Students")
+
+new_session = st.text_input("New Session")
+
+with st.expander("Class progression"):
+    progression = pd.DataFrame(
+        promotion.get_progression(engine),
+        columns=["Class", "Next Class", "Next Section"],
+    )
+
+    if st.session_state.role == "Admin":
+        edited = st.data_editor(
+            progression, num_rows="dynamic", key="class_progression"
+        )
+
+        if st.button("Save Progression"):
+            edited = edited.astype(object).where(edited.notna(), None)
+            promotion.save_progression(
+                engine, edited.itertuples(index=False, name=None)
+            )
+            st.success("Progression saved")
+    else:
+        st.dataframe(progression)
+
+    st.caption("Students in a class with no next class graduate.")
+
+preview_col, promote_col = st.columns(2)
+summary = None
+
+try:
+    if preview_col.button("Preview Promotion"):
+        summary = promotion.promote_students(engine, new_session, dry_run=True)
+        st.info("Preview only: nothing has been changed")
+
+    if promote_col.button("Promote All Students"):
+        summary = promotion.promote_students(engine, new_session)
+        st.success("Students Promoted")
+
+except ValueError as e:
+    st.error(str(e))
+
+if summary:
+    promoted_col, graduated_col, unmapped_col, debt_col = st.columns(4)
+    promoted_col.metric("Promoted", summary["promoted"])
+    graduated_col.metric("Graduated", summary["graduated"])
+    unmapped_col.metric("Class not mapped", summary["unmapped"])
+    debt_col.metric("Debt carried forward", f"₦{summary['carried_forward']:,.2f}")
+
+    st.dataframe(pd.DataFrame(
+        summary["moves"],
+        columns=[
+            "from_class", "to_class", "graduating", "unmapped",
+            "students", "carried_forward",
+        ],
+    ))
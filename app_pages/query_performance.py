@@ -0,0 +1,75 @@
+import streamlit as st
+import pandas as pd
+
+from app_common import bootstrap, health_check
+from query_log import EXPLAIN_MODES, QUERY_LOG
+
+st.subheader("Query Performance")
+
+setup = bootstrap()
+
+started_col, health_col = st.columns(2)
+started_col.caption(
+    f"Process started {setup['started_at']:%Y-%m-%d %H:%M}; "
+    f"database answered in {setup['latency'] * 1000:.1f} ms; "
+    f"migrations applied: {setup['migrations_applied'] or 'none'}"
+)
+
+if health_col.button("Check Database"):
+    try:
+        health_col.success(f"Database answered in {health_check() * 1000:.1f} ms")
+    except Exception as e:
+        health_col.error(f"Database unavailable: {e}")
+
+settings_col, explain_col = st.columns(2)
+
+QUERY_LOG.slow_ms = settings_col.number_input(
+    "Slow query threshold (ms)",
+    min_value=1,
+    value=int(QUERY_LOG.slow_ms),
+    step=50,
+    key="slow_query_ms",
+)
+
+QUERY_LOG.explain = explain_col.selectbox(
+    "Capture plans of slow queries",
+    EXPLAIN_MODES,
+    index=EXPLAIN_MODES.index(QUERY_LOG.explain),
+    format_func=lambda mode: {
+        None: "Off",
+        "plan": "EXPLAIN",
+        "analyze": "EXPLAIN ANALYZE (reads only; runs them again)",
+    }[mode],
+    key="slow_query_explain",
+)
+
+top = QUERY_LOG.top_statements(limit=None)
+
+statements_col, calls_col, time_col = st.columns(3)
+statements_col.metric("Statements", len(top))
+calls_col.metric("Calls", f"{sum(row['calls'] for row in top):,}")
+time_col.metric("Total time", f"{sum(row['total_ms'] for row in top) / 1000:,.1f} s")
+
+st.write("Top queries by total time")
+st.dataframe(pd.DataFrame(
+    top[:50],
+    columns=[
+        "total_ms", "calls", "mean_ms", "max_ms", "rows",
+        "callers", "params", "sql",
+    ],
+))
+
+slow = QUERY_LOG.slow_queries()
+st.write(f"Slow queries ({len(slow)})")
+
+for entry in slow[:50]:
+    with st.expander(f"{entry['ms']:,.0f} ms  {entry['caller']}  {entry['at']}"):
+        st.code(entry["sql"], language="sql")
+        st.caption(f"{entry['rows']} rows, parameters {entry['params'] or 'none'}")
+
+        if entry["plan"]:
+            st.code(entry["plan"])
+
+if st.button("Reset Statistics"):
+    QUERY_LOG.reset()
+    st.rerun()
@@ -0,0 +1,95 @@
+import streamlit as st
+import pandas as pd
+import uuid
+from sqlalchemy import text
+
+import importer
+from app_common import engine, run_query
+
+st.subheader("Register Student")
+
+student_id = st.text_input("Student ID")
+name = st.text_input("Full Name")
+student_class = st.text_input("Class")
+section = st.selectbox("Section", ["Nursery", "Primary", "Secondary"])
+session = st.text_input("Session e.g 2025/2026")
+
+if st.button("Save Student"):
+    run_query("""
+    INSERT INTO students
+    (student_id, full_name, student_class, section, session, admission_session)
+    VALUES
+    (:student_id, :name, :student_class, :section, :session, :session)
+    """, {
+        "student_id": student_id,
+        "name": name,
+        "student_class": student_class,
+        "section": section,
+        "session": session
+    })
+    st.success("Student Registered")
+
+st.subheader("Bulk Import")
+
+upload = st.file_uploader(
+    "Student file (CSV or Excel)", type=["csv", "xlsx"]
+)
+import_session = st.text_input(
+    "Session for rows without one", key="import_session"
+)
+st.caption(
+    "Columns: student_id (optional), full_name or first_name + "
+    "last_name, class, section, session"
+)
+
+def prepare_student(row):
+    full_name = row.get("full_name", "").strip() or " ".join(
+        part for part in (
+            row.get("first_name", "").strip(),
+            row.get("last_name", "").strip(),
+        ) if part
+    )
+    row_section = row.get("section", "").strip().title()
+    row_session = row.get("session", "").strip() or import_session.strip()
+
+    if not full_name:
+        raise importer.RowError("missing name")
+    if row_section not in ("Nursery", "Primary", "Secondary"):
+        raise importer.RowError(f"unknown section {row.get('section')!r}")
+    if not row_session:
+        raise importer.RowError("missing session")
+
+    return {
+        "student_id": row.get("student_id", "").strip() or str(uuid.uuid4()),
+        "name": full_name,
+        "student_class": row.get("class", "").strip()
+                         or row.get("student_class", "").strip(),
+        "section": row_section,
+        "session": row_session,
+    }
+
+def insert_students(rows):
+    with engine.begin() as conn:
+        conn.execute(text("""
+        INSERT INTO students
+        (student_id, full_name, student_class, section, session, admission_session)
+        VALUES
+        (:student_id, :name, :student_class, :section, :session, :session)
+        """), rows)
+
+if upload is not None and st.button("Import Students"):
+    with st.spinner("Importing..."):
+        report = importer.import_rows(
+            importer.read_rows(upload, upload.name),
+            prepare_student,
+            insert_students,
+        )
+
+    st.success(
+        f"Imported {report['inserted']} of {report['rows']} rows "
+        f"({report['rows_per_second']:,.0f} rows/s)"
+    )
+
+    if report["errors"]:
+        st.warning(f"{len(report['errors'])} rows were skipped")
+        st.dataframe(pd.DataFrame(report["errors"]))
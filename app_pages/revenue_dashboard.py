@@ -0,0 +1,68 @@
+import streamlit as st
+import pandas as pd
+
+from app_common import (
+    rebuild_rollups, report_source, run_query, snapshot_report,
+)
+
+st.subheader("School Revenue")
+
+source, refreshed_at = report_source("revenue_source")
+
+if source == "Snapshot":
+    counters = snapshot_report("totals", refreshed_at)
+else:
+    counters = dict(run_query(
+        "SELECT name, value FROM kpi_counters",
+        fetch=True,
+    ) or [])
+
+students_col, payments_col, revenue_col = st.columns(3)
+students_col.metric("Students", f"{counters.get('students', 0):,.0f}")
+payments_col.metric("Payments", f"{counters.get('payments', 0):,.0f}")
+revenue_col.metric("Revenue", f"₦{counters.get('revenue', 0):,.2f}")
+
+if source == "Snapshot":
+    df = snapshot_report("revenue_by_session", refreshed_at)
+else:
+    data = run_query(
+        """
+    SELECT session, SUM(total_paid)
+    FROM revenue_rollup
+    GROUP BY session
+    ORDER BY session
+    """,
+        fetch=True,
+    )
+
+    df = pd.DataFrame(data, columns=["Session", "Revenue"])
+
+st.bar_chart(df.set_index("Session"))
+
+if not df.empty:
+    session = st.selectbox("Session breakdown", df["Session"].tolist()[::-1])
+
+    if source == "Snapshot":
+        st.dataframe(snapshot_report("revenue_breakdown", refreshed_at, session))
+    else:
+        breakdown = run_query(
+            """
+        SELECT term, section, SUM(payments)::BIGINT, SUM(total_paid)
+        FROM revenue_rollup
+        WHERE session=:session
+        GROUP BY term, section
+        ORDER BY term, section
+        """,
+            {"session": session},
+            fetch=True,
+        )
+
+        st.dataframe(pd.DataFrame(
+            breakdown,
+            columns=["Term", "Section", "Payments", "Revenue"],
+        ))
+
+if st.session_state.role == "Admin":
+    if st.button("Rebuild Rollups"):
+        rebuild_rollups()
+        st.success("Rollups rebuilt from payments")
@@ -0,0 +1,65 @@
+import streamlit as st
+import pandas as pd
+
+import fee_schedule
+from app_common import engine, run_query, school_fees
+
+st.subheader("Set School Fees")
+
+session = st.text_input("Session")
+
+if session:
+    matrix = pd.DataFrame(
+        fee_schedule.get_fee_matrix(engine, session),
+        columns=["Section", "Class", "Term", "Fee"],
+    )
+
+    if matrix.empty:
+        matrix = pd.DataFrame(
+            [
+                (section, "", term, None)
+                for section in ["Nursery", "Primary", "Secondary"]
+                for term in ["First Term", "Second Term", "Third Term"]
+            ],
+            columns=["Section", "Class", "Term", "Fee"],
+        )
+
+    edited = st.data_editor(
+        matrix,
+        num_rows="dynamic",
+        key=f"fee_matrix_{session}",
+        column_config={
+            "Section": st.column_config.SelectboxColumn(
+                options=["Nursery", "Primary", "Secondary"], required=True
+            ),
+            "Class": st.column_config.TextColumn(
+                help="Leave blank for the whole section"
+            ),
+            "Term": st.column_config.SelectboxColumn(
+                options=["First Term", "Second Term", "Third Term"], required=True
+            ),
+            "Fee": st.column_config.NumberColumn(min_value=0, format="%.2f"),
+        },
+    )
+    st.caption(
+        "A class fee replaces its section's fee for that term. "
+        "Rows without a fee are not saved."
+    )
+
+    if st.button("Save Fees"):
+        edited = edited.astype(object).where(edited.notna(), None)
+        saved = fee_schedule.save_fee_matrix(
+            engine, session, edited.itertuples(index=False, name=None)
+        )
+        school_fees.invalidate()
+        st.success(f"Saved {saved} fees for {session}")
+
+st.subheader("Fee Records")
+
+df = pd.DataFrame(
+    run_query("""
+        SELECT * FROM school_fee_settings
+        ORDER BY session, section, student_class, term
+    """, fetch=True)
+)
+st.dataframe(df)
@@ -0,0 +1,17 @@
+import streamlit as st
+
+from app_common import STUDENT_LIST_COLUMNS, paged_table, run_query
+
+st.subheader("All Students")
+
+paged_table("student_list", "students", STUDENT_LIST_COLUMNS)
+
+if st.session_state.role == "Admin":
+    delete_id = st.text_input("Delete Student ID")
+
+    if st.button("Delete Student"):
+        run_query(
+            "DELETE FROM students WHERE student_id=:id",
+            {"id": delete_id},
+        )
+        st.success("Deleted")
@@ -0,0 +1,39 @@
+import streamlit as st
+import pandas as pd
+
+from app_common import PaymentError, post_payment, student_picker
+
+st.subheader("Student Payment")
+
+selected_id = student_picker("Find Student", "payment_student")
+
+term = st.selectbox("Term", ["First Term", "Second Term", "Third Term"])
+session = st.text_input("Session")
+
+amount_paid = st.number_input("Amount Paid")
+
+if st.button("Process Payment"):
+    if not selected_id:
+        st.error("Select a student")
+        st.stop()
+
+    try:
+        receipt_row = post_payment(selected_id, term, session, amount_paid)
+    except PaymentError as e:
+        st.error(str(e))
+        st.stop()
+
+    st.success("Payment Recorded")
+
+    receipt = pd.DataFrame(
+        {
+            "Student": [receipt_row.student_name],
+            "Fee": [receipt_row.fee_amount],
+            "Previous Debt": [receipt_row.previous_debt],
+            "Paid": [receipt_row.amount_paid],
+            "Balance": [receipt_row.balance],
+        }
+    )
+
+    st.subheader("School Payment Receipt")
+    st.table(receipt)
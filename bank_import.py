@@ -0,0 +1,378 @@
+import hashlib
+import re
+from collections import defaultdict
+
+from sqlalchemy import text
+
+import importer
+from fee_schedule import ALL_CLASSES
+
+
+# Header names accepted for each statement field, in order of preference.
+AMOUNT_COLUMNS = ("credit", "amount", "amount_paid", "deposit")
+REFERENCE_COLUMNS = ("reference", "narration", "description", "details", "remarks")
+DATE_COLUMNS = ("date", "transaction_date", "value_date", "posting_date")
+
+_TOKEN = re.compile(r"[A-Za-z0-9/_-]+")
+
+REVIEW_QUEUE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS payment_review_queue (
+        id SERIAL PRIMARY KEY,
+        statement_date TEXT,
+        reference TEXT,
+        amount DOUBLE PRECISION,
+        term TEXT,
+        session TEXT,
+        reason TEXT NOT NULL,
+        fingerprint TEXT,
+        resolved BOOLEAN NOT NULL DEFAULT FALSE,
+        created_at TIMESTAMP NOT NULL DEFAULT now()
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_payment_review_open
+    ON payment_review_queue (id)
+    WHERE NOT resolved
+    """,
+    # One row per statement line already posted, so re-uploading the
+    # same statement does not post it twice.
+    """
+    CREATE TABLE IF NOT EXISTS imported_bank_lines (
+        fingerprint TEXT PRIMARY KEY,
+        imported_at TIMESTAMP NOT NULL DEFAULT now()
+    )
+    """,
+]
+
+
+# =========================================================
+# PARSING AND MATCHING
+# =========================================================
+
+def _first(row, columns):
+    for column in columns:
+        value = row.get(column, "").strip()
+        if value:
+            return value
+    return ""
+
+
+def _parse_amount(value):
+    cleaned = re.sub(r"[^0-9.\-]", "", value)
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def _normalize_name(name):
+    return " ".join(str(name or "").lower().split())
+
+
+class StudentIndex:
+    # Built once per import from a single students query.
+
+    def __init__(self, students):
+        self.by_id = {}
+        self.by_name = {}
+        self.max_name_words = 1
+
+        for student in students:
+            self.by_id[str(student[0]).strip().upper()] = student
+
+            name = _normalize_name(student[1])
+            if name:
+                # Names shared by several students are ambiguous.
+                self.by_name[name] = None if name in self.by_name else student
+                self.max_name_words = max(self.max_name_words, len(name.split()))
+
+    def match(self, student_id, reference):
+        if student_id:
+            return self.by_id.get(student_id.strip().upper())
+
+        tokens = _TOKEN.findall(reference)
+
+        for token in tokens:
+            student = self.by_id.get(token.upper())
+            if student:
+                return student
+
+        words = [t.lower() for t in tokens]
+
+        for size in range(min(self.max_name_words, len(words)), 1, -1):
+            for start in range(len(words) - size + 1):
+                student = self.by_name.get(" ".join(words[start:start + size]))
+                if student:
+                    return student
+
+        return None
+
+
+def parse_statement(rows):
+    lines = []
+    seen = defaultdict(int)
+
+    for row_number, row in rows:
+        date = _first(row, DATE_COLUMNS)
+        reference = _first(row, REFERENCE_COLUMNS)
+        raw_amount = _first(row, AMOUNT_COLUMNS)
+        amount = _parse_amount(raw_amount)
+
+        # Built from the line's content only, never its position, so the
+        # same statement re-exported with blank rows added or removed
+        # matches the lines already imported. Identical lines inside one
+        # statement are told apart by their occurrence count.
+        key = (date, reference, amount)
+        seen[key] += 1
+        fingerprint = hashlib.sha1(
+            f"{date}|{reference}|{amount}|{seen[key]}".encode()
+        ).hexdigest()
+
+        lines.append({
+            "row": row_number,
+            "date": date,
+            "reference": reference,
+            "student_id": row.get("student_id", "").strip(),
+            "amount": amount,
+            "raw_amount": raw_amount,
+            "fingerprint": fingerprint,
+        })
+
+    return lines
+
+
+# =========================================================
+# RECONCILIATION
+# =========================================================
+
+def _insert_payments(conn, payments, term, session):
+    if not payments:
+        return
+
+    conn.execute(text("""
+        INSERT INTO payments
+        (student_id, student_name, term, session, fee_amount,
+        previous_debt, amount_paid, balance)
+        SELECT p.student_id, p.student_name, :term, :session, p.fee_amount,
+        p.previous_debt, p.amount_paid, p.balance
+        FROM unnest(
+            CAST(:student_ids AS TEXT[]),
+            CAST(:names AS TEXT[]),
+            CAST(:fees AS DOUBLE PRECISION[]),
+            CAST(:debts AS DOUBLE PRECISION[]),
+            CAST(:paid AS DOUBLE PRECISION[]),
+            CAST(:balances AS DOUBLE PRECISION[])
+        ) WITH ORDINALITY AS p(student_id, student_name, fee_amount,
+                               previous_debt, amount_paid, balance, n)
+        ORDER BY p.n
+    """), {
+        "term": term,
+        "session": session,
+        "student_ids": [p["student_id"] for p in payments],
+        "names": [p["student_name"] for p in payments],
+        "fees": [p["fee_amount"] for p in payments],
+        "debts": [p["previous_debt"] for p in payments],
+        "paid": [p["amount_paid"] for p in payments],
+        "balances": [p["balance"] for p in payments],
+    })
+
+
+def _queue_for_review(conn, items, term, session):
+    if not items:
+        return
+
+    conn.execute(text("""
+        INSERT INTO payment_review_queue
+        (statement_date, reference, amount, term, session, reason, fingerprint)
+        VALUES
+        (:date, :reference, :amount, :term, :session, :reason, :fingerprint)
+    """), [
+        {
+            "date": item["date"],
+            "reference": item["reference"],
+            "amount": item["amount"],
+            "term": term,
+            "session": session,
+            "reason": item["reason"],
+            "fingerprint": item["fingerprint"],
+        }
+        for item in items
+    ])
+
+
+def _post_lines(conn, matched, term, session):
+    # matched is a list of (line, student) pairs. Returns the payments
+    # written and the lines sent back for review.
+    sections = {student[2] for _, student in matched}
+    student_ids = sorted({student[0] for _, student in matched})
+
+    # (section, class) -> fee; the section's own fee has class ALL_CLASSES.
+    fees = {
+        (section, student_class): fee
+        for section, student_class, fee in conn.execute(text("""
+            SELECT section, student_class, fee_amount
+            FROM school_fee_settings
+            WHERE term=:term
+            AND session=:session
+            AND section = ANY(:sections)
+        """), {
+            "term": term,
+            "session": session,
+            "sections": list(sections),
+        })
+    }
+
+    # Locking the balance rows keeps concurrent postings for the same
+    # students from reading the same previous_debt. The upsert creates
+    # missing rows so first payments are locked too.
+    names = {student[0]: student[1] for _, student in matched}
+
+    debts = dict(conn.execute(text("""
+        INSERT INTO student_balances (student_id, student_name, balance)
+        SELECT student_id, student_name, 0
+        FROM unnest(CAST(:ids AS TEXT[]), CAST(:names AS TEXT[]))
+            AS s(student_id, student_name)
+        ORDER BY student_id
+        ON CONFLICT (student_id) DO UPDATE
+        SET student_name = student_balances.student_name
+        RETURNING student_id, balance
+    """), {
+        "ids": student_ids,
+        "names": [names[student_id] for student_id in student_ids],
+    }).fetchall())
+
+    payments = []
+    review = []
+
+    for line, student in matched:
+        student_id, name, section = student[0], student[1], student[2]
+        fee = fees.get((section, student[3] or ALL_CLASSES))
+
+        if fee is None:
+            fee = fees.get((section, ALL_CLASSES))
+
+        if fee is None:
+            review.append(dict(line, reason=f"fee not set for {section}"))
+            continue
+
+        previous_debt = debts.get(student_id, 0)
+        balance = fee + previous_debt - line["amount"]
+
+        # Same running total the Student Payment page uses.
+        debts[student_id] = previous_debt + balance
+
+        payments.append({
+            "row": line["row"],
+            "student_id": student_id,
+            "student_name": name,
+            "fee_amount": fee,
+            "previous_debt": previous_debt,
+            "amount_paid": line["amount"],
+            "balance": balance,
+        })
+
+    _insert_payments(conn, payments, term, session)
+    return payments, review
+
+
+def reconcile_statement(engine, file, filename, term, session):
+    lines = parse_statement(importer.read_rows(file, filename))
+
+    with engine.begin() as conn:
+        index = StudentIndex(conn.execute(text(
+            "SELECT student_id, full_name, section, student_class FROM students"
+        )).fetchall())
+
+        new_fingerprints = set(conn.execute(text("""
+            INSERT INTO imported_bank_lines (fingerprint)
+            SELECT unnest(CAST(:fingerprints AS TEXT[]))
+            ON CONFLICT DO NOTHING
+            RETURNING fingerprint
+        """), {
+            "fingerprints": [line["fingerprint"] for line in lines],
+        }).scalars())
+
+        matched = []
+        review = []
+        duplicates = []
+
+        for line in lines:
+            if line["fingerprint"] not in new_fingerprints:
+                duplicates.append(line)
+            elif line["amount"] is None or line["amount"] <= 0:
+                review.append(dict(line, reason=f"invalid amount {line['raw_amount']!r}"))
+            else:
+                student = index.match(line["student_id"], line["reference"])
+                if student is None:
+                    review.append(dict(line, reason="no matching student"))
+                else:
+                    matched.append((line, student))
+
+        payments, unpriced = _post_lines(conn, matched, term, session)
+        review.extend(unpriced)
+
+        _queue_for_review(conn, review, term, session)
+
+    return {
+        "lines": len(lines),
+        "posted": payments,
+        "review": sorted(review, key=lambda item: item["row"]),
+        "duplicates": duplicates,
+    }
+
+
+# =========================================================
+# REVIEW QUEUE
+# =========================================================
+
+def get_review_queue(engine):
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            SELECT id, statement_date, reference, amount, term, session, reason
+            FROM payment_review_queue
+            WHERE NOT resolved
+            ORDER BY id
+        """)).fetchall()
+
+
+def resolve_review_item(engine, item_id, student_id):
+    # Posts a queued line against the student picked by a reviewer.
+    with engine.begin() as conn:
+        item = conn.execute(text("""
+            SELECT id, statement_date, reference, amount, term, session, fingerprint
+            FROM payment_review_queue
+            WHERE id=:id
+            AND NOT resolved
+            FOR UPDATE
+        """), {"id": item_id}).fetchone()
+
+        if item is None:
+            return None
+
+        student = conn.execute(text("""
+            SELECT student_id, full_name, section, student_class
+            FROM students
+            WHERE student_id=:student_id
+        """), {"student_id": student_id}).fetchone()
+
+        if student is None or item.amount is None or item.amount <= 0:
+            return None
+
+        line = {
+            "row": item.id,
+            "date": item.statement_date,
+            "reference": item.reference,
+            "amount": item.amount,
+        }
+
+        payments, review = _post_lines(conn, [(line, student)], item.term, item.session)
+
+        if not payments:
+            return None
+
+        conn.execute(text(
+            "UPDATE payment_review_queue SET resolved = TRUE WHERE id=:id"
+        ), {"id": item_id})
+
+        return payments[0]
@@ -0,0 +1,395 @@
+# Builds a synthetic school database at a given scale.
+#
+#   python -m benchmarks.generate_data --scale 50k
+#   python -m benchmarks.generate_data --students 2500 --output /tmp/school.db
+#   python -m benchmarks.generate_data --scale 1k --database-url postgresql://...
+#
+# SQLite output uses the same schema as school.db. --database-url fills
+# the app's existing Postgres tables instead.
+
+import argparse
+import os
+import random
+import sqlite3
+import time
+import uuid
+from datetime import date, timedelta
+
+from faker import Faker
+
+import database
+
+
+SCALES = {
+    "1k": 1_000,
+    "50k": 50_000,
+    "500k": 500_000,
+}
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+TERMS = ("1st", "2nd", "3rd")
+APP_TERMS = ("First Term", "Second Term", "Third Term")
+
+# section -> (share of students, classes, base fee per term)
+SECTIONS = {
+    "Nursery": (0.25, ("1", "2", "3"), 20000),
+    "Primary": (0.45, ("1", "2", "3", "4", "5", "6"), 25000),
+    "Secondary": (0.30, ("1", "2", "3", "4", "5", "6"), 30000),
+}
+
+# Distinct names drawn from Faker once; students sample from these.
+NAME_POOL = 2000
+
+BATCH_SIZE = 10_000
+
+# Same tables and indexes as school.db.
+SQLITE_SCHEMA = (
+    """
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        role TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE students (
+        student_id TEXT PRIMARY KEY,
+        first_name TEXT,
+        last_name TEXT,
+        gender TEXT,
+        section TEXT,
+        class TEXT,
+        parent_phone TEXT,
+        admission_date TEXT,
+        status TEXT
+    )
+    """,
+    """
+    CREATE TABLE fees (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        section TEXT,
+        class TEXT,
+        term TEXT,
+        session TEXT,
+        total_fee REAL
+    )
+    """,
+    """
+    CREATE TABLE payments (
+        payment_id TEXT PRIMARY KEY,
+        student_id TEXT,
+        term TEXT,
+        session TEXT,
+        amount_paid REAL,
+        payment_date TEXT,
+        FOREIGN KEY(student_id) REFERENCES students(student_id)
+    )
+    """,
+    """
+    CREATE TABLE outstanding_balances (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id TEXT NOT NULL,
+        session TEXT NOT NULL,
+        amount REAL NOT NULL,
+        UNIQUE(student_id, session),
+        FOREIGN KEY (student_id)
+        REFERENCES students(student_id)
+        ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX idx_student_id ON payments(student_id)",
+    "CREATE INDEX idx_session_term ON payments(session, term)",
+    "CREATE INDEX idx_payment_student ON payments(student_id)",
+    "CREATE INDEX idx_payment_session ON payments(session)",
+    "CREATE INDEX idx_fee_lookup ON fees(section, term, session)",
+    "CREATE INDEX idx_student_section ON students(section)",
+)
+
+
+# =========================================================
+# SYNTHETIC ROWS
+# =========================================================
+
+class SchoolData:
+    # Deterministic for a given seed, so every run of a scale produces
+    # the same database.
+
+    def __init__(self, students, sessions, seed=42):
+        self.students = students
+        self.sessions = [str(s) for s in sessions]
+        self.random = random.Random(seed)
+
+        fake = Faker("en_NG")
+        fake.seed_instance(seed)
+
+        self.first_names = list({fake.first_name() for _ in range(NAME_POOL)})
+        self.last_names = list({fake.last_name() for _ in range(NAME_POOL)})
+
+    def _uuid(self):
+        return str(uuid.UUID(int=self.random.getrandbits(128), version=4))
+
+    def _section(self):
+        pick = self.random.random()
+
+        for section, (share, classes, _) in SECTIONS.items():
+            if pick < share:
+                return section, self.random.choice(classes)
+            pick -= share
+
+        return section, self.random.choice(classes)
+
+    def fees(self):
+        for session_index, session in enumerate(self.sessions):
+            for section, (_, classes, base) in SECTIONS.items():
+                for student_class in classes:
+                    for term in TERMS:
+                        fee = base * (1.1 ** session_index) + 1000 * int(student_class)
+                        yield section, student_class, term, session, round(fee, -2)
+
+    def fee_lookup(self):
+        return {
+            (section, student_class, term, session): fee
+            for section, student_class, term, session, fee in self.fees()
+        }
+
+    def students_and_payments(self):
+        # Yields (student_row, [payment_rows]). Each student joins in one
+        # of the sessions and pays 0-3 instalments per term from then on.
+        fees = self.fee_lookup()
+        first_year = int(self.sessions[0])
+
+        for _ in range(self.students):
+            student_id = self._uuid()
+            section, student_class = self._section()
+            joined = self.random.randrange(len(self.sessions))
+            admission = date(first_year + joined, 9, 1) + timedelta(
+                days=self.random.randrange(60)
+            )
+
+            student = (
+                student_id,
+                self.random.choice(self.first_names),
+                self.random.choice(self.last_names),
+                self.random.choice(("Male", "Female")),
+                section,
+                student_class,
+                "0" + self.random.choice(("70", "80", "81", "90", "91"))
+                + f"{self.random.randrange(10 ** 8):08d}",
+                admission.isoformat(),
+                "Active",
+            )
+
+            payments = []
+
+            for session_index in range(joined, len(self.sessions)):
+                session = self.sessions[session_index]
+
+                for term_index, term in enumerate(TERMS):
+                    fee = fees[(section, student_class, term, session)]
+                    term_start = date(int(session), 9, 1) + timedelta(days=120 * term_index)
+
+                    for _ in range(self.random.choice((0, 1, 1, 2, 3))):
+                        payments.append((
+                            self._uuid(),
+                            student_id,
+                            term,
+                            session,
+                            round(fee * self.random.choice((0.25, 0.5, 1.0)), -2),
+                            (term_start + timedelta(days=self.random.randrange(90))).isoformat(),
+                        ))
+
+            yield student, payments
+
+
+def _batches(data):
+    students = []
+    payments = []
+
+    for student, student_payments in data.students_and_payments():
+        students.append(student)
+        payments.extend(student_payments)
+
+        if len(students) >= BATCH_SIZE:
+            yield students, payments
+            students = []
+            payments = []
+
+    if students:
+        yield students, payments
+
+
+# =========================================================
+# SQLITE
+# =========================================================
+
+def build_sqlite(path, data):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    conn = sqlite3.connect(path)
+
+    try:
+        for statement in SQLITE_SCHEMA:
+            conn.execute(statement)
+
+        conn.execute(
+            "INSERT INTO users (username, password, role) VALUES ('admin', 'admin123', 'admin')"
+        )
+        conn.executemany(
+            "INSERT INTO fees (section, class, term, session, total_fee) VALUES (?, ?, ?, ?, ?)",
+            list(data.fees())
+        )
+
+        counts = [0, 0]
+
+        for students, payments in _batches(data):
+            conn.executemany(
+                "INSERT INTO students VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", students
+            )
+            conn.executemany(
+                "INSERT INTO payments VALUES (?, ?, ?, ?, ?, ?)", payments
+            )
+            counts[0] += len(students)
+            counts[1] += len(payments)
+
+        conn.commit()
+
+    finally:
+        conn.close()
+
+    # Let the pool build its derived tables (totals, rollups, search)
+    # now, so benchmarks do not time that one-off work.
+    pool = database.get_pool(path)
+    pool.acquire().close()
+    pool.close_all()
+
+    return counts
+
+
+# =========================================================
+# POSTGRES
+# =========================================================
+
+def build_postgres(url, data):
+    # Appends to the app's existing tables; payments follow the app's
+    # ledger (previous_debt is the student's running sum of balances).
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(url)
+    fees = data.fee_lookup()
+    counts = [0, 0]
+
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO school_fee_settings (section, term, session, fee_amount)
+            VALUES (:section, :term, :session, :fee)
+        """), [
+            {"section": section, "term": APP_TERMS[TERMS.index(term)],
+             "session": session, "fee": fee}
+            for (section, student_class, term, session), fee in fees.items()
+            if student_class == "1"
+        ])
+
+    for students, payments in _batches(data):
+        names = {}
+        sections = {}
+        student_rows = []
+
+        for s in students:
+            names[s[0]] = f"{s[1]} {s[2]}"
+            sections[s[0]] = s[4]
+            student_rows.append({
+                "student_id": s[0],
+                "full_name": names[s[0]],
+                "student_class": f"{s[4]} {s[5]}",
+                "section": s[4],
+                "session": data.sessions[-1],
+                "admission_session": str(int(s[7][:4])),
+            })
+
+        debts = {}
+        payment_rows = []
+
+        for p in payments:
+            fee = fees[(sections[p[1]], "1", p[2], p[3])]
+            previous_debt = debts.get(p[1], 0)
+            balance = fee + previous_debt - p[4]
+            debts[p[1]] = previous_debt + balance
+
+            payment_rows.append({
+                "student_id": p[1],
+                "student_name": names[p[1]],
+                "term": APP_TERMS[TERMS.index(p[2])],
+                "session": p[3],
+                "fee": fee,
+                "previous_debt": previous_debt,
+                "paid": p[4],
+                "balance": balance,
+            })
+
+        with engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO students
+                (student_id, full_name, student_class, section, session, admission_session)
+                VALUES
+                (:student_id, :full_name, :student_class, :section, :session, :admission_session)
+            """), student_rows)
+
+            if payment_rows:
+                conn.execute(text("""
+                    INSERT INTO payments
+                    (student_id, student_name, term, session, fee_amount,
+                    previous_debt, amount_paid, balance)
+                    VALUES
+                    (:student_id, :student_name, :term, :session, :fee,
+                    :previous_debt, :paid, :balance)
+                """), payment_rows)
+
+        counts[0] += len(student_rows)
+        counts[1] += len(payment_rows)
+
+    engine.dispose()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic school database")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="1k")
+    parser.add_argument("--students", type=int, help="overrides --scale")
+    parser.add_argument("--sessions", type=int, default=3,
+                        help="number of sessions of payment history")
+    parser.add_argument("--first-session", type=int, default=2023)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="SQLite file (default benchmarks/data/school-<scale>.db)")
+    parser.add_argument("--database-url", help="fill this Postgres database instead")
+    args = parser.parse_args(argv)
+
+    students = args.students or SCALES[args.scale]
+    data = SchoolData(
+        students,
+        range(args.first_session, args.first_session + args.sessions),
+        seed=args.seed,
+    )
+
+    started = time.perf_counter()
+
+    if args.database_url:
+        target = "Postgres"
+        counts = build_postgres(args.database_url, data)
+    else:
+        label = args.students or args.scale
+        target = args.output or os.path.join(DATA_DIR, f"school-{label}.db")
+        os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+        counts = build_sqlite(target, data)
+
+    print(
+        f"{target}: {counts[0]:,} students, {counts[1]:,} payments "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# The query plans the indexes exist for. Each check is (name, sql,
+# params, expected, unexpected): every expected string must appear in the
+# plan and no unexpected one may. run.py fails when any check does.
+#
+#   python -m benchmarks.plan_checks --db benchmarks/data/school-1k.db
+#   python -m benchmarks.plan_checks --database-url postgresql://...
+
+import argparse
+import sys
+
+import migrations
+
+
+SQLITE_PLAN_CHECKS = [
+    (
+        "payment totals rebuild",
+        """
+        SELECT student_id, session, term, IFNULL(SUM(amount_paid), 0)
+        FROM payments
+        GROUP BY student_id, session, term
+        """,
+        (),
+        ["SCAN payments USING COVERING INDEX idx_payments_student_session_term"],
+        ["TEMP B-TREE"],
+    ),
+    (
+        "student payments",
+        """
+        SELECT payment_id, term, session, amount_paid, payment_date
+        FROM payments
+        WHERE student_id = ?
+        ORDER BY payment_date DESC
+        """,
+        ("x",),
+        ["SEARCH payments USING INDEX idx_payments_student_session_term (student_id=?)"],
+        [],
+    ),
+    (
+        "student section move",
+        """
+        SELECT session, term, date(payment_date), COUNT(*), SUM(amount_paid)
+        FROM payments
+        WHERE student_id = ?
+        GROUP BY session, term, date(payment_date)
+        """,
+        ("x",),
+        ["idx_payments_student_session_term (student_id=?)"],
+        [],
+    ),
+    (
+        "class or section fee",
+        """
+        SELECT MAX(class) FROM fees
+        WHERE section = ? AND session = ? AND term IS ? AND class IN (?, '')
+        """,
+        ("Primary", "2025", "1st", "3"),
+        ["SEARCH fees USING COVERING INDEX idx_fees_key "
+         "(section=? AND session=? AND term=? AND class=?)"],
+        [],
+    ),
+    (
+        "fees per session",
+        "SELECT SUM(total_fee) FROM fees WHERE section = ? AND session = ?",
+        ("Primary", "2025"),
+        ["SEARCH fees USING INDEX idx_fees_key (section=? AND session=?)"],
+        [],
+    ),
+    (
+        "paid per term",
+        """
+        SELECT total_paid FROM payment_totals
+        WHERE student_id = ? AND term = ? AND session = ?
+        """,
+        ("x", "1st", "2025"),
+        ["sqlite_autoindex_payment_totals_1"],
+        [],
+    ),
+    (
+        "rollover results",
+        """
+        SELECT student_id, amount FROM outstanding_balances
+        WHERE session = ?
+        ORDER BY student_id
+        """,
+        ("2026",),
+        ["SEARCH outstanding_balances USING COVERING INDEX idx_outstanding_session"],
+        ["TEMP B-TREE"],
+    ),
+    (
+        "student search",
+        "SELECT rowid FROM students_fts WHERE students_fts MATCH ?",
+        ("ada*",),
+        ["VIRTUAL TABLE INDEX"],
+        [],
+    ),
+]
+
+# Planned with sequential scans disabled (see migrations.postgres_plan).
+POSTGRES_PLAN_CHECKS = [
+    (
+        "student balance by session",
+        """
+        SELECT session, SUM(balance) FROM payments
+        WHERE student_id = :student_id
+        GROUP BY session
+        """,
+        {"student_id": "x"},
+        # An Index Only Scan once VACUUM has set the visibility map.
+        ["idx_payments_student_session"],
+        [],
+    ),
+    (
+        "debt report",
+        """
+        SELECT student_name, balance FROM student_balances
+        WHERE balance > 0
+        ORDER BY balance DESC
+        """,
+        {},
+        ["idx_student_balances_debt"],
+        [],
+    ),
+    (
+        "student name search",
+        """
+        SELECT student_id FROM students
+        WHERE to_tsvector('simple', coalesce(full_name, ''))
+              @@ to_tsquery('simple', :tsquery)
+        """,
+        {"tsquery": "ada:*"},
+        ["idx_students_full_name_search"],
+        [],
+    ),
+    (
+        "student id prefix",
+        "SELECT student_id FROM students WHERE lower(student_id) LIKE :prefix",
+        {"prefix": "zf0%"},
+        ["idx_students_student_id_prefix"],
+        [],
+    ),
+    (
+        "revenue breakdown",
+        """
+        SELECT term, section, SUM(payments), SUM(total_paid)
+        FROM revenue_rollup
+        WHERE session = :session
+        GROUP BY term, section
+        """,
+        {"session": "2025"},
+        ["revenue_rollup_pkey"],
+        [],
+    ),
+]
+
+
+def check_sqlite(conn, checks=SQLITE_PLAN_CHECKS):
+    # Returns {name: problem} for the checks that failed.
+    failures = {}
+
+    for name, sql, params, expected, unexpected in checks:
+        plan = migrations.sqlite_plan(conn, sql, params)
+        problem = migrations.check_plan(plan, expected, unexpected)
+
+        if problem:
+            failures[name] = f"{problem}\n{plan}"
+
+    return failures
+
+
+def check_postgres(engine, checks=POSTGRES_PLAN_CHECKS):
+    failures = {}
+
+    for name, sql, params, expected, unexpected in checks:
+        with engine.begin() as conn:
+            plan = migrations.postgres_plan(conn, sql, params)
+
+        problem = migrations.check_plan(plan, expected, unexpected)
+
+        if problem:
+            failures[name] = f"{problem}\n{plan}"
+
+    return failures
+
+
+def report(label, failures, checks):
+    print(f"{label}: {len(checks) - len(failures)}/{len(checks)} plans as expected")
+
+    for name, problem in failures.items():
+        print(f"  FAIL {name}: {problem}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that hot queries use their indexes")
+    parser.add_argument("--db", help="SQLite database; pending migrations are applied")
+    parser.add_argument("--database-url", help="Postgres database; must already be migrated")
+    args = parser.parse_args(argv)
+
+    if not args.db and not args.database_url:
+        parser.error("give --db, --database-url or both")
+
+    failed = False
+
+    if args.db:
+        import database
+
+        database.DB_NAME = args.db
+        conn = database.get_connection()
+
+        try:
+            failures = check_sqlite(conn)
+        finally:
+            conn.close()
+
+        report(args.db, failures, SQLITE_PLAN_CHECKS)
+        failed = failed or bool(failures)
+
+    if args.database_url:
+        from sqlalchemy import create_engine
+
+        engine = create_engine(args.database_url)
+        failures = check_postgres(engine)
+        engine.dispose()
+
+        report("Postgres", failures, POSTGRES_PLAN_CHECKS)
+        failed = failed or bool(failures)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
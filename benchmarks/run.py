@@ -0,0 +1,473 @@
+# Times every public function in models.py and database.py against a
+# generated database, and optionally every app.py page against Postgres.
+# Exits non-zero if a query plan check fails or, with --compare, if a
+# case regressed.
+#
+#   python -m benchmarks.run --db benchmarks/data/school-50k.db \
+#       --output benchmarks/baselines/sqlite-50k.json
+#   python -m benchmarks.run --db ... --compare benchmarks/baselines/sqlite-50k.json
+#   python -m benchmarks.run --database-url postgresql://...
+#
+# The database is copied first, so write benchmarks never touch it.
+
+import argparse
+import gc
+import inspect
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import database
+import models
+from app_pages import PAGES
+from benchmarks import plan_checks
+
+
+DEFAULT_REPEAT = 5
+
+# A function this much slower than its baseline is reported.
+REGRESSION_RATIO = 1.25
+
+# Differences below this are timer noise.
+NOISE_MS = 0.05
+
+
+# =========================================================
+# TIMING
+# =========================================================
+
+def _time(fn, repeat):
+    fn()  # warm-up: caches, lazy imports, prepared statements
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "median_ms": round(statistics.median(timings), 4),
+        "min_ms": round(min(timings), 4),
+        "max_ms": round(max(timings), 4),
+        "repeat": repeat,
+    }
+
+
+def _run_case(name, fn, repeat):
+    try:
+        result = _time(fn, repeat)
+    except Exception as e:
+        result = {"error": f"{type(e).__name__}: {e}"}
+
+    summary = result.get("error") or f"{result['median_ms']:10.3f} ms"
+    print(f"  {name:<48} {summary}")
+    return result
+
+
+def _public_functions(module):
+    return sorted(
+        name
+        for name, fn in inspect.getmembers(module, inspect.isfunction)
+        if not name.startswith("_") and fn.__module__ == module.__name__
+    )
+
+
+# =========================================================
+# SQLITE CASES
+# =========================================================
+
+class Sample:
+    # Real keys from the database under test.
+
+    def __init__(self, path):
+        conn = sqlite3.connect(path)
+
+        try:
+            self.student_id, self.section, self.student_class = conn.execute("""
+                SELECT s.student_id, s.section, s.class
+                FROM students s
+                JOIN payments p ON p.student_id = s.student_id
+                ORDER BY s.rowid
+                LIMIT 1
+            """).fetchone()
+
+            self.term, self.session = conn.execute("""
+                SELECT term, MAX(session) FROM payments
+                WHERE student_id = ?
+            """, (self.student_id,)).fetchone()
+
+            self.first_name = conn.execute(
+                "SELECT first_name FROM students WHERE student_id = ?",
+                (self.student_id,)
+            ).fetchone()[0]
+
+            self.student_ids = [
+                row[0] for row in conn.execute(
+                    "SELECT student_id FROM students ORDER BY rowid LIMIT 500"
+                )
+            ]
+
+            self.middle_rowid = conn.execute(
+                "SELECT rowid FROM students ORDER BY rowid LIMIT 1 OFFSET "
+                "(SELECT COUNT(*) / 2 FROM students)"
+            ).fetchone()[0]
+
+        finally:
+            conn.close()
+
+        self.next_session = str(int(self.session) + 1)
+
+
+def _new_student(sample):
+    return models.add_student(
+        "Bench", "Student", "Female", sample.section, sample.student_class,
+        "08000000000", "2025-09-01", "Active"
+    )
+
+
+def _import_file(rows=1000):
+    lines = ["first_name,last_name,gender,section,class,parent_phone,admission_date"]
+    lines += [
+        f"Import{i},Student,Male,Primary,1,0800000{i:04d},2025-09-01"
+        for i in range(rows)
+    ]
+    return io.BytesIO("\n".join(lines).encode())
+
+
+def sqlite_cases(sample):
+    # (name, callable, repeat or None for the default)
+    s = sample
+    victims = []
+
+    def delete_student():
+        database_victim = victims.pop() if victims else _new_student(s)
+        models.delete_student(database_victim)
+
+    def counter():
+        counter.value += 1
+        return counter.value
+    counter.value = 0
+
+    def lookup(conn):
+        try:
+            conn.execute(
+                "SELECT * FROM students WHERE student_id = ?", (s.student_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+
+    return [
+        # models: students
+        ("models.add_student", lambda: victims.append(_new_student(s)), None),
+        ("models.delete_student", delete_student, None),
+        ("models.import_students",
+         lambda: models.import_students(_import_file(), "students.csv"), 3),
+        ("models.get_all_students", models.get_all_students, 3),
+        ("models.get_students_page", models.get_students_page, None),
+        ("models.get_students_page (middle)",
+         lambda: models.get_students_page(s.middle_rowid), None),
+        ("models.search_students", lambda: models.search_students(s.first_name[:3]), None),
+        ("models.get_student", lambda: models.get_student(s.student_id), None),
+
+        # models: payments
+        ("models.add_payment",
+         lambda: models.add_payment(s.student_id, s.term, s.session, 100, "2025-10-01"), None),
+        ("models.get_payments", models.get_payments, 3),
+        ("models.get_payments_page", models.get_payments_page, None),
+        ("models.get_student_payments",
+         lambda: models.get_student_payments(s.student_id), None),
+
+        # models: dashboard
+        ("models.total_students", models.total_students, None),
+        ("models.total_revenue", models.total_revenue, None),
+        ("models.total_revenue (session)", lambda: models.total_revenue(s.session), None),
+        ("models.get_revenue_rollup", models.get_revenue_rollup, None),
+        ("models.rebuild_rollups", models.rebuild_rollups, 3),
+
+        # models: fees and balances
+        ("models.fee_schedule", models.fee_schedule, None),
+        ("models.set_fee",
+         lambda: models.set_fee(s.section, s.term, s.session, 30000), None),
+        ("models.get_current_fee",
+         lambda: models.get_current_fee(s.section, s.term, s.session), None),
+        ("models.get_current_fee (class)",
+         lambda: models.get_current_fee(s.section, s.term, s.session, s.student_class), None),
+        ("models.get_fee_matrix", lambda: models.get_fee_matrix(s.session), None),
+        ("models.save_fee_matrix",
+         lambda: models.save_fee_matrix(s.session, models.get_fee_matrix(s.session)), None),
+        ("models.get_total_paid",
+         lambda: models.get_total_paid(s.student_id, s.term, s.session), None),
+        ("models.get_balance", lambda: models.get_balance(s.student_id, s.session), None),
+        ("models.rebuild_balances", models.rebuild_balances, 3),
+        ("models.get_previous_outstanding",
+         lambda: models.get_previous_outstanding(s.student_id, s.next_session), None),
+        ("models.get_previous_outstanding_bulk",
+         lambda: models.get_previous_outstanding_bulk(s.student_ids, s.next_session), None),
+
+        # models: statements and rollover
+        ("models.get_statement_data",
+         lambda: models.get_statement_data(s.session, s.term, section=s.section,
+                                           student_class=s.student_class), 3),
+        ("models.rollover_outstanding",
+         lambda: models.rollover_outstanding(s.next_session), 1),
+
+        # database
+        ("database.get_pool", database.get_pool, None),
+        ("database.get_connection", lambda: database.get_connection().close(), None),
+        # One lookup on a pooled connection against what every call paid
+        # before the pool: a new connection, then closing it.
+        ("database.get_connection (lookup)", lambda: lookup(database.get_connection()), None),
+        ("database.get_connection (lookup, unpooled)",
+         lambda: lookup(sqlite3.connect(database.DB_NAME)), None),
+        ("database.close_all_connections", database.close_all_connections, None),
+        ("database.rebuild_balances", database.rebuild_balances, 3),
+        ("database.rebuild_rollups", database.rebuild_rollups, 3),
+        ("database.create_tables", database.create_tables, None),
+        ("database.create_default_admin", database.create_default_admin, None),
+        ("database.health_check", database.health_check, None),
+        ("database.bootstrap", database.bootstrap, None),
+        ("database.add_user",
+         lambda: database.add_user(f"bench{counter()}", "secret", "staff"), None),
+        ("database.login_user", lambda: database.login_user("admin", "admin123"), None),
+        ("database.add_student",
+         lambda: database.add_student("Bench", "1", "Male", "P", "080", "Road", s.session), None),
+        ("database.get_students", database.get_students, 3),
+        ("database.delete_student", lambda: database.delete_student("missing"), None),
+        ("database.record_fee",
+         lambda: database.record_fee(s.student_id, 100, s.term, s.session, "2025-10-01"), None),
+        ("database.get_total_students", database.get_total_students, None),
+        ("database.get_total_revenue_by_session",
+         lambda: database.get_total_revenue_by_session(s.session), None),
+        ("database.get_transactions", database.get_transactions, 3),
+    ]
+
+
+def run_sqlite(path, repeat):
+    workdir = tempfile.mkdtemp(prefix="school-bench-")
+    copy = os.path.join(workdir, "school.db")
+    shutil.copy(path, copy)
+
+    results = {}
+
+    try:
+        database.close_all_connections()
+        database.DB_NAME = copy
+
+        # Opening the pool applies pending migrations before anything is
+        # timed; the plans are checked against the migrated schema.
+        conn = database.get_connection()
+        try:
+            plan_failures = plan_checks.check_sqlite(conn)
+        finally:
+            conn.close()
+
+        sample = Sample(copy)
+        cases = sqlite_cases(sample)
+
+        print(f"SQLite: {path}")
+        for name, *_ in plan_checks.SQLITE_PLAN_CHECKS:
+            problem = plan_failures.get(name)
+            results[f"plan.{name}"] = {"error": problem} if problem else {"ok": True}
+            print(f"  {'plan.' + name:<48} {'FAIL ' + problem if problem else 'ok'}")
+
+        for name, fn, case_repeat in cases:
+            results[name] = _run_case(name, fn, case_repeat or repeat)
+
+        covered = {name.split(" ")[0] for name, _, _ in cases}
+        for module in (models, database):
+            for name in _public_functions(module):
+                key = f"{module.__name__}.{name}"
+                if key not in covered:
+                    results[key] = {"skipped": "no benchmark case"}
+                    print(f"  {key:<48} no benchmark case")
+
+    finally:
+        database.close_all_connections()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+# =========================================================
+# APP PAGES (POSTGRES)
+# =========================================================
+
+def run_pages(database_url, repeat, username, password):
+    # Renders each page in app_pages with Streamlit's AppTest. "cold" is the
+    # first render after clearing the shared query cache, "warm" the
+    # steady-state rerun.
+    from streamlit.testing.v1 import AppTest
+
+    app_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "app.py")
+
+    at = AppTest.from_file(app_path, default_timeout=600)
+    at.secrets["DATABASE_URL"] = database_url
+    at.run()
+
+    at.text_input[0].input(username)
+    at.text_input[1].input(password)
+    at.button[0].click().run()
+
+    if at.exception or any(s.value == "Login" for s in at.subheader):
+        raise RuntimeError("Could not log in to app.py")
+
+    results = {}
+
+    print(f"App pages: {database_url.split('@')[-1]}")
+
+    for page, script, admin_only in PAGES:
+        if admin_only and at.session_state.role != "Admin":
+            continue
+
+        def render(script=script):
+            at.switch_page(script).run()
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+
+        def cold(script=script):
+            # Same as after a committed write: the next read of every
+            # query goes to the database.
+            for cache in _query_caches():
+                cache.invalidate()
+            render(script)
+
+        for name, fn in ((f"page.{page} (cold)", cold), (f"page.{page} (warm)", render)):
+            results[name] = _run_case(name, fn, repeat)
+
+    return results
+
+
+def _query_caches():
+    # app_common keeps its QueryCache in st.cache_resource, in this process.
+    from query_cache import QueryCache
+
+    return [obj for obj in gc.get_objects() if isinstance(obj, QueryCache)]
+
+
+# =========================================================
+# BASELINES
+# =========================================================
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _scale(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("students", "payments", "fees")
+        }
+    finally:
+        conn.close()
+
+
+def compare(results, baseline):
+    # Returns the names that got slower than REGRESSION_RATIO allows.
+    regressions = []
+
+    print(f"\n{'case':<48} {'baseline':>10} {'now':>10} {'ratio':>7}")
+
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name, {})
+
+        if "median_ms" not in result or "median_ms" not in before:
+            continue
+
+        old, new = before["median_ms"], result["median_ms"]
+        ratio = new / old if old else float("inf")
+        slower = ratio > REGRESSION_RATIO and new - old > NOISE_MS
+
+        if slower:
+            regressions.append(name)
+
+        print(f"{name:<48} {old:>10.3f} {new:>10.3f} {ratio:>6.2f}x"
+              + ("  REGRESSION" if slower else ""))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark models, database and app pages")
+    parser.add_argument("--db", help="SQLite database from benchmarks.generate_data")
+    parser.add_argument("--database-url", help="Postgres database for the app.py pages")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    args = parser.parse_args(argv)
+
+    if not args.db and not args.database_url:
+        parser.error("give --db, --database-url or both")
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+
+    if args.db:
+        report["meta"]["scale"] = _scale(args.db)
+        report["results"].update(run_sqlite(args.db, args.repeat))
+
+    if args.database_url:
+        report["results"].update(
+            run_pages(args.database_url, args.repeat, args.username, args.password)
+        )
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\nWrote {args.output}")
+
+    failed = False
+
+    bad_plans = [
+        name for name, result in report["results"].items()
+        if name.startswith("plan.") and "error" in result
+    ]
+
+    if bad_plans:
+        print(f"\n{len(bad_plans)} query plan(s) not as expected")
+        failed = True
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report["results"], json.load(f))
+
+        if regressions:
+            print(f"\n{len(regressions)} regression(s)")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
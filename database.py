@@ -1,58 +1,684 @@
+import queue
 import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import migrations
+from query_log import TracedConnection
 
 DB_NAME = "school.db"
 
+# Idle connections kept open per database file. Extra connections are
+# opened when the pool is empty and closed again when handed back.
+POOL_SIZE = 8
+
+# Applied once, when a pooled connection is first opened.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA foreign_keys = ON",
+)
+
+
+# =========================================================
+# CONNECTION POOL
+# =========================================================
+
+class PooledConnection(TracedConnection):
+    # close() returns the connection to its pool instead of closing it,
+    # so existing "conn.close()" call sites keep working unchanged.
+    # Statements are timed into query_log.QUERY_LOG.
+    pool = None
+    released = False
+
+    def close(self):
+        # Only the first close() counts: a second would put the connection
+        # in the pool twice, and two callers would then share it.
+        if self.released:
+            return
+
+        self.released = True
+        self.finish_statements()
+
+        if self.pool is None:
+            super().close()
+            return
+
+        if self.in_transaction:
+            self.rollback()
+
+        self.pool.release(self)
+
+    def discard(self):
+        super().close()
+
+
+class ConnectionPool:
+
+    def __init__(self, db_name, size=POOL_SIZE):
+        self.db_name = db_name
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_name,
+            check_same_thread=False,
+            factory=PooledConnection
+        )
+
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+
+        with self._schema_lock:
+            if not self._schema_ready:
+                migrations.migrate_sqlite(conn, SQLITE_MIGRATIONS)
+                self._schema_ready = True
+
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+
+        conn.released = False
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.discard()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().discard()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_name=None):
+    db_name = db_name or DB_NAME
+
+    with _pools_lock:
+        pool = _pools.get(db_name)
+        if pool is None:
+            pool = _pools[db_name] = ConnectionPool(db_name)
+
+    return pool
+
 
 def get_connection():
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_pool().acquire()
 
 
-# CREATE TABLES
-def create_tables():
-    conn = get_connection()
-    cursor = conn.cursor()
+def close_all_connections():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
 
-    # USERS TABLE (Login system)
-    cursor.execute("""
+    for pool in pools:
+        pool.close_all()
+
+
+# =========================================================
+# BASE TABLES
+# =========================================================
+
+# The school.db schema as shipped, minus its redundant indexes (see the
+# covering indexes migration). Existing databases already have these.
+BASE_SCHEMA = (
+    """
     CREATE TABLE IF NOT EXISTS users (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         username TEXT UNIQUE NOT NULL,
         password TEXT NOT NULL,
         role TEXT NOT NULL
     )
-    """)
-
-    # STUDENTS TABLE
-    cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS students (
-        student_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        class_name TEXT,
+        student_id TEXT PRIMARY KEY,
+        first_name TEXT,
+        last_name TEXT,
         gender TEXT,
-        parent_name TEXT,
+        section TEXT,
+        class TEXT,
         parent_phone TEXT,
-        address TEXT,
-        session TEXT
+        admission_date TEXT,
+        status TEXT
     )
-    """)
-
-    # FEES TABLE
-    cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS fees (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
-        student_id INTEGER,
-        amount REAL,
+        section TEXT,
+        class TEXT,
+        term TEXT,
+        session TEXT,
+        total_fee REAL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS payments (
+        payment_id TEXT PRIMARY KEY,
+        student_id TEXT,
         term TEXT,
         session TEXT,
-        date_paid TEXT,
+        amount_paid REAL,
+        payment_date TEXT,
         FOREIGN KEY(student_id) REFERENCES students(student_id)
     )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS outstanding_balances (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id TEXT NOT NULL,
+        session TEXT NOT NULL,
+        amount REAL NOT NULL,
+        UNIQUE(student_id, session),
+        FOREIGN KEY (student_id)
+        REFERENCES students(student_id)
+        ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_session_term ON payments(session, term)",
+    "CREATE INDEX IF NOT EXISTS idx_student_section ON students(section)",
+)
+
+
+# =========================================================
+# RUNNING BALANCES
+# =========================================================
+
+# payment_totals holds SUM(amount_paid) per (student, session, term) and
+# is kept current by triggers on payments, so paid/balance reads are
+# point lookups. Keys are compared with IS because payments may carry
+# NULL session or term values.
+BALANCE_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS payment_totals (
+        student_id TEXT,
+        session TEXT,
+        term TEXT,
+        total_paid REAL NOT NULL DEFAULT 0,
+        UNIQUE(student_id, session, term)
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_payment_totals_insert
+    AFTER INSERT ON payments
+    BEGIN
+        INSERT INTO payment_totals (student_id, session, term)
+        SELECT NEW.student_id, NEW.session, NEW.term
+        WHERE NOT EXISTS (
+            SELECT 1 FROM payment_totals
+            WHERE student_id IS NEW.student_id
+            AND session IS NEW.session
+            AND term IS NEW.term
+        );
+
+        UPDATE payment_totals
+        SET total_paid = total_paid + IFNULL(NEW.amount_paid, 0)
+        WHERE student_id IS NEW.student_id
+        AND session IS NEW.session
+        AND term IS NEW.term;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_payment_totals_delete
+    AFTER DELETE ON payments
+    BEGIN
+        UPDATE payment_totals
+        SET total_paid = total_paid - IFNULL(OLD.amount_paid, 0)
+        WHERE student_id IS OLD.student_id
+        AND session IS OLD.session
+        AND term IS OLD.term;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_payment_totals_update
+    AFTER UPDATE OF student_id, session, term, amount_paid ON payments
+    BEGIN
+        UPDATE payment_totals
+        SET total_paid = total_paid - IFNULL(OLD.amount_paid, 0)
+        WHERE student_id IS OLD.student_id
+        AND session IS OLD.session
+        AND term IS OLD.term;
+
+        INSERT INTO payment_totals (student_id, session, term)
+        SELECT NEW.student_id, NEW.session, NEW.term
+        WHERE NOT EXISTS (
+            SELECT 1 FROM payment_totals
+            WHERE student_id IS NEW.student_id
+            AND session IS NEW.session
+            AND term IS NEW.term
+        );
+
+        UPDATE payment_totals
+        SET total_paid = total_paid + IFNULL(NEW.amount_paid, 0)
+        WHERE student_id IS NEW.student_id
+        AND session IS NEW.session
+        AND term IS NEW.term;
+    END
+    """,
+)
+
+
+def _table_exists(conn, name):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (name,)
+    ).fetchone()
+    return row is not None
+
+
+def _migrate_balances(conn):
+    is_new = not _table_exists(conn, "payment_totals")
+
+    for statement in BALANCE_SCHEMA:
+        conn.execute(statement)
+
+    if is_new:
+        _rebuild_payment_totals(conn)
+
+
+def _rebuild_payment_totals(conn):
+    conn.execute("DELETE FROM payment_totals")
+    conn.execute("""
+    INSERT INTO payment_totals (student_id, session, term, total_paid)
+    SELECT student_id, session, term, IFNULL(SUM(amount_paid), 0)
+    FROM payments
+    GROUP BY student_id, session, term
+    """)
+
+
+# REBUILD RUNNING BALANCES FROM RAW PAYMENTS
+def rebuild_balances():
+    conn = get_connection()
+
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        _rebuild_payment_totals(conn)
+        conn.commit()
+
+    finally:
+        conn.close()
+
+
+# =========================================================
+# REVENUE ROLLUPS
+# =========================================================
+
+# revenue_rollup holds payment count and SUM(amount_paid) per session,
+# term, section and day; kpi_counters holds the headline totals. Both are
+# kept current by triggers, so dashboards read a few pre-aggregated rows
+# instead of scanning payments. A payment's section is the student's
+# section, so changing a student's section moves their payments across.
+KPI_COUNTERS = ("students", "payments", "revenue")
+
+_PAYMENT_SECTION = "(SELECT section FROM students WHERE student_id = {row}.student_id)"
+
+
+def _bucket_match(session, term, section, day, table="revenue_rollup"):
+    return (
+        f"{table}.session IS {session} AND {table}.term IS {term} "
+        f"AND {table}.section IS {section} AND {table}.day IS {day}"
+    )
+
+
+def _rollup_payment(row, sign):
+    # Adds (sign "+") or removes (sign "-") one payment row.
+    section = _PAYMENT_SECTION.format(row=row)
+    day = f"date({row}.payment_date)"
+    match = _bucket_match(f"{row}.session", f"{row}.term", section, day)
+
+    return f"""
+        INSERT INTO revenue_rollup (session, term, section, day)
+        SELECT {row}.session, {row}.term, {section}, {day}
+        WHERE NOT EXISTS (SELECT 1 FROM revenue_rollup WHERE {match});
+
+        UPDATE revenue_rollup
+        SET payments = payments {sign} 1,
+            total_paid = total_paid {sign} IFNULL({row}.amount_paid, 0)
+        WHERE {match};
+
+        UPDATE kpi_counters SET value = value {sign} 1 WHERE name = 'payments';
+
+        UPDATE kpi_counters
+        SET value = value {sign} IFNULL({row}.amount_paid, 0)
+        WHERE name = 'revenue';
+    """
+
+
+def _move_student_revenue(student_id, section, sign):
+    # Adds or removes every payment of one student in `section`'s buckets,
+    # one indexed bucket update per (session, term, day) they paid in.
+    student_payments = f"""
+        SELECT session, term, date(payment_date) AS day,
+               COUNT(*) AS payments, IFNULL(SUM(amount_paid), 0) AS total_paid
+        FROM payments
+        WHERE student_id = {student_id}
+        GROUP BY session, term, date(payment_date)
+    """
+    insert = ""
+
+    if sign == "+":
+        insert = f"""
+        INSERT INTO revenue_rollup (session, term, section, day)
+        SELECT p.session, p.term, {section}, p.day
+        FROM ({student_payments}) p
+        WHERE NOT EXISTS (
+            SELECT 1 FROM revenue_rollup r
+            WHERE {_bucket_match("p.session", "p.term", section, "p.day", "r")}
+        );
+        """
+
+    return insert + f"""
+        UPDATE revenue_rollup
+        SET payments = revenue_rollup.payments {sign} p.payments,
+            total_paid = revenue_rollup.total_paid {sign} p.total_paid
+        FROM ({student_payments}) p
+        WHERE {_bucket_match("p.session", "p.term", section, "p.day")};
+    """
+
+
+ROLLUP_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS revenue_rollup (
+        session TEXT,
+        term TEXT,
+        section TEXT,
+        day TEXT,
+        payments INTEGER NOT NULL DEFAULT 0,
+        total_paid REAL NOT NULL DEFAULT 0,
+        UNIQUE(session, term, section, day)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS kpi_counters (
+        name TEXT PRIMARY KEY,
+        value REAL NOT NULL DEFAULT 0
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_revenue_rollup_insert
+    AFTER INSERT ON payments
+    BEGIN
+        {_rollup_payment("NEW", "+")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_revenue_rollup_delete
+    AFTER DELETE ON payments
+    BEGIN
+        {_rollup_payment("OLD", "-")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_revenue_rollup_update
+    AFTER UPDATE OF student_id, session, term, amount_paid, payment_date ON payments
+    BEGIN
+        {_rollup_payment("OLD", "-")}
+        {_rollup_payment("NEW", "+")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_kpi_students_insert
+    AFTER INSERT ON students
+    BEGIN
+        UPDATE kpi_counters SET value = value + 1 WHERE name = 'students';
+        {_move_student_revenue("NEW.student_id", "NULL", "-")}
+        {_move_student_revenue("NEW.student_id", "NEW.section", "+")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_kpi_students_delete
+    AFTER DELETE ON students
+    BEGIN
+        UPDATE kpi_counters SET value = value - 1 WHERE name = 'students';
+        {_move_student_revenue("OLD.student_id", "OLD.section", "-")}
+        {_move_student_revenue("OLD.student_id", "NULL", "+")}
+    END
+    """,
+    # student_id itself cannot change while payments reference it.
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_revenue_rollup_section
+    AFTER UPDATE OF section ON students
+    WHEN OLD.section IS NOT NEW.section
+    BEGIN
+        {_move_student_revenue("OLD.student_id", "OLD.section", "-")}
+        {_move_student_revenue("NEW.student_id", "NEW.section", "+")}
+    END
+    """,
+)
+
+
+def _migrate_rollups(conn):
+    is_new = not _table_exists(conn, "revenue_rollup")
+
+    for statement in ROLLUP_SCHEMA:
+        conn.execute(statement)
+
+    if is_new:
+        _rebuild_rollups(conn)
+
+
+def _rebuild_rollups(conn):
+    conn.execute("DELETE FROM revenue_rollup")
+    conn.execute("""
+    INSERT INTO revenue_rollup (session, term, section, day, payments, total_paid)
+    SELECT p.session, p.term, s.section, date(p.payment_date),
+           COUNT(*), IFNULL(SUM(p.amount_paid), 0)
+    FROM payments p
+    LEFT JOIN students s ON s.student_id = p.student_id
+    GROUP BY p.session, p.term, s.section, date(p.payment_date)
+    """)
+
+    conn.execute("DELETE FROM kpi_counters")
+    conn.executemany(
+        "INSERT INTO kpi_counters (name, value) VALUES (?, 0)",
+        [(name,) for name in KPI_COUNTERS]
+    )
+    conn.execute("""
+    UPDATE kpi_counters
+    SET value = (SELECT COUNT(*) FROM students)
+    WHERE name = 'students'
+    """)
+    conn.execute("""
+    UPDATE kpi_counters
+    SET value = (
+        SELECT IFNULL(SUM(payments), 0) FROM revenue_rollup
+    )
+    WHERE name = 'payments'
+    """)
+    conn.execute("""
+    UPDATE kpi_counters
+    SET value = (
+        SELECT IFNULL(SUM(total_paid), 0) FROM revenue_rollup
+    )
+    WHERE name = 'revenue'
     """)
 
-    conn.commit()
-    conn.close()
+
+# REBUILD ROLLUPS AND COUNTERS FROM RAW PAYMENTS
+def rebuild_rollups():
+    conn = get_connection()
+
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        _rebuild_rollups(conn)
+        conn.commit()
+
+    finally:
+        conn.close()
+
+
+# =========================================================
+# STUDENT SEARCH INDEX
+# =========================================================
+
+# FTS5 index over names, ids and parent phone, stored as an external
+# content table over students and kept in sync by triggers. prefix='2 3'
+# builds prefix indexes so search-as-you-type queries stay fast.
+SEARCH_SCHEMA = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5(
+        student_id,
+        first_name,
+        last_name,
+        parent_phone,
+        content='students',
+        content_rowid='rowid',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_students_fts_insert
+    AFTER INSERT ON students
+    BEGIN
+        INSERT INTO students_fts (rowid, student_id, first_name, last_name, parent_phone)
+        VALUES (NEW.rowid, NEW.student_id, NEW.first_name, NEW.last_name, NEW.parent_phone);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_students_fts_delete
+    AFTER DELETE ON students
+    BEGIN
+        INSERT INTO students_fts (students_fts, rowid, student_id, first_name, last_name, parent_phone)
+        VALUES ('delete', OLD.rowid, OLD.student_id, OLD.first_name, OLD.last_name, OLD.parent_phone);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_students_fts_update
+    AFTER UPDATE OF student_id, first_name, last_name, parent_phone ON students
+    BEGIN
+        INSERT INTO students_fts (students_fts, rowid, student_id, first_name, last_name, parent_phone)
+        VALUES ('delete', OLD.rowid, OLD.student_id, OLD.first_name, OLD.last_name, OLD.parent_phone);
+
+        INSERT INTO students_fts (rowid, student_id, first_name, last_name, parent_phone)
+        VALUES (NEW.rowid, NEW.student_id, NEW.first_name, NEW.last_name, NEW.parent_phone);
+    END
+    """,
+)
+
+
+def _migrate_search(conn):
+    # Databases made by the old create_tables() have no name columns; the
+    # index is built once they do.
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(students)")}
+    if not {"first_name", "last_name", "parent_phone"} <= columns:
+        raise migrations.MigrationPending("students has no name columns")
+
+    is_new = not _table_exists(conn, "students_fts")
+
+    for statement in SEARCH_SCHEMA:
+        conn.execute(statement)
+
+    if is_new:
+        conn.execute("INSERT INTO students_fts (students_fts) VALUES ('rebuild')")
+
+
+# =========================================================
+# MIGRATIONS
+# =========================================================
+
+# payments(student_id) was indexed twice and payments(session) is a prefix
+# of idx_session_term; each insert paid for all of them. The covering
+# indexes let per-student totals, fee lookups and rollover reads come
+# straight from the index, in order.
+COVERING_INDEXES = (
+    "DROP INDEX IF EXISTS idx_student_id",
+    "DROP INDEX IF EXISTS idx_payment_student",
+    "DROP INDEX IF EXISTS idx_payment_session",
+    "DROP INDEX IF EXISTS idx_fee_lookup",
+    """
+    CREATE INDEX IF NOT EXISTS idx_payments_student_session_term
+    ON payments(student_id, session, term, amount_paid)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_fees_section_session_term
+    ON fees(section, session, term, total_fee)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_outstanding_session
+    ON outstanding_balances(session, student_id, amount)
+    """,
+)
+
+# fees.class is blank for a fee that applies to the whole section, or
+# names the class whose fee overrides the section's for that term. Each
+# (section, session, term, class) keeps one row, the latest, so fees are
+# saved with an upsert. The unique index also serves every fee lookup.
+FEE_MATRIX = (
+    "UPDATE fees SET class = TRIM(IFNULL(class, ''))",
+    """
+    DELETE FROM fees
+    WHERE id NOT IN (
+        SELECT MAX(id)
+        FROM fees
+        GROUP BY section, session, term, class
+    )
+    """,
+    "DROP INDEX IF EXISTS idx_fees_section_session_term",
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_fees_key
+    ON fees(section, session, term, class)
+    """,
+)
+
+# Before the fee matrix nothing read fees.class, so the classes on
+# existing rows are leftovers and every row is a section fee. Rows that
+# share a (section, session, term) were re-saves: the latest one is kept,
+# as Postgres does (fee_schedule.FEE_MATRIX_SCHEMA).
+LEGACY_SECTION_FEES = (
+    """
+    DELETE FROM fees
+    WHERE id NOT IN (
+        SELECT MAX(id)
+        FROM fees
+        GROUP BY section, session, term
+    )
+    """,
+    "UPDATE fees SET class = '' WHERE class <> ''",
+)
+
+# Applied by the pool when it opens its first connection to a file.
+SQLITE_MIGRATIONS = [
+    (1, "base tables", BASE_SCHEMA),
+    (2, "running balances", _migrate_balances),
+    (3, "revenue rollups", _migrate_rollups),
+    (4, "student search index", _migrate_search),
+    (5, "covering indexes", COVERING_INDEXES),
+    (6, "fee matrix", FEE_MATRIX),
+    (7, "legacy section fees", LEGACY_SECTION_FEES),
+    # Version 4 used to be recorded even when it had to skip the index.
+    (8, "student search index, if skipped", _migrate_search),
+]
+
+
+# CREATE TABLES (applies any pending migrations; returns their versions)
+def create_tables():
+    conn = get_connection()
+
+    try:
+        return migrations.migrate_sqlite(conn, SQLITE_MIGRATIONS)
+
+    finally:
+        conn.close()
 
 
 # CREATE DEFAULT ADMIN
@@ -69,6 +695,45 @@ def create_default_admin():
     conn.close()
 
 
+# HEALTH CHECK (seconds for a round trip; raises if the file is unusable)
+def health_check():
+    started = time.perf_counter()
+    conn = get_connection()
+
+    try:
+        conn.execute("SELECT 1").fetchone()
+
+    finally:
+        conn.close()
+
+    return time.perf_counter() - started
+
+
+# database name -> what bootstrap() found, like the pools.
+_bootstrapped = {}
+_bootstrap_lock = threading.Lock()
+
+
+# BOOTSTRAP (one-off setup, once per process per database file)
+def bootstrap():
+    # The health check opens the pool, which applies pending migrations,
+    # then the default admin is seeded. Later calls return the first
+    # result without touching the database.
+    with _bootstrap_lock:
+        result = _bootstrapped.get(DB_NAME)
+
+        if result is None:
+            latency = health_check()
+            create_default_admin()
+
+            result = _bootstrapped[DB_NAME] = {
+                "started_at": datetime.now(),
+                "latency": latency,
+            }
+
+        return result
+
+
 # ADD USER
 def add_user(username, password, role):
     conn = get_connection()
@@ -130,6 +795,8 @@ def delete_student(student_id):
     conn = get_connection()
     cursor = conn.cursor()
 
+    # Payments first: foreign keys are enforced.
+    cursor.execute("DELETE FROM payments WHERE student_id = ?", (student_id,))
     cursor.execute("DELETE FROM students WHERE student_id = ?", (student_id,))
 
     conn.commit()
@@ -0,0 +1,221 @@
+import csv
+import io
+
+from sqlalchemy import text
+
+
+# Rows fetched from the server-side cursor and written per batch.
+EXPORT_BATCH_SIZE = 5000
+
+# format -> (file extension, mime type)
+EXPORT_FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+# =========================================================
+# COLUMNS AND FILTERS
+# =========================================================
+
+def table_columns(engine, table):
+    # [(column_name, data_type)] in table order.
+    with engine.connect() as conn:
+        return [
+            tuple(row)
+            for row in conn.execute(text("""
+                SELECT column_name, data_type
+                FROM information_schema.columns
+                WHERE table_name=:table
+                AND table_schema = current_schema()
+                ORDER BY ordinal_position
+            """), {"table": table})
+        ]
+
+
+def date_column(columns):
+    for name, data_type in columns:
+        if data_type == "date" or data_type.startswith("timestamp"):
+            return name
+    return None
+
+
+def payment_filters(columns, session=None, term=None, section=None,
+                    date_from=None, date_to=None):
+    # Returns (where, params) for payments. Section lives on students;
+    # the date range is skipped when payments has no date column.
+    conditions = []
+    params = {}
+
+    if session:
+        conditions.append("session=:session")
+        params["session"] = session
+
+    if term:
+        conditions.append("term=:term")
+        params["term"] = term
+
+    if section:
+        conditions.append(
+            "student_id IN (SELECT student_id FROM students WHERE section=:section)"
+        )
+        params["section"] = section
+
+    dated = date_column(columns)
+
+    if dated and date_from:
+        conditions.append(f"{dated} >= :date_from")
+        params["date_from"] = date_from
+
+    if dated and date_to:
+        # date_to is inclusive of the whole day.
+        conditions.append(f"{dated} < CAST(:date_to AS date) + 1")
+        params["date_to"] = date_to
+
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    return where, params
+
+
+# =========================================================
+# STREAMING
+# =========================================================
+
+def stream_rows(engine, table, columns, where="", params=None,
+                batch_size=EXPORT_BATCH_SIZE):
+    # Yields lists of rows from a server-side cursor, so only one batch
+    # is held in memory whatever the size of the table.
+    names = ", ".join(name for name, _ in columns)
+
+    with engine.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, max_row_buffer=batch_size
+        ).execute(
+            text(f"SELECT {names} FROM {table} {where} ORDER BY id"),
+            params or {},
+        )
+
+        for batch in result.partitions(batch_size):
+            yield batch
+
+
+# =========================================================
+# WRITERS
+# =========================================================
+
+def _write_csv(batches, columns, out):
+    wrapper = io.TextIOWrapper(out, encoding="utf-8", newline="")
+
+    try:
+        writer = csv.writer(wrapper)
+        writer.writerow([name for name, _ in columns])
+
+        for batch in batches:
+            writer.writerows(batch)
+
+    finally:
+        wrapper.flush()
+        wrapper.detach()
+
+
+def _write_xlsx(batches, columns, out):
+    # Write-only workbooks spool rows to disk instead of keeping cells.
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Export")
+    sheet.append([name for name, _ in columns])
+
+    for batch in batches:
+        for row in batch:
+            sheet.append(list(row))
+
+    workbook.save(out)
+
+
+def _arrow_type(data_type):
+    import pyarrow as pa
+
+    if data_type in ("integer", "bigint", "smallint"):
+        return pa.int64()
+    if data_type in ("numeric", "double precision", "real"):
+        return pa.float64()
+    if data_type == "boolean":
+        return pa.bool_()
+    if data_type == "date":
+        return pa.date32()
+    if data_type == "timestamp with time zone":
+        return pa.timestamp("us", tz="UTC")
+    if data_type.startswith("timestamp"):
+        return pa.timestamp("us")
+    return pa.string()
+
+
+def _arrow_values(values, arrow_type):
+    import pyarrow as pa
+
+    # NUMERIC arrives as Decimal and ids may be stored as numbers.
+    if pa.types.is_floating(arrow_type):
+        return [None if v is None else float(v) for v in values]
+    if pa.types.is_string(arrow_type):
+        return [None if v is None else str(v) for v in values]
+    return values
+
+
+def arrow_schema(columns):
+    import pyarrow as pa
+
+    return pa.schema(
+        [(name, _arrow_type(data_type)) for name, data_type in columns]
+    )
+
+
+def arrow_table(batch, schema):
+    # A list of row tuples as an Arrow table of the given schema.
+    import pyarrow as pa
+
+    if not batch:
+        return schema.empty_table()
+
+    arrays = [
+        pa.array(_arrow_values(values, field.type), type=field.type)
+        for values, field in zip(zip(*batch), schema)
+    ]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _write_parquet(batches, columns, out):
+    # Only needed for Parquet exports. Each batch becomes a row group.
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(columns)
+
+    with pq.ParquetWriter(out, schema) as writer:
+        for batch in batches:
+            writer.write_table(arrow_table(batch, schema))
+
+
+_WRITERS = {
+    "csv": _write_csv,
+    "xlsx": _write_xlsx,
+    "parquet": _write_parquet,
+}
+
+
+def export_table(engine, table, out, fmt="csv", where="", params=None,
+                 columns=None, batch_size=EXPORT_BATCH_SIZE):
+    # Streams `table` into the binary file `out`. Returns the row count.
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    columns = columns or table_columns(engine, table)
+    count = 0
+
+    def counted():
+        nonlocal count
+        for batch in stream_rows(engine, table, columns, where, params, batch_size):
+            count += len(batch)
+            yield batch
+
+    _WRITERS[fmt](counted(), columns, out)
+    return count
@@ -0,0 +1,191 @@
+import threading
+import time
+
+
+# Seconds a loaded schedule is trusted. Writes made through this process
+# invalidate it at once; this only bounds how long a fee changed by
+# another process (a second app server, a script) can go unseen.
+FEE_SCHEDULE_MAX_AGE = 60
+
+# The class of a fee that applies to a whole section. A fee set for a
+# class takes precedence over its section's fee for the same term.
+ALL_CLASSES = ""
+
+
+class FeeSchedule:
+    # The whole fee table in a dict keyed by (section, class, term,
+    # session). It is a few dozen rows read on every payment and
+    # statement, so it is loaded once and lookups never query the
+    # database. Whatever writes fees calls invalidate() after committing;
+    # the next lookup reloads.
+
+    def __init__(self, load, max_age=FEE_SCHEDULE_MAX_AGE):
+        # load() returns (section, class, term, session, fee) rows, oldest
+        # first: a later setting for the same key replaces an earlier one.
+        self.load = load
+        self.max_age = max_age
+        self.loads = 0
+
+        self._fees = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _current(self):
+        fees = self._fees
+
+        if fees is not None and time.monotonic() - self._loaded_at < self.max_age:
+            return fees
+
+        with self._lock:
+            if self._fees is not None and time.monotonic() - self._loaded_at < self.max_age:
+                return self._fees
+
+            generation = self._generation
+            fees = {
+                (section, student_class or ALL_CLASSES, term, session): fee
+                for section, student_class, term, session, fee in self.load()
+            }
+            self.loads += 1
+
+            # An invalidate() during the load means it may have read the
+            # old fees: use them for this lookup but do not keep them.
+            if generation == self._generation:
+                self._fees = fees
+                self._loaded_at = time.monotonic()
+
+            return fees
+
+    def get(self, section, term, session, student_class=None, default=None):
+        # The class's fee if one is set, otherwise the section's.
+        fees = self._current()
+
+        for key in (
+            (section, student_class or ALL_CLASSES, term, session),
+            (section, ALL_CLASSES, term, session),
+        ):
+            if key in fees:
+                return fees[key]
+
+        return default
+
+    def for_term(self, term, session):
+        # {section: {class: fee}} for one term; the section's own fee is
+        # under ALL_CLASSES.
+        fees = {}
+
+        for (section, student_class, fee_term, fee_session), fee in self._current().items():
+            if fee_term == term and fee_session == session:
+                fees.setdefault(section, {})[student_class] = fee
+
+        return fees
+
+    def invalidate(self):
+        self._generation += 1
+        self._fees = None
+
+
+# =========================================================
+# FEE MATRIX
+# =========================================================
+# A session's fees edited as one grid of (section, class, term, fee)
+# rows and saved in one transaction. Each (section, session, term, class)
+# has one row, so saving is an upsert and duplicates cannot collect.
+
+def matrix_rows(session, rows):
+    # Cleans edited (section, class, term, fee) rows into parameter dicts.
+    # Rows without a section, term or fee are dropped, and a later row for
+    # a key replaces an earlier one.
+    cleaned = {}
+
+    for section, student_class, term, fee in rows:
+        section = str(section).strip() if section else ""
+        student_class = str(student_class).strip() if student_class else ALL_CLASSES
+        term = str(term).strip() if term else ""
+
+        if not section or not term or fee is None:
+            continue
+
+        cleaned[(section, student_class, term)] = {
+            "section": section,
+            "student_class": student_class,
+            "term": term,
+            "session": session,
+            "fee": float(fee),
+        }
+
+    return list(cleaned.values())
+
+
+# Postgres. Save Fee used to insert a row on every save; the latest one
+# is what an admin last set, so it is the one kept.
+FEE_MATRIX_SCHEMA = [
+    """
+    ALTER TABLE school_fee_settings
+    ADD COLUMN IF NOT EXISTS student_class TEXT NOT NULL DEFAULT ''
+    """,
+    """
+    DELETE FROM school_fee_settings f
+    USING school_fee_settings later
+    WHERE later.id > f.id
+    AND later.section IS NOT DISTINCT FROM f.section
+    AND later.session IS NOT DISTINCT FROM f.session
+    AND later.term IS NOT DISTINCT FROM f.term
+    AND later.student_class = f.student_class
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_fee_settings_key
+    ON school_fee_settings (section, session, term, student_class)
+    INCLUDE (fee_amount)
+    """,
+]
+
+
+def get_fee_matrix(engine, session):
+    from sqlalchemy import text
+
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            SELECT section, student_class, term, fee_amount
+            FROM school_fee_settings
+            WHERE session = :session
+            ORDER BY section, student_class, term
+        """), {"session": session}).fetchall()
+
+
+def save_fee_matrix(engine, session, rows):
+    # Replaces a session's fees with rows: each is upserted on its key and
+    # the session's fees not in rows are deleted. Returns the number saved.
+    from sqlalchemy import text
+
+    rows = matrix_rows(session, rows)
+    keep = {(r["section"], r["student_class"], r["term"]) for r in rows}
+
+    with engine.begin() as conn:
+        stale = [
+            fee_id
+            for fee_id, *key in conn.execute(text("""
+                SELECT id, section, student_class, term
+                FROM school_fee_settings
+                WHERE session = :session
+                FOR UPDATE
+            """), {"session": session})
+            if tuple(key) not in keep
+        ]
+
+        if stale:
+            conn.execute(text("""
+                DELETE FROM school_fee_settings
+                WHERE id = ANY(:ids)
+            """), {"ids": stale})
+
+        if rows:
+            conn.execute(text("""
+                INSERT INTO school_fee_settings
+                (section, student_class, term, session, fee_amount)
+                VALUES (:section, :student_class, :term, :session, :fee)
+                ON CONFLICT (section, session, term, student_class) DO UPDATE
+                SET fee_amount = EXCLUDED.fee_amount
+            """), rows)
+
+    return len(rows)
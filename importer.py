@@ -0,0 +1,134 @@
+import csv
+import io
+import time
+
+
+# Rows handed to the insert callback per transaction.
+IMPORT_CHUNK_SIZE = 1000
+
+
+class RowError(ValueError):
+    pass
+
+
+# =========================================================
+# FILE READERS
+# =========================================================
+
+def _normalize_header(name):
+    return str(name or "").strip().lower().replace(" ", "_")
+
+
+def _read_csv(file):
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+
+    try:
+        reader = csv.reader(text)
+        header = [_normalize_header(h) for h in next(reader, [])]
+        line = reader.line_num
+
+        for values in reader:
+            # A quoted field may span lines: a row starts on the line
+            # after the previous row ended.
+            row_line, line = line + 1, reader.line_num
+
+            if not any(v.strip() for v in values):
+                continue
+            yield row_line, dict(zip(header, values))
+
+    finally:
+        text.detach()
+
+
+def _read_xlsx(file):
+    # Only needed for Excel uploads.
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_normalize_header(h) for h in next(rows, ())]
+
+        # iter_rows starts at sheet row 1, empty rows included.
+        for row_line, values in enumerate(rows, start=2):
+            if all(v is None or str(v).strip() == "" for v in values):
+                continue
+            yield row_line, {
+                key: ("" if value is None else str(value))
+                for key, value in zip(header, values)
+            }
+
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    # Streams (line number, row) pairs, rows being dicts keyed by
+    # normalized header names, so the whole file is never materialized.
+    # Blank rows are skipped; line numbers are the file's own, so errors
+    # point at the right line.
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        return _read_xlsx(file)
+    return _read_csv(file)
+
+
+# =========================================================
+# IMPORT DRIVER
+# =========================================================
+
+def _flush(batch, insert_chunk, errors):
+    try:
+        insert_chunk([values for _, values in batch])
+        return len(batch)
+
+    except Exception:
+        # Retry row by row so one bad row does not sink the chunk.
+        inserted = 0
+
+        for row_number, values in batch:
+            try:
+                insert_chunk([values])
+                inserted += 1
+            except Exception as e:
+                errors.append({"row": row_number, "error": str(e)})
+
+        return inserted
+
+
+def import_rows(rows, prepare, insert_chunk, chunk_size=IMPORT_CHUNK_SIZE):
+    # prepare(row) returns the values to insert or raises RowError;
+    # insert_chunk(values_list) writes one chunk in one transaction.
+    started = time.perf_counter()
+
+    errors = []
+    batch = []
+    inserted = 0
+    total = 0
+
+    # rows: (line number, row) pairs, as read_rows yields them.
+    for row_number, row in rows:
+        total += 1
+
+        try:
+            batch.append((row_number, prepare(row)))
+        except RowError as e:
+            errors.append({"row": row_number, "error": str(e)})
+            continue
+
+        if len(batch) >= chunk_size:
+            inserted += _flush(batch, insert_chunk, errors)
+            batch = []
+
+    if batch:
+        inserted += _flush(batch, insert_chunk, errors)
+
+    seconds = time.perf_counter() - started
+
+    return {
+        "rows": total,
+        "inserted": inserted,
+        "errors": sorted(errors, key=lambda e: e["row"]),
+        "seconds": seconds,
+        "rows_per_second": total / seconds if seconds else 0,
+    }
@@ -0,0 +1,220 @@
+import re
+import time
+from datetime import datetime
+
+
+# A migration is (version, name, apply). apply is a list of SQL
+# statements or a function taking the open connection. Each migration runs
+# once per database, in version order, and is recorded in schema_version.
+# Never edit a released migration; append a new one instead.
+SCHEMA_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TEXT NOT NULL,
+        duration_ms REAL
+    )
+"""
+
+# Postgres: held while migrating, so only one process applies migrations.
+MIGRATION_LOCK_KEY = 719_200_019
+
+# Seconds between attempts to take the lock. Waiting inside
+# pg_advisory_lock() would be an open statement that the holder's
+# CREATE INDEX CONCURRENTLY waits for in turn: a deadlock.
+MIGRATION_LOCK_POLL = 0.5
+
+_CONCURRENT_INDEX = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)",
+    re.IGNORECASE
+)
+
+
+def _version_row(version, name, started):
+    return {
+        "version": version,
+        "name": name,
+        "applied_at": datetime.now().isoformat(timespec="seconds"),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+_RECORD_VERSION = """
+    INSERT INTO schema_version (version, name, applied_at, duration_ms)
+    VALUES (:version, :name, :applied_at, :duration_ms)
+"""
+
+
+def is_online(apply):
+    # Statement lists using CONCURRENTLY cannot run inside a transaction.
+    return not callable(apply) and any("CONCURRENTLY" in s.upper() for s in apply)
+
+
+# =========================================================
+# SQLITE
+# =========================================================
+
+class MigrationPending(Exception):
+    # Raised by a migration that cannot apply to this database yet. It is
+    # left unrecorded, so it is tried again the next time.
+    pass
+
+
+def migrate_sqlite(conn, migrations):
+    # Applies pending migrations on a sqlite3 connection, each in its own
+    # BEGIN IMMEDIATE transaction, so two processes opening the same file
+    # cannot apply one twice. SQLite has no online index build: CREATE
+    # INDEX blocks writers (WAL readers carry on) until it finishes.
+    # Returns the versions applied.
+    conn.execute(SCHEMA_VERSION_TABLE)
+    applied = []
+
+    for version, name, apply in sorted(migrations, key=lambda m: m[0]):
+        conn.execute("BEGIN IMMEDIATE")
+
+        try:
+            done = conn.execute(
+                "SELECT 1 FROM schema_version WHERE version = ?", (version,)
+            ).fetchone()
+
+            if done:
+                conn.rollback()
+                continue
+
+            started = time.perf_counter()
+
+            if callable(apply):
+                apply(conn)
+            else:
+                for statement in apply:
+                    conn.execute(statement)
+
+            conn.execute(_RECORD_VERSION, _version_row(version, name, started))
+            conn.commit()
+
+        except MigrationPending:
+            conn.rollback()
+            continue
+
+        except Exception:
+            conn.rollback()
+            raise
+
+        applied.append(version)
+
+    return applied
+
+
+def sqlite_plan(conn, sql, params=()):
+    return "\n".join(
+        row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)
+    )
+
+
+# =========================================================
+# POSTGRES
+# =========================================================
+
+def _drop_invalid_index(conn, statement):
+    # An interrupted CREATE INDEX CONCURRENTLY leaves an INVALID index that
+    # IF NOT EXISTS would then skip.
+    from sqlalchemy import text
+
+    match = _CONCURRENT_INDEX.search(statement)
+    if not match:
+        return
+
+    invalid = conn.execute(text("""
+        SELECT 1 FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = :name
+        AND pg_table_is_visible(c.oid)
+        AND NOT i.indisvalid
+    """), {"name": match.group(1)}).first()
+
+    if invalid:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)}"))
+
+
+def migrate_postgres(engine, migrations):
+    # Applies pending migrations under an advisory lock. Most run in one
+    # transaction each; statement lists using CONCURRENTLY run one by one
+    # in autocommit, so index builds do not block writes. Returns the
+    # versions applied.
+    from sqlalchemy import text
+
+    applied = []
+
+    # Autocommit, so the idle lock holder does not hold a snapshot that
+    # CREATE INDEX CONCURRENTLY would wait for.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock:
+        while not lock.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY}
+        ).scalar():
+            time.sleep(MIGRATION_LOCK_POLL)
+
+        try:
+            lock.execute(text(SCHEMA_VERSION_TABLE))
+            done = {
+                row[0] for row in lock.execute(text("SELECT version FROM schema_version"))
+            }
+
+            for version, name, apply in sorted(migrations, key=lambda m: m[0]):
+                if version in done:
+                    continue
+
+                started = time.perf_counter()
+
+                if is_online(apply):
+                    for statement in apply:
+                        _drop_invalid_index(lock, statement)
+                        lock.execute(text(statement))
+
+                    lock.execute(text(_RECORD_VERSION), _version_row(version, name, started))
+
+                else:
+                    with engine.begin() as conn:
+                        if callable(apply):
+                            apply(conn)
+                        else:
+                            for statement in apply:
+                                conn.execute(text(statement))
+
+                        conn.execute(
+                            text(_RECORD_VERSION), _version_row(version, name, started)
+                        )
+
+                applied.append(version)
+
+        finally:
+            lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+    return applied
+
+
+def postgres_plan(conn, sql, params=None):
+    # Sequential scans are disabled, so the plan shows whether an index
+    # can serve the query even on a table small enough to scan.
+    from sqlalchemy import text
+
+    conn.execute(text("SET LOCAL enable_seqscan = off"))
+    return "\n".join(
+        row[0] for row in conn.execute(text("EXPLAIN " + sql), params or {})
+    )
+
+
+# =========================================================
+# PLAN CHECKS
+# =========================================================
+
+def check_plan(plan, expected=(), unexpected=()):
+    # Returns what is wrong with the plan, or None.
+    missing = [e for e in expected if e not in plan]
+    present = [u for u in unexpected if u in plan]
+
+    if not missing and not present:
+        return None
+
+    problems = [f"missing {m!r}" for m in missing]
+    problems += [f"unexpected {p!r}" for p in present]
+    return "; ".join(problems)
@@ -1,5 +1,9 @@
 import uuid
+
+import database
+import importer
 from database import get_connection
+from fee_schedule import ALL_CLASSES, FeeSchedule, matrix_rows
 
 
 # =========================================================
@@ -48,6 +52,66 @@ def add_student(first_name, last_name, gender, section,
         conn.close()
 
 
+SECTIONS = ("Nursery", "Primary", "Secondary")
+
+
+def _prepare_student_row(row):
+    first_name = row.get("first_name", "").strip()
+    last_name = row.get("last_name", "").strip()
+    section = row.get("section", "").strip().title()
+
+    if not first_name or not last_name:
+        raise importer.RowError("first_name and last_name are required")
+
+    if section not in SECTIONS:
+        raise importer.RowError(f"unknown section {row.get('section')!r}")
+
+    return (
+        str(uuid.uuid4()),
+        first_name,
+        last_name,
+        row.get("gender", "").strip() or None,
+        section,
+        row.get("class", "").strip() or None,
+        row.get("parent_phone", "").strip() or None,
+        row.get("admission_date", "").strip() or None,
+        row.get("status", "").strip() or "Active"
+    )
+
+
+def _insert_student_chunk(rows):
+    conn = get_connection()
+
+    try:
+        conn.executemany("""
+            INSERT INTO students (
+                student_id,
+                first_name,
+                last_name,
+                gender,
+                section,
+                class,
+                parent_phone,
+                admission_date,
+                status
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        conn.commit()
+
+    finally:
+        conn.close()
+
+
+def import_students(file, filename, chunk_size=importer.IMPORT_CHUNK_SIZE):
+    return importer.import_rows(
+        importer.read_rows(file, filename),
+        _prepare_student_row,
+        _insert_student_chunk,
+        chunk_size
+    )
+
+
 def get_all_students():
     conn = get_connection()
     cursor = conn.cursor()
@@ -74,6 +138,96 @@ def get_all_students():
         conn.close()
 
 
+# Rows per page for the paginated lists.
+PAGE_SIZE = 50
+
+
+def _keyset_page(table, columns, row_id, direction, page_size):
+    # Pages newest first by rowid. "next" returns rows older than row_id,
+    # "prev" rows newer than it. Returns (rows, first, last) where
+    # first/last are the row_id cursors for the neighbouring pages.
+    if row_id is None:
+        where, order = "", "DESC"
+    elif direction == "prev":
+        where, order = "WHERE rowid > ?", "ASC"
+    else:
+        where, order = "WHERE rowid < ?", "DESC"
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(f"""
+            SELECT rowid AS row_id, {", ".join(columns)}
+            FROM {table}
+            {where}
+            ORDER BY rowid {order}
+            LIMIT ?
+        """, (() if row_id is None else (row_id,)) + (page_size,))
+
+        rows = cursor.fetchall()
+
+        if order == "ASC":
+            rows.reverse()
+
+        if not rows:
+            return rows, None, None
+        return rows, rows[0]["row_id"], rows[-1]["row_id"]
+
+    finally:
+        conn.close()
+
+
+def get_students_page(row_id=None, direction="next", page_size=PAGE_SIZE):
+    return _keyset_page(
+        "students",
+        ("student_id", "first_name", "last_name", "section", "class", "status"),
+        row_id,
+        direction,
+        page_size
+    )
+
+
+def _search_terms(query):
+    # Every word becomes a quoted prefix term, so user input can never
+    # be parsed as FTS5 syntax.
+    words = "".join(
+        ch if ch.isalnum() else " " for ch in str(query)
+    ).split()
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_students(query, limit=20):
+    terms = _search_terms(query)
+    if not terms:
+        return []
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            SELECT
+                s.student_id,
+                s.first_name,
+                s.last_name,
+                s.section,
+                s.class,
+                s.parent_phone
+            FROM students_fts
+            JOIN students s
+                ON s.rowid = students_fts.rowid
+            WHERE students_fts MATCH ?
+            ORDER BY students_fts.rank
+            LIMIT ?
+        """, (terms, limit))
+
+        return cursor.fetchall()
+
+    finally:
+        conn.close()
+
+
 def get_student(student_id):
     conn = get_connection()
     cursor = conn.cursor()
@@ -152,6 +306,16 @@ def get_payments():
         conn.close()
 
 
+def get_payments_page(row_id=None, direction="next", page_size=PAGE_SIZE):
+    return _keyset_page(
+        "payments",
+        ("payment_id", "student_id", "term", "session", "amount_paid", "payment_date"),
+        row_id,
+        direction,
+        page_size
+    )
+
+
 def get_student_payments(student_id):
     conn = get_connection()
     cursor = conn.cursor()
@@ -179,14 +343,18 @@ def get_student_payments(student_id):
 # DASHBOARD FUNCTIONS
 # =========================================================
 
+def _kpi(cursor, name):
+    cursor.execute("SELECT value FROM kpi_counters WHERE name = ?", (name,))
+    result = cursor.fetchone()
+    return result[0] if result else 0
+
+
 def total_students():
     conn = get_connection()
     cursor = conn.cursor()
 
     try:
-        cursor.execute("SELECT COUNT(*) FROM students")
-        result = cursor.fetchone()
-        return result[0] if result else 0
+        return int(_kpi(cursor, "students"))
     finally:
         conn.close()
 
@@ -195,590 +363,522 @@ def total_revenue(session=None):
     conn = get_connection()
     cursor = conn.cursor()
 
-    if session:
-        cursor.execute(
-            "SELECT IFNULL(SUM(amount_paid),0) FROM payments WHERE session = ?",
-            (session,)
-        )
-    else:
-        cursor.execute(
-            "SELECT IFNULL(SUM(amount_paid),0) FROM payments"
-        )
-
-    revenue = cursor.fetchone()[0]
-    conn.close()
-    return revenue
-
-# =========================================================
-# FEE MANAGEMENT
-# =========================================================
-
-def set_fee(section, term, session, total_fee):
-
-    conn = get_connection()
-    cursor = conn.cursor()
-
     try:
-        cursor.execute("""
-            SELECT id
-            FROM fees
-            WHERE section = ?
-            AND term = ?
-            AND session = ?
-        """, (section, term, session))
-
-        existing = cursor.fetchone()
-
-        if existing:
-            cursor.execute("""
-                UPDATE fees
-                SET total_fee = ?
-                WHERE section = ?
-                AND term = ?
-                AND session = ?
-            """, (total_fee, section, term, session))
-        else:
-            cursor.execute("""
-                INSERT INTO fees (
-                    section,
-                    term,
-                    session,
-                    total_fee
-                )
-                VALUES (?, ?, ?, ?)
-            """, (section, term, session, total_fee))
+        if session:
+            cursor.execute(
+                "SELECT IFNULL(SUM(total_paid),0) FROM revenue_rollup WHERE session = ?",
+                (session,)
+            )
+            return cursor.fetchone()[0]
 
-        conn.commit()
+        return _kpi(cursor, "revenue")
 
     finally:
         conn.close()
 
 
-def get_current_fee(section, term, session):
-
+def get_revenue_rollup(session=None, term=None, section=None):
+    # Pre-aggregated (session, term, section, day, payments, total_paid)
+    # rows from revenue_rollup, optionally filtered.
     conn = get_connection()
     cursor = conn.cursor()
 
     try:
-        cursor.execute("""
-            SELECT total_fee
-            FROM fees
-            WHERE section = ?
-            AND term = ?
-            AND session = ?
-        """, (section, term, session))
+        conditions = ["payments > 0"]
+        params = []
 
-        result = cursor.fetchone()
-        return result[0] if result else 0
+        for column, value in (("session", session), ("term", term), ("section", section)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+
+        cursor.execute(f"""
+            SELECT session, term, section, day, payments, total_paid
+            FROM revenue_rollup
+            WHERE {" AND ".join(conditions)}
+            ORDER BY session, term, section, day
+        """, params)
+
+        return cursor.fetchall()
 
     finally:
         conn.close()
 
 
+def rebuild_rollups():
+    database.rebuild_rollups()
+
+
 # =========================================================
-# PAYMENT CALCULATIONS
+# FEE MANAGEMENT
 # =========================================================
 
-def get_total_paid(student_id, term, session):
-
+def _load_fees():
     conn = get_connection()
     cursor = conn.cursor()
 
     try:
         cursor.execute("""
-            SELECT SUM(amount_paid)
-            FROM payments
-            WHERE student_id = ?
-            AND term = ?
-            AND session = ?
-        """, (student_id, term, session))
-
-        result = cursor.fetchone()
-        return result[0] if result and result[0] else 0
+            SELECT section, class, term, session, total_fee
+            FROM fees
+            ORDER BY id
+        """)
+        return cursor.fetchall()
 
     finally:
         conn.close()
 
 
-def get_previous_outstanding(student_id, current_session):
+# database name -> FeeSchedule, like the connection pools.
+_fee_schedules = {}
 
-    conn = get_connection()
-    cursor = conn.cursor()
 
-    try:
-        cursor.execute("""
-            SELECT section
-            FROM students
-            WHERE student_id = ?
-        """, (student_id,))
-        student = cursor.fetchone()
+def fee_schedule():
+    schedule = _fee_schedules.get(database.DB_NAME)
 
-        if not student:
-            return 0
+    if schedule is None:
+        schedule = _fee_schedules.setdefault(database.DB_NAME, FeeSchedule(_load_fees))
 
-        section = student[0]
+    return schedule
 
-        cursor.execute("""
-            SELECT DISTINCT session
-            FROM fees
-            WHERE session != ?
-        """, (current_session,))
-        sessions = cursor.fetchall()
 
-        total_outstanding = 0
+_UPSERT_FEE = """
+    INSERT INTO fees (section, class, term, session, total_fee)
+    VALUES (:section, :student_class, :term, :session, :fee)
+    ON CONFLICT (section, session, term, class) DO UPDATE
+    SET total_fee = excluded.total_fee
+"""
 
-        for sess in sessions:
-            session_name = sess[0]
 
-            cursor.execute("""
-                SELECT SUM(total_fee)
-                FROM fees
-                WHERE section = ?
-                AND session = ?
-            """, (section, session_name))
-            total_fee = cursor.fetchone()[0] or 0
-
-            cursor.execute("""
-                SELECT SUM(amount_paid)
-                FROM payments
-                WHERE student_id = ?
-                AND session = ?
-            """, (student_id, session_name))
-            total_paid = cursor.fetchone()[0] or 0
-
-            outstanding = max(total_fee - total_paid, 0)
-            total_outstanding += outstanding
-
-        return total_outstanding
-
-    finally:
-        conn.close()
-
-
-# =========================================================
-# SESSION PROMOTION
-# =========================================================
-
-def rollover_outstanding(new_session):
+def set_fee(section, term, session, total_fee, student_class=ALL_CLASSES):
 
     conn = get_connection()
     cursor = conn.cursor()
 
     try:
-        cursor.execute("SELECT student_id FROM students")
-        students = cursor.fetchall()
-
-        results = []
-
-        for student in students:
-            student_id = student[0]
-            outstanding = get_previous_outstanding(student_id, new_session)
+        cursor.execute(_UPSERT_FEE, {
+            "section": section,
+            "student_class": student_class or ALL_CLASSES,
+            "term": term,
+            "session": session,
+            "fee": total_fee,
+        })
 
-            results.append({
-                "student_id": student_id,
-                "outstanding": outstanding
-            })
-
-        return results
+        conn.commit()
+        fee_schedule().invalidate()
 
     finally:
         conn.close()
 
-import uuid
-from database import get_connection
 
+def get_current_fee(section, term, session, student_class=None):
+    return fee_schedule().get(section, term, session, student_class, 0)
 
-# =========================================================
-# STUDENT FUNCTIONS
-# =========================================================
 
-def add_student(first_name, last_name, gender, section,
-                student_class, parent_phone,
-                admission_date, status):
+def get_fee_matrix(session):
 
     conn = get_connection()
     cursor = conn.cursor()
 
     try:
-        student_id = str(uuid.uuid4())
-
         cursor.execute("""
-            INSERT INTO students (
-                student_id,
-                first_name,
-                last_name,
-                gender,
-                section,
-                class,
-                parent_phone,
-                admission_date,
-                status
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            student_id,
-            first_name,
-            last_name,
-            gender,
-            section,
-            student_class,
-            parent_phone,
-            admission_date,
-            status
-        ))
+            SELECT section, class, term, total_fee
+            FROM fees
+            WHERE session = ?
+            ORDER BY section, class, term
+        """, (session,))
 
-        conn.commit()
-        return student_id
+        return cursor.fetchall()
 
     finally:
         conn.close()
 
 
-def get_all_students():
+def save_fee_matrix(session, rows):
+    # Replaces a session's fees with (section, class, term, fee) rows in
+    # one transaction. Returns the number saved.
+    rows = matrix_rows(session, rows)
+    keep = {(r["section"], r["student_class"], r["term"]) for r in rows}
+
     conn = get_connection()
     cursor = conn.cursor()
 
     try:
-        cursor.execute("""
-            SELECT
-                student_id,
-                first_name,
-                last_name,
-                gender,
-                section,
-                class,
-                parent_phone,
-                admission_date,
-                status
-            FROM students
-            ORDER BY first_name ASC
-        """)
+        cursor.execute("BEGIN IMMEDIATE")
 
-        return cursor.fetchall()
+        cursor.execute("""
+            SELECT id, section, class, term
+            FROM fees
+            WHERE session = ?
+        """, (session,))
 
-    finally:
-        conn.close()
+        stale = [
+            (fee_id,)
+            for fee_id, *key in cursor.fetchall()
+            if tuple(key) not in keep
+        ]
 
+        cursor.executemany("DELETE FROM fees WHERE id = ?", stale)
+        cursor.executemany(_UPSERT_FEE, rows)
 
-def get_student(student_id):
-    conn = get_connection()
-    cursor = conn.cursor()
+        conn.commit()
+        fee_schedule().invalidate()
 
-    try:
-        cursor.execute("""
-            SELECT *
-            FROM students
-            WHERE student_id = ?
-        """, (student_id,))
-        return cursor.fetchone()
+        return len(rows)
 
     finally:
         conn.close()
 
 
 # =========================================================
-# PAYMENT FUNCTIONS
+# PAYMENT CALCULATIONS
 # =========================================================
 
-def add_payment(student_id, term, session,
-                amount_paid, payment_date):
+def get_total_paid(student_id, term, session):
 
     conn = get_connection()
     cursor = conn.cursor()
 
     try:
-        payment_id = str(uuid.uuid4())
-
         cursor.execute("""
-            INSERT INTO payments (
-                payment_id,
-                student_id,
-                term,
-                session,
-                amount_paid,
-                payment_date
-            )
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
-            payment_id,
-            student_id,
-            term,
-            session,
-            amount_paid,
-            payment_date
-        ))
+            SELECT total_paid
+            FROM payment_totals
+            WHERE student_id = ?
+            AND term = ?
+            AND session = ?
+        """, (student_id, term, session))
 
-        conn.commit()
-        return payment_id
+        result = cursor.fetchone()
+        return result[0] if result and result[0] else 0
 
     finally:
         conn.close()
 
 
-def get_payments():
+def get_balance(student_id, session):
+
     conn = get_connection()
     cursor = conn.cursor()
 
     try:
         cursor.execute("""
             SELECT
-                payment_id,
-                student_id,
-                term,
-                session,
-                amount_paid,
-                payment_date
-            FROM payments
-            ORDER BY payment_date DESC
-        """)
+                IFNULL((
+                    SELECT SUM(f.total_fee)
+                    FROM fees f
+                    WHERE f.section = s.section
+                    AND f.session = ?
+                    AND f.class = (
+                        SELECT MAX(c.class)
+                        FROM fees c
+                        WHERE c.section = f.section
+                        AND c.session = f.session
+                        AND c.term IS f.term
+                        AND c.class IN (IFNULL(s.class, ''), '')
+                    )
+                ), 0)
+                - IFNULL((
+                    SELECT SUM(t.total_paid)
+                    FROM payment_totals t
+                    WHERE t.student_id = s.student_id
+                    AND t.session = ?
+                ), 0)
+            FROM students s
+            WHERE s.student_id = ?
+        """, (session, session, student_id))
 
-        return cursor.fetchall()
+        result = cursor.fetchone()
+        return result[0] if result else 0
 
     finally:
         conn.close()
 
 
-def get_student_payments(student_id):
-    conn = get_connection()
-    cursor = conn.cursor()
+def rebuild_balances():
+    database.rebuild_balances()
+
+
+# SQLite caps bound parameters per statement, so id lists are chunked.
+ID_CHUNK_SIZE = 500
+
+# Per-session max(fee - paid, 0), summed per student. Fees are totalled
+# per (section, class, session) and payments come from the
+# trigger-maintained payment_totals table, so each student costs a few
+# index lookups. For each term the fee row used is the class's if there
+# is one, otherwise the section's: MAX(class) over the two, as any class
+# sorts after the blank ALL_CLASSES.
+_PREVIOUS_OUTSTANDING_SQL = """
+    WITH student_set AS (
+        SELECT student_id, section, IFNULL(class, '') AS class
+        FROM students
+        WHERE {student_filter}
+    ),
+    fee_totals AS (
+        SELECT g.section, g.class, f.session, SUM(f.total_fee) AS total_fee
+        FROM (SELECT DISTINCT section, class FROM student_set) g
+        JOIN fees f
+            ON f.section = g.section
+            AND f.class = (
+                SELECT MAX(c.class)
+                FROM fees c
+                WHERE c.section = f.section
+                AND c.session = f.session
+                AND c.term IS f.term
+                AND c.class IN (g.class, '')
+            )
+        WHERE f.session != ?
+        GROUP BY g.section, g.class, f.session
+    ),
+    paid_totals AS (
+        SELECT student_id, session, SUM(total_paid) AS total_paid
+        FROM payment_totals
+        WHERE student_id IN (SELECT student_id FROM student_set)
+        AND session != ?
+        GROUP BY student_id, session
+    )
+    SELECT
+        s.student_id,
+        SUM(MAX(IFNULL(f.total_fee, 0) - IFNULL(p.total_paid, 0), 0))
+            AS outstanding
+    FROM student_set s
+    LEFT JOIN fee_totals f
+        ON f.section = s.section
+        AND f.class = s.class
+    LEFT JOIN paid_totals p
+        ON p.student_id = s.student_id
+        AND p.session = f.session
+    GROUP BY s.student_id
+"""
 
-    try:
-        cursor.execute("""
-            SELECT
-                payment_id,
-                term,
-                session,
-                amount_paid,
-                payment_date
-            FROM payments
-            WHERE student_id = ?
-            ORDER BY payment_date DESC
-        """, (student_id,))
 
-        return cursor.fetchall()
+def get_previous_outstanding(student_id, current_session):
+    outstanding = get_previous_outstanding_bulk([student_id], current_session)
+    return outstanding.get(student_id, 0)
 
-    finally:
-        conn.close()
 
+def get_previous_outstanding_bulk(student_ids, current_session):
 
-# =========================================================
-# DASHBOARD FUNCTIONS
-# =========================================================
+    student_ids = list(dict.fromkeys(student_ids))
+    outstanding = dict.fromkeys(student_ids, 0)
 
-def total_students():
     conn = get_connection()
     cursor = conn.cursor()
 
     try:
-        cursor.execute("SELECT COUNT(*) FROM students")
-        result = cursor.fetchone()
-        return result[0] if result else 0
-    finally:
-        conn.close()
-
+        for i in range(0, len(student_ids), ID_CHUNK_SIZE):
+            chunk = student_ids[i:i + ID_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+
+            cursor.execute(
+                _PREVIOUS_OUTSTANDING_SQL.format(
+                    student_filter=f"student_id IN ({placeholders})"
+                ),
+                (*chunk, current_session, current_session)
+            )
 
-def total_revenue(session=None):
-    conn = get_connection()
-    cursor = conn.cursor()
+            for student_id, amount in cursor.fetchall():
+                outstanding[student_id] = amount
 
-    if session:
-        cursor.execute(
-            "SELECT IFNULL(SUM(amount_paid),0) FROM payments WHERE session = ?",
-            (session,)
-        )
-    else:
-        cursor.execute(
-            "SELECT IFNULL(SUM(amount_paid),0) FROM payments"
-        )
+        return outstanding
 
-    revenue = cursor.fetchone()[0]
-    conn.close()
-    return revenue
+    finally:
+        conn.close()
 
 
 # =========================================================
-# FEE MANAGEMENT
+# STATEMENTS
 # =========================================================
 
-def set_fee(section, term, session, total_fee):
+def get_statement_data(session, term, section=None, student_class=None):
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    filters = ["1 = 1"]
+    params = []
 
-    try:
-        cursor.execute("""
-            SELECT id
-            FROM fees
-            WHERE section = ?
-            AND term = ?
-            AND session = ?
-        """, (section, term, session))
-
-        existing = cursor.fetchone()
-
-        if existing:
-            cursor.execute("""
-                UPDATE fees
-                SET total_fee = ?
-                WHERE section = ?
-                AND term = ?
-                AND session = ?
-            """, (total_fee, section, term, session))
-        else:
-            cursor.execute("""
-                INSERT INTO fees (
-                    section,
-                    term,
-                    session,
-                    total_fee
-                )
-                VALUES (?, ?, ?, ?)
-            """, (section, term, session, total_fee))
-
-        conn.commit()
-
-    finally:
-        conn.close()
+    if section:
+        filters.append("section = ?")
+        params.append(section)
 
-
-def get_current_fee(section, term, session):
+    if student_class:
+        filters.append("class = ?")
+        params.append(student_class)
 
     conn = get_connection()
     cursor = conn.cursor()
 
     try:
         cursor.execute("""
-            SELECT total_fee
-            FROM fees
-            WHERE section = ?
-            AND term = ?
-            AND session = ?
-        """, (section, term, session))
-
-        result = cursor.fetchone()
-        return result[0] if result else 0
+            SELECT
+                s.student_id,
+                TRIM(IFNULL(s.first_name, '') || ' ' || IFNULL(s.last_name, '')),
+                s.section,
+                s.class,
+                o.outstanding,
+                IFNULL((
+                    SELECT t.total_paid
+                    FROM payment_totals t
+                    WHERE t.student_id = s.student_id
+                    AND t.term = ?
+                    AND t.session = ?
+                ), 0)
+            FROM students s
+            JOIN ({outstanding}) o
+                ON o.student_id = s.student_id
+            ORDER BY s.first_name, s.last_name
+        """.format(outstanding=_PREVIOUS_OUTSTANDING_SQL.format(
+            student_filter=" AND ".join(filters)
+        )), (term, session, *params, session, session))
+
+        rows = cursor.fetchall()
 
     finally:
         conn.close()
 
+    fees = fee_schedule()
+    statements = []
 
-# =========================================================
-# PAYMENT CALCULATIONS
-# =========================================================
+    for row in rows:
+        current_fee = fees.get(row[2], term, session, row[3]) or 0
 
-def get_total_paid(student_id, term, session):
+        statements.append({
+            "student_id": row[0],
+            "student_name": row[1],
+            "section": row[2],
+            "student_class": row[3],
+            "session": session,
+            "previous_outstanding": row[4],
+            "current_fee": current_fee,
+            "total_paid": row[5],
+            "amount_owed": row[4] + current_fee - row[5],
+        })
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    return statements
 
-    try:
-        cursor.execute("""
-            SELECT SUM(amount_paid)
-            FROM payments
-            WHERE student_id = ?
-            AND term = ?
-            AND session = ?
-        """, (student_id, term, session))
 
-        result = cursor.fetchone()
-        return result[0] if result and result[0] else 0
+# =========================================================
+# SESSION PROMOTION
+# =========================================================
 
-    finally:
-        conn.close()
+# Students written per transaction during rollover.
+ROLLOVER_CHUNK_SIZE = 5000
 
 
-def get_previous_outstanding(student_id, current_session):
+def rollover_outstanding(new_session, chunk_size=ROLLOVER_CHUNK_SIZE,
+                         resume=False):
 
     conn = get_connection()
     cursor = conn.cursor()
 
-    try:
-        cursor.execute("""
-            SELECT section
-            FROM students
-            WHERE student_id = ?
-        """, (student_id,))
-        student = cursor.fetchone()
+    upsert_sql = """
+        INSERT INTO outstanding_balances (student_id, session, amount)
+        SELECT student_id, ?, outstanding
+        FROM ({query})
+        WHERE true
+        ON CONFLICT(student_id, session)
+        DO UPDATE SET amount = excluded.amount
+    """
 
-        if not student:
-            return 0
+    try:
+        if resume:
+            # Every student still without a row for the session is pending.
+            # Ids are random, so students added since the interrupted run
+            # can sort anywhere, not only after the rows already written.
+            pending_sql = upsert_sql.format(query=_PREVIOUS_OUTSTANDING_SQL.format(
+                student_filter="""student_id IN (
+                    SELECT s.student_id
+                    FROM students s
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM outstanding_balances o
+                        WHERE o.session = ?
+                        AND o.student_id = s.student_id
+                    )
+                    ORDER BY s.student_id
+                    LIMIT ?
+                )"""
+            ))
+
+            while True:
+                cursor.execute(pending_sql, (
+                    new_session,
+                    new_session,
+                    chunk_size,
+                    new_session,
+                    new_session
+                ))
+                written = cursor.rowcount
+                conn.commit()
+
+                if written <= 0:
+                    break
 
-        section = student[0]
+        else:
+            chunk_sql = upsert_sql.format(query=_PREVIOUS_OUTSTANDING_SQL.format(
+                student_filter="student_id > ? AND student_id <= ?"
+            ))
+            last_id = ""
+
+            while True:
+                cursor.execute("""
+                    SELECT student_id
+                    FROM students
+                    WHERE student_id > ?
+                    ORDER BY student_id
+                    LIMIT 1 OFFSET ?
+                """, (last_id, chunk_size - 1))
+                boundary = cursor.fetchone()
+
+                if boundary is None:
+                    cursor.execute(
+                        "SELECT MAX(student_id) FROM students WHERE student_id > ?",
+                        (last_id,)
+                    )
+                    boundary = cursor.fetchone()
+
+                    if boundary[0] is None:
+                        break
+
+                upper_id = boundary[0]
+
+                cursor.execute(chunk_sql, (
+                    new_session,
+                    last_id,
+                    upper_id,
+                    new_session,
+                    new_session
+                ))
+                conn.commit()
+
+                last_id = upper_id
 
         cursor.execute("""
-            SELECT DISTINCT session
-            FROM fees
-            WHERE session != ?
-        """, (current_session,))
-        sessions = cursor.fetchall()
-
-        total_outstanding = 0
-
-        for sess in sessions:
-            session_name = sess[0]
-
-            cursor.execute("""
-                SELECT SUM(total_fee)
-                FROM fees
-                WHERE section = ?
-                AND session = ?
-            """, (section, session_name))
-            total_fee = cursor.fetchone()[0] or 0
+            SELECT student_id, amount
+            FROM outstanding_balances
+            WHERE session = ?
+            ORDER BY student_id
+        """, (new_session,))
 
-            cursor.execute("""
-                SELECT SUM(amount_paid)
-                FROM payments
-                WHERE student_id = ?
-                AND session = ?
-            """, (student_id, session_name))
-            total_paid = cursor.fetchone()[0] or 0
-
-            outstanding = max(total_fee - total_paid, 0)
-            total_outstanding += outstanding
-
-        return total_outstanding
+        return [
+            {"student_id": row[0], "outstanding": row[1]}
+            for row in cursor.fetchall()
+        ]
 
     finally:
         conn.close()
 
 
-# =========================================================
-# SESSION PROMOTION
-# =========================================================
-
-def rollover_outstanding(new_session):
-
+def delete_student(student_id):
+    # Foreign keys are enforced, so the student's payments go first, in the
+    # same transaction. The payments triggers take them out of the running
+    # totals and rollups; outstanding_balances rows cascade.
     conn = get_connection()
     cursor = conn.cursor()
 
     try:
-        cursor.execute("SELECT student_id FROM students")
-        students = cursor.fetchall()
-
-        results = []
-
-        for student in students:
-            student_id = student[0]
-            outstanding = get_previous_outstanding(student_id, new_session)
-
-            results.append({
-                "student_id": student_id,
-                "outstanding": outstanding
-            })
-
-        return results
+        cursor.execute("DELETE FROM payments WHERE student_id = ?", (student_id,))
+        cursor.execute("DELETE FROM students WHERE student_id = ?", (student_id,))
+        conn.commit()
 
     finally:
         conn.close()
-def delete_student(student_id):
-    import sqlite3
-    conn = sqlite3.connect("school.db")
-    cursor = conn.cursor()
-
-    cursor.execute("DELETE FROM students WHERE student_id = ?", (student_id,))
-    
-    conn.commit()
-    conn.close()
 
 #def delete_student(student_id):
 #    import sqlite3
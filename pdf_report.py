@@ -1,10 +1,92 @@
 from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.pdfgen import canvas
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from io import BytesIO
 import os
+import zipfile
 
+import models
 
-def generate_student_statement(
+
+# Statements rendered per worker task; keeps pickling overhead low.
+BATCH_TASK_SIZE = 25
+
+
+# =========================================================
+# STATEMENT TEMPLATE
+# =========================================================
+
+# (label, font, size, y) for every static line of the statement, in the
+# same positions the statement has always used.
+_LABELS = (
+    ("Student Name: ", "Helvetica", 12, 682),
+    ("Class: ", "Helvetica", 12, 657),
+    ("Section: ", "Helvetica", 12, 632),
+    ("Session: ", "Helvetica", 12, 607),
+    ("Financial Summary", "Helvetica-Bold", 13, 567),
+    ("Previous Outstanding: ", "Helvetica", 12, 537),
+    ("Current Term Fee: ", "Helvetica", 12, 512),
+    ("Total Paid: ", "Helvetica", 12, 487),
+    ("Amount Owed: ", "Helvetica", 12, 462),
+    ("Generated On: ", "Helvetica-Oblique", 10, 422),
+)
+
+_TITLE = "STUDENT FINANCIAL STATEMENT"
+
+# Registered in this order on every canvas so the template's internal
+# font names (/F1, /F2, ...) match each document.
+_FONTS = ("Helvetica", "Helvetica-Bold", "Helvetica-Oblique")
+
+_template = None
+
+
+class _StatementTemplate:
+    # The static title and labels, pre-rendered once per process as PDF
+    # text operators, plus where each value is drawn.
+
+    def __init__(self):
+        width, height = letter
+        scratch = canvas.Canvas(BytesIO(), pagesize=letter)
+        _register_fonts(scratch)
+
+        text_object = scratch.beginText()
+        text_object.setFont("Helvetica-Bold", 18)
+        text_object.setTextOrigin(
+            (width - stringWidth(_TITLE, "Helvetica-Bold", 18)) / 2,
+            height - 60
+        )
+        text_object.textOut(_TITLE)
+
+        self.value_positions = []
+
+        for label, font, size, y in _LABELS:
+            text_object.setFont(font, size)
+            text_object.setTextOrigin(50, y)
+            text_object.textOut(label)
+            self.value_positions.append(
+                (font, size, 50 + stringWidth(label, font, size), y)
+            )
+
+        self.code = text_object.getCode()
+
+
+def _register_fonts(c):
+    for font in _FONTS:
+        c.setFont(font, 12)
+
+
+def _get_template():
+    global _template
+
+    if _template is None:
+        _template = _StatementTemplate()
+    return _template
+
+
+def _draw_statement(
+    c,
     student_name,
     section,
     student_class,
@@ -14,66 +96,64 @@ def generate_student_statement(
     total_paid,
     amount_owed
 ):
+    template = _get_template()
+
+    _register_fonts(c)
+    c.addLiteral(template.code)
+
+    values = (
+        str(student_name),
+        str(student_class),
+        str(section),
+        str(session),
+        "",
+        f"₦{previous_outstanding:,.2f}",
+        f"₦{current_fee:,.2f}",
+        f"₦{total_paid:,.2f}",
+        f"₦{amount_owed:,.2f}",
+        datetime.now().strftime('%Y-%m-%d %H:%M'),
+    )
+
+    for (font, size, x, y), value in zip(template.value_positions, values):
+        if value:
+            c.setFont(font, size)
+            c.drawString(x, y, value)
+
+
+def _statement_file_name(student_name):
     # Clean file name (important for Streamlit Cloud)
     safe_name = student_name.replace(" ", "_")
-    file_name = f"{safe_name}_statement.pdf"
-
-    c = canvas.Canvas(file_name, pagesize=letter)
-    width, height = letter
-
-    y = height - 60
-
-    # Title
-    c.setFont("Helvetica-Bold", 18)
-    c.drawCentredString(width / 2, y, "STUDENT FINANCIAL STATEMENT")
-
-    y -= 50
-
-    c.setFont("Helvetica", 12)
-
-    # Student Info
-    c.drawString(50, y, f"Student Name: {student_name}")
-    y -= 25
-    c.drawString(50, y, f"Class: {student_class}")
-    y -= 25
-    c.drawString(50, y, f"Section: {section}")
-    y -= 25
-    c.drawString(50, y, f"Session: {session}")
-
-    y -= 40
-
-    # Financial Breakdown
-    c.setFont("Helvetica-Bold", 13)
-    c.drawString(50, y, "Financial Summary")
-    y -= 30
-
-    c.setFont("Helvetica", 12)
-    c.drawString(50, y, f"Previous Outstanding: ₦{previous_outstanding:,.2f}")
-    y -= 25
-    c.drawString(50, y, f"Current Term Fee: ₦{current_fee:,.2f}")
-    y -= 25
-    c.drawString(50, y, f"Total Paid: ₦{total_paid:,.2f}")
-    y -= 25
-    c.drawString(50, y, f"Amount Owed: ₦{amount_owed:,.2f}")
-
-    y -= 40
-
-    # Footer
-    c.setFont("Helvetica-Oblique", 10)
-    c.drawString(
-        50,
-        y,
-        f"Generated On: {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-    )
+    return f"{safe_name}_statement.pdf"
 
-    c.save()
 
-    return file_name
+def render_student_statement(
+    student_name,
+    section,
+    student_class,
+    session,
+    previous_outstanding,
+    current_fee,
+    total_paid,
+    amount_owed
+):
+    # Returns the statement PDF as bytes, ready for st.download_button.
+    buffer = BytesIO()
 
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from datetime import datetime
-import os
+    c = canvas.Canvas(buffer, pagesize=letter)
+    _draw_statement(
+        c,
+        student_name,
+        section,
+        student_class,
+        session,
+        previous_outstanding,
+        current_fee,
+        total_paid,
+        amount_owed
+    )
+    c.save()
+
+    return buffer.getvalue()
 
 
 def generate_student_statement(
@@ -86,58 +166,132 @@ def generate_student_statement(
     total_paid,
     amount_owed
 ):
-    # Clean file name (important for Streamlit Cloud)
-    safe_name = student_name.replace(" ", "_")
-    file_name = f"{safe_name}_statement.pdf"
-
-    c = canvas.Canvas(file_name, pagesize=letter)
-    width, height = letter
-
-    y = height - 60
-
-    # Title
-    c.setFont("Helvetica-Bold", 18)
-    c.drawCentredString(width / 2, y, "STUDENT FINANCIAL STATEMENT")
-
-    y -= 50
-
-    c.setFont("Helvetica", 12)
-
-    # Student Info
-    c.drawString(50, y, f"Student Name: {student_name}")
-    y -= 25
-    c.drawString(50, y, f"Class: {student_class}")
-    y -= 25
-    c.drawString(50, y, f"Section: {section}")
-    y -= 25
-    c.drawString(50, y, f"Session: {session}")
-
-    y -= 40
-
-    # Financial Breakdown
-    c.setFont("Helvetica-Bold", 13)
-    c.drawString(50, y, "Financial Summary")
-    y -= 30
-
-    c.setFont("Helvetica", 12)
-    c.drawString(50, y, f"Previous Outstanding: ₦{previous_outstanding:,.2f}")
-    y -= 25
-    c.drawString(50, y, f"Current Term Fee: ₦{current_fee:,.2f}")
-    y -= 25
-    c.drawString(50, y, f"Total Paid: ₦{total_paid:,.2f}")
-    y -= 25
-    c.drawString(50, y, f"Amount Owed: ₦{amount_owed:,.2f}")
-
-    y -= 40
-
-    # Footer
-    c.setFont("Helvetica-Oblique", 10)
-    c.drawString(
-        50,
-        y,
-        f"Generated On: {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+    file_name = _statement_file_name(student_name)
+
+    pdf = render_student_statement(
+        student_name,
+        section,
+        student_class,
+        session,
+        previous_outstanding,
+        current_fee,
+        total_paid,
+        amount_owed
     )
 
-    c.save()
+    with open(file_name, "wb") as f:
+        f.write(pdf)
 
     return file_name
+
+
+# =========================================================
+# BATCH STATEMENTS
+# =========================================================
+
+STATEMENT_FIELDS = (
+    "student_name",
+    "section",
+    "student_class",
+    "session",
+    "previous_outstanding",
+    "current_fee",
+    "total_paid",
+    "amount_owed",
+)
+
+
+def _render_chunk(statements):
+    # Runs in a worker process.
+    return [
+        render_student_statement(*(statement[field] for field in STATEMENT_FIELDS))
+        for statement in statements
+    ]
+
+
+def _render_all(statements, processes, progress):
+    total = len(statements)
+    rendered = [None] * total
+    done = 0
+
+    chunks = [
+        (start, statements[start:start + BATCH_TASK_SIZE])
+        for start in range(0, total, BATCH_TASK_SIZE)
+    ]
+
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as pool:
+        futures = {
+            pool.submit(_render_chunk, chunk): start
+            for start, chunk in chunks
+        }
+
+        for future in as_completed(futures):
+            start = futures[future]
+            pdfs = future.result()
+            rendered[start:start + len(pdfs)] = pdfs
+
+            done += len(pdfs)
+            if progress:
+                progress(done, total)
+
+    return rendered
+
+
+def _zip_statements(statements, pdfs):
+    buffer = BytesIO()
+    used = set()
+
+    # PDFs are already compressed, so they are stored as-is.
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for number, (statement, pdf) in enumerate(zip(statements, pdfs), start=1):
+            # Every entry carries the student id, or its position when there
+            # is none, so students sharing a name (or with none) each keep
+            # their own file.
+            student_name = statement.get("student_name") or "student"
+            key = statement.get("student_id") or number
+            name = _statement_file_name(f"{student_name} {key}".replace("/", "_"))
+
+            while name in used:
+                name = f"{number}_{name}"
+            used.add(name)
+
+            archive.writestr(name, pdf)
+
+    return buffer.getvalue()
+
+
+def _merge_statements(pdfs):
+    # Only needed for merged output.
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for pdf in pdfs:
+        writer.append(BytesIO(pdf))
+
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def generate_statements_batch(statements, output="zip", processes=None,
+                              progress=None):
+    # statements: dicts with STATEMENT_FIELDS keys (and optionally
+    # student_id). Returns the ZIP or merged PDF as bytes.
+    # progress(done, total) is called as worker chunks finish.
+    statements = list(statements)
+    pdfs = _render_all(statements, processes, progress)
+
+    if output == "pdf":
+        return _merge_statements(pdfs)
+    return _zip_statements(statements, pdfs)
+
+
+def generate_class_statements(session, term, section=None, student_class=None,
+                              output="zip", processes=None, progress=None):
+    statements = models.get_statement_data(
+        session, term, section=section, student_class=student_class
+    )
+
+    return generate_statements_batch(
+        statements, output=output, processes=processes, progress=progress
+    )
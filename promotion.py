@@ -0,0 +1,242 @@
+from sqlalchemy import text
+
+
+# Students updated per statement; all chunks share one transaction.
+PROMOTION_CHUNK_SIZE = 5000
+
+# (class, next class, next section). A next class of None graduates the
+# student. Seeded into class_progression, which admins can edit.
+DEFAULT_PROGRESSION = [
+    ("Nursery 1", "Nursery 2", "Nursery"),
+    ("Nursery 2", "Primary 1", "Primary"),
+    ("Primary 1", "Primary 2", "Primary"),
+    ("Primary 2", "Primary 3", "Primary"),
+    ("Primary 3", "Primary 4", "Primary"),
+    ("Primary 4", "Primary 5", "Primary"),
+    ("Primary 5", "Primary 6", "Primary"),
+    ("Primary 6", "JSS1", "Secondary"),
+    ("JSS1", "JSS2", "Secondary"),
+    ("JSS2", "JSS3", "Secondary"),
+    ("JSS3", "SS1", "Secondary"),
+    ("SS1", "SS2", "Secondary"),
+    ("SS2", "SS3", "Secondary"),
+    ("SS3", None, None),
+]
+
+PROMOTION_SCHEMA = [
+    """
+    ALTER TABLE students
+    ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'Active'
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS class_progression (
+        student_class TEXT PRIMARY KEY,
+        next_class TEXT,
+        next_section TEXT
+    )
+    """,
+    # Debt each student carried into a new session, as it stood when
+    # they were promoted.
+    """
+    CREATE TABLE IF NOT EXISTS balance_carry_forward (
+        student_id TEXT NOT NULL,
+        from_session TEXT,
+        to_session TEXT NOT NULL,
+        from_class TEXT,
+        to_class TEXT,
+        balance DOUBLE PRECISION NOT NULL DEFAULT 0,
+        created_at TIMESTAMP NOT NULL DEFAULT now(),
+        PRIMARY KEY (student_id, to_session)
+    )
+    """,
+]
+
+
+# One row per active student not yet in the new session, with where the
+# map sends them. Class names match ignoring case and spaces; students
+# whose class is not in the map keep it and only change session.
+_PLAN = """
+    SELECT s.id, s.student_id, s.session AS from_session,
+           s.student_class AS from_class, s.section AS from_section,
+           m.student_class IS NOT NULL AND m.next_class IS NULL AS graduating,
+           m.student_class IS NULL AS unmapped,
+           COALESCE(m.next_class, s.student_class) AS to_class,
+           COALESCE(m.next_section, s.section) AS to_section,
+           COALESCE(b.balance, 0) AS balance
+    FROM students s
+    LEFT JOIN class_progression m
+        ON lower(trim(m.student_class)) = lower(trim(s.student_class))
+    LEFT JOIN student_balances b ON b.student_id = s.student_id
+    WHERE s.status = 'Active'
+    AND s.session IS DISTINCT FROM :new_session
+"""
+
+
+# =========================================================
+# CLASS MAP
+# =========================================================
+
+def seed_progression(conn):
+    # Only fills an empty map, so admin edits are never overwritten.
+    if conn.execute(text("SELECT 1 FROM class_progression LIMIT 1")).first():
+        return
+
+    conn.execute(text("""
+        INSERT INTO class_progression (student_class, next_class, next_section)
+        VALUES (:student_class, :next_class, :next_section)
+    """), [
+        {"student_class": c, "next_class": n, "next_section": s}
+        for c, n, s in DEFAULT_PROGRESSION
+    ])
+
+
+def get_progression(engine):
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            SELECT student_class, next_class, next_section
+            FROM class_progression
+            ORDER BY student_class
+        """)).fetchall()
+
+
+def progression_rows(rows):
+    # Cleans edited (class, next class, next section) rows into parameter
+    # dicts. _PLAN matches classes ignoring case and spaces, so rows for
+    # "Primary 1" and "primary 1 " are one mapping and the later row wins;
+    # keeping both would give each of its students two plan rows.
+    cleaned = {}
+
+    for c, n, s in rows:
+        if not c or not str(c).strip():
+            continue
+
+        cleaned[str(c).strip().lower()] = {
+            "student_class": str(c).strip(),
+            "next_class": str(n).strip() if n else None,
+            "next_section": str(s).strip() if s else None,
+        }
+
+    return list(cleaned.values())
+
+
+def save_progression(engine, rows):
+    # rows: (class, next class, next section); replaces the whole map.
+    rows = progression_rows(rows)
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM class_progression"))
+
+        if rows:
+            conn.execute(text("""
+                INSERT INTO class_progression (student_class, next_class, next_section)
+                VALUES (:student_class, :next_class, :next_section)
+            """), rows)
+
+
+# =========================================================
+# PROMOTION
+# =========================================================
+
+def _summarize(conn, new_session):
+    moves = conn.execute(text(f"""
+        SELECT from_class,
+               CASE WHEN graduating THEN NULL ELSE to_class END AS to_class,
+               graduating, unmapped,
+               COUNT(*) AS students,
+               COALESCE(SUM(balance), 0) AS carried_forward
+        FROM ({_PLAN}) plan
+        GROUP BY 1, 2, 3, 4
+        ORDER BY 1, 2
+    """), {"new_session": new_session}).mappings().all()
+
+    moves = [dict(move) for move in moves]
+
+    return {
+        "new_session": new_session,
+        "promoted": sum(
+            m["students"] for m in moves
+            if not m["graduating"] and not m["unmapped"]
+        ),
+        "graduated": sum(m["students"] for m in moves if m["graduating"]),
+        "unmapped": sum(m["students"] for m in moves if m["unmapped"]),
+        "carried_forward": sum(m["carried_forward"] for m in moves),
+        "moves": moves,
+    }
+
+
+def _promote_chunk(conn, new_session, after_id, last_id):
+    params = {
+        "new_session": new_session,
+        "after_id": after_id,
+        "last_id": last_id,
+    }
+    chunk = f"SELECT * FROM ({_PLAN}) plan WHERE id > :after_id AND id <= :last_id"
+
+    conn.execute(text(f"""
+        INSERT INTO balance_carry_forward
+        (student_id, from_session, to_session, from_class, to_class, balance)
+        SELECT student_id, from_session, :new_session, from_class,
+               CASE WHEN graduating THEN NULL ELSE to_class END, balance
+        FROM ({chunk}) plan
+        WHERE student_id IS NOT NULL
+        ON CONFLICT (student_id, to_session) DO UPDATE
+        SET balance = EXCLUDED.balance,
+            to_class = EXCLUDED.to_class,
+            created_at = now()
+    """), params)
+
+    # Graduates keep their last class and session.
+    conn.execute(text(f"""
+        UPDATE students s
+        SET student_class = CASE WHEN plan.graduating
+                                 THEN s.student_class ELSE plan.to_class END,
+            section = CASE WHEN plan.graduating
+                           THEN s.section ELSE plan.to_section END,
+            session = CASE WHEN plan.graduating
+                           THEN s.session ELSE :new_session END,
+            status = CASE WHEN plan.graduating
+                          THEN 'Graduated' ELSE s.status END
+        FROM ({chunk}) plan
+        WHERE s.id = plan.id
+    """), params)
+
+
+def promote_students(engine, new_session, dry_run=False,
+                     chunk_size=PROMOTION_CHUNK_SIZE):
+    # Moves every active student to the next class for new_session,
+    # graduates the last class and records each student's carried-forward
+    # debt, all in one transaction. dry_run returns the same summary
+    # without writing anything.
+    new_session = new_session.strip()
+
+    if not new_session:
+        raise ValueError("New session is required")
+
+    with engine.begin() as conn:
+        if dry_run:
+            return _summarize(conn, new_session)
+
+        # Registrations and edits wait until the promotion commits.
+        conn.execute(text("LOCK TABLE students IN SHARE ROW EXCLUSIVE MODE"))
+
+        summary = _summarize(conn, new_session)
+
+        after_id = 0
+
+        while True:
+            last_id = conn.execute(text("""
+                SELECT MAX(id) FROM (
+                    SELECT id FROM students
+                    WHERE id > :after_id
+                    ORDER BY id
+                    LIMIT :chunk_size
+                ) chunk
+            """), {"after_id": after_id, "chunk_size": chunk_size}).scalar()
+
+            if last_id is None:
+                break
+
+            _promote_chunk(conn, new_session, after_id, last_id)
+            after_id = last_id
+
+    return summary
@@ -0,0 +1,128 @@
+import re
+import threading
+import weakref
+from collections import OrderedDict
+
+from sqlalchemy import event
+
+
+# Any of these keywords makes a statement count as a write. Over-matching
+# (e.g. SELECT ... FOR UPDATE) only costs an extra invalidation.
+_WRITE_KEYWORDS = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|CREATE|ALTER|DROP|LOCK|GRANT)\b",
+    re.IGNORECASE
+)
+
+
+def is_read_only(sql):
+    words = sql.lstrip().split(None, 1)
+    if not words or words[0].upper() not in ("SELECT", "WITH"):
+        return False
+    return not _WRITE_KEYWORDS.search(sql)
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+class QueryCache:
+    # Read results shared across all sessions of the process, keyed by
+    # SQL text and parameters. Every committed write bumps the data
+    # version and drops every entry, so readers only go to the database
+    # after something has changed. Memory is bounded by entry and row
+    # counts, evicting least recently used entries first.
+
+    def __init__(self, max_entries=256, max_rows=200_000):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+        self._engines = weakref.WeakSet()
+
+    def _key(self, sql, params):
+        try:
+            key = (sql, _freeze(params or {}))
+            hash(key)
+            return key
+        except TypeError:
+            return None
+
+    def get(self, sql, params=None):
+        key = self._key(sql, params)
+
+        with self._lock:
+            if key is not None and key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+
+            self.misses += 1
+            return False, None
+
+    def put(self, sql, params, rows, version):
+        # version is self.version as read before the query ran; a write
+        # that committed in between makes the result unsafe to keep.
+        key = self._key(sql, params)
+
+        if key is None or not is_read_only(sql) or len(rows) > self.max_rows:
+            return
+
+        with self._lock:
+            if version != self.version:
+                return
+
+            if key in self._entries:
+                self._rows -= len(self._entries.pop(key))
+
+            self._entries[key] = rows
+            self._rows += len(rows)
+
+            while (len(self._entries) > self.max_entries
+                   or self._rows > self.max_rows):
+                _, evicted = self._entries.popitem(last=False)
+                self._rows -= len(evicted)
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._rows = 0
+
+    def watch(self, engine):
+        # Marks pooled connections that ran a write, and invalidates when
+        # they are checked back in, i.e. after the transaction finished.
+        with self._lock:
+            if engine in self._engines:
+                return
+            self._engines.add(engine)
+
+        def mark_writes(conn, cursor, statement, parameters, context, executemany):
+            if not is_read_only(statement):
+                conn.info["query_cache_dirty"] = True
+
+        def invalidate_on_checkin(dbapi_connection, connection_record):
+            if connection_record.info.pop("query_cache_dirty", False):
+                self.invalidate()
+
+        event.listen(engine, "before_cursor_execute", mark_writes)
+        event.listen(engine, "checkin", invalidate_on_checkin)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "rows": self._rows,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
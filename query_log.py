@@ -0,0 +1,470 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from query_cache import is_read_only
+
+
+# Statements slower than this go to the slow-query log.
+SLOW_QUERY_MS = 200
+
+# JSON lines, one per slow statement. None keeps them in memory only.
+SLOW_QUERY_LOG_FILE = "slow_queries.log"
+
+# Slow statements kept in memory for the admin panel.
+SLOW_QUERY_HISTORY = 200
+
+# Distinct SQL texts tracked; the least recently run are dropped first.
+MAX_STATEMENTS = 500
+
+# None, "plan" (EXPLAIN / EXPLAIN QUERY PLAN) or "analyze" (EXPLAIN
+# ANALYZE, which runs the statement again, so only read-only ones).
+EXPLAIN_MODES = (None, "plan", "analyze")
+
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+# Frames in these files are plumbing, not callers.
+_SKIP_FILES = {__file__}
+_SKIP_PACKAGES = (os.sep + "sqlalchemy" + os.sep,)
+
+
+def _type_name(value):
+    if value is None:
+        return "null"
+    if isinstance(value, (list, tuple)):
+        return f"list[{len(value)}]"
+    return type(value).__name__
+
+
+def params_shape(params, many=False):
+    # Names and types of the parameters, never their values.
+    if many:
+        params = list(params or [])
+        return f"{len(params)} x {params_shape(params[0]) if params else '()'}"
+
+    if not params:
+        return ""
+
+    if isinstance(params, dict):
+        return "{" + ", ".join(
+            f"{key}: {_type_name(value)}" for key, value in params.items()
+        ) + "}"
+
+    return "(" + ", ".join(_type_name(value) for value in params) + ")"
+
+
+# code object -> "module.function", "file.py:" for module level code, or
+# None for plumbing frames. Looked up on every statement, so cached.
+_labels = {}
+
+
+def _label(code):
+    label = _labels.get(code, False)
+
+    if label is not False:
+        return label
+
+    filename = code.co_filename
+
+    if (filename in _SKIP_FILES or code.co_name == "run_query"
+            or any(p in filename for p in _SKIP_PACKAGES)):
+        label = None
+    elif code.co_name == "<module>":
+        label = os.path.basename(filename) + ":"
+    else:
+        label = f"{os.path.splitext(os.path.basename(filename))[0]}.{code.co_name}"
+
+    # Streamlit may compile the script again on each rerun.
+    if len(_labels) > 10_000:
+        _labels.clear()
+
+    _labels[code] = label
+    return label
+
+
+def _explainable(sql, mode):
+    words = sql.lstrip().split(None, 1)
+
+    if not words or words[0].upper() not in _EXPLAINABLE:
+        return False
+
+    return mode != "analyze" or is_read_only(sql)
+
+
+class QueryLog:
+    # Duration, rows and callers of every statement run through a watched
+    # engine or a TracedCursor, aggregated per SQL text. Statements over
+    # slow_ms are also written to the slow-query log, with their plan
+    # when explain is set. One instance per process.
+
+    def __init__(self, slow_ms=SLOW_QUERY_MS, log_file=SLOW_QUERY_LOG_FILE,
+                 explain=None, max_statements=MAX_STATEMENTS):
+        self.enabled = True
+        self.slow_ms = slow_ms
+        self.log_file = log_file
+        self.explain = explain
+        self.max_statements = max_statements
+
+        self._statements = OrderedDict()
+        self._slow = deque(maxlen=SLOW_QUERY_HISTORY)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._engines = weakref.WeakSet()
+
+    # -----------------------------------------------------
+    # Callers
+    # -----------------------------------------------------
+
+    def set_page(self, page):
+        # Streamlit runs each session's script on its own thread.
+        self._local.page = page
+
+    def _caller(self):
+        frame = sys._getframe(1)
+        label = None
+
+        while frame is not None:
+            label = _label(frame.f_code)
+            if label is not None:
+                break
+            frame = frame.f_back
+
+        if label is None:
+            label = "?"
+        elif label.endswith(":"):
+            label += str(frame.f_lineno)
+
+        page = getattr(self._local, "page", None)
+        return f"{page} / {label}" if page else label
+
+    # -----------------------------------------------------
+    # Recording
+    # -----------------------------------------------------
+
+    def record(self, sql, params, seconds, rows, caller, many=False, explain=None):
+        # explain(mode) returns the statement's plan, from its own connection.
+        ms = seconds * 1000
+
+        with self._lock:
+            stats = self._statements.get(sql)
+
+            if stats is None:
+                stats = self._statements[sql] = {
+                    "calls": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "rows": 0,
+                    "callers": set(),
+                    "params": params_shape(params, many),
+                }
+
+                while len(self._statements) > self.max_statements:
+                    self._statements.popitem(last=False)
+            else:
+                self._statements.move_to_end(sql)
+
+            stats["calls"] += 1
+            stats["total_ms"] += ms
+            stats["max_ms"] = max(stats["max_ms"], ms)
+            stats["rows"] += max(rows or 0, 0)
+
+            if len(stats["callers"]) < 20:
+                stats["callers"].add(caller)
+
+        if ms >= self.slow_ms:
+            self._log_slow(sql, params, ms, rows, caller, many, explain)
+
+    def _log_slow(self, sql, params, ms, rows, caller, many, explain):
+        mode = self.explain
+        plan = None
+
+        if mode and explain and not many and _explainable(sql, mode):
+            try:
+                plan = explain(mode)
+            except Exception as e:
+                plan = f"EXPLAIN failed: {e}"
+
+        entry = {
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "ms": round(ms, 3),
+            "rows": rows,
+            "caller": caller,
+            "params": params_shape(params, many),
+            "sql": " ".join(sql.split()),
+            "plan": plan,
+        }
+
+        with self._lock:
+            self._slow.append(entry)
+
+            if self.log_file:
+                try:
+                    with open(self.log_file, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry) + "\n")
+                except OSError:
+                    pass
+
+    # -----------------------------------------------------
+    # SQLAlchemy engines
+    # -----------------------------------------------------
+
+    def watch(self, engine):
+        from sqlalchemy import event
+
+        with self._lock:
+            if engine in self._engines:
+                return
+            self._engines.add(engine)
+
+        postgres = engine.dialect.name == "postgresql"
+
+        def before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_log_started", []).append(time.perf_counter())
+
+        def after(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["query_log_started"].pop()
+
+            if not self.enabled:
+                return
+
+            def explain(mode):
+                return _explain_dbapi(
+                    conn.connection, statement, parameters, mode, postgres
+                )
+
+            self.record(
+                statement, parameters, time.perf_counter() - started,
+                cursor.rowcount, self._caller(), executemany, explain
+            )
+
+        def failed(context):
+            conn = context.connection
+            started = conn.info.get("query_log_started") if conn is not None else None
+            if started:
+                started.pop()
+
+        event.listen(engine, "before_cursor_execute", before)
+        event.listen(engine, "after_cursor_execute", after)
+        event.listen(engine, "handle_error", failed)
+
+    # -----------------------------------------------------
+    # Reading
+    # -----------------------------------------------------
+
+    def top_statements(self, limit=20):
+        # Heaviest first by total time.
+        with self._lock:
+            rows = [
+                {
+                    "sql": " ".join(sql.split()),
+                    "calls": s["calls"],
+                    "total_ms": round(s["total_ms"], 3),
+                    "mean_ms": round(s["total_ms"] / s["calls"], 3),
+                    "max_ms": round(s["max_ms"], 3),
+                    "rows": s["rows"],
+                    "callers": ", ".join(sorted(s["callers"])),
+                    "params": s["params"],
+                }
+                for sql, s in self._statements.items()
+            ]
+
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows[:limit]
+
+    def slow_queries(self):
+        # Most recent first.
+        with self._lock:
+            return list(reversed(self._slow))
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._slow.clear()
+
+
+def _explain_dbapi(dbapi_connection, statement, parameters, mode, postgres):
+    # A plain sqlite3 cursor, so the plan itself is not traced.
+    cursor = dbapi_connection.cursor() if postgres else dbapi_connection.cursor(sqlite3.Cursor)
+
+    try:
+        if not postgres:
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+        # A failed statement would abort the caller's transaction.
+        prefix = "EXPLAIN ANALYZE " if mode == "analyze" else "EXPLAIN "
+        cursor.execute("SAVEPOINT query_log_explain")
+
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return "\n".join(row[0] for row in cursor.fetchall())
+        except Exception:
+            cursor.execute("ROLLBACK TO SAVEPOINT query_log_explain")
+            raise
+        finally:
+            cursor.execute("RELEASE SAVEPOINT query_log_explain")
+
+    finally:
+        cursor.close()
+
+
+QUERY_LOG = QueryLog()
+
+
+# =========================================================
+# SQLITE
+# =========================================================
+
+class TracedConnection(sqlite3.Connection):
+    # Every statement goes through a TracedCursor, including the
+    # connection's own execute shortcuts.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # id -> statement whose rows have not all been read yet. The
+        # cursors themselves are not kept, so they still close as soon
+        # as they are dropped.
+        self.pending_statements = {}
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or TracedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def finish_statements(self):
+        for pending in list(self.pending_statements.values()):
+            _finish(self, pending)
+
+
+def _finish(conn, pending):
+    if conn.pending_statements.pop(id(pending), None) is None:
+        return
+
+    sql, parameters, seconds, rows, caller = pending
+
+    def explain(mode):
+        return _explain_dbapi(conn, sql, parameters, mode, False)
+
+    QUERY_LOG.record(sql, parameters, seconds, rows, caller, explain=explain)
+
+
+class TracedCursor(sqlite3.Cursor):
+    # sqlite3 steps through a SELECT as rows are fetched, so a statement
+    # keeps adding time and rows until it runs out of rows, the cursor
+    # runs something else, or its connection is closed.
+    _pending = None
+
+    def _start(self, sql, parameters, started):
+        pending = self._pending = [
+            sql, parameters, time.perf_counter() - started,
+            max(self.rowcount, 0), QUERY_LOG._caller()
+        ]
+        self.connection.pending_statements[id(pending)] = pending
+
+    def _fetched(self, started, rows, exhausted):
+        pending = self._pending
+
+        if pending is not None:
+            pending[2] += time.perf_counter() - started
+            pending[3] += rows
+
+            if exhausted:
+                self.finish()
+
+    def finish(self):
+        pending, self._pending = self._pending, None
+
+        if pending is not None:
+            _finish(self.connection, pending)
+
+    def execute(self, sql, parameters=()):
+        self.finish()
+
+        if not QUERY_LOG.enabled:
+            return super().execute(sql, parameters)
+
+        started = time.perf_counter()
+
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._start(sql, parameters, started)
+
+    def executemany(self, sql, seq_of_parameters):
+        self.finish()
+
+        if not QUERY_LOG.enabled:
+            return super().executemany(sql, seq_of_parameters)
+
+        # The parameters may be a generator; keep a copy for their shape.
+        seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            QUERY_LOG.record(
+                sql, seq_of_parameters, time.perf_counter() - started,
+                self.rowcount, QUERY_LOG._caller(), many=True
+            )
+
+    def executescript(self, sql_script):
+        self.finish()
+        started = time.perf_counter()
+
+        try:
+            return super().executescript(sql_script)
+        finally:
+            if QUERY_LOG.enabled:
+                QUERY_LOG.record(
+                    sql_script, None, time.perf_counter() - started,
+                    0, QUERY_LOG._caller()
+                )
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+
+        self._fetched(started, 1, False)
+        return row
+
+    def close(self):
+        self.finish()
+        super().close()
@@ -0,0 +1,623 @@
+# Columnar copy of students, fees and payments for reporting. Reports
+# read Parquet files with pyarrow and pandas instead of scanning the live
+# tables, so heavy analytics do not compete with cashier writes.
+#
+#   python snapshot.py --database-url postgresql://...          # incremental
+#   python snapshot.py --database-url postgresql://... --full   # from scratch
+#
+# Layout, partitioned by session (hive style, values URL-quoted):
+#
+#   <dir>/students/session=2025/part-0000000000.parquet
+#   <dir>/school_fee_settings/session=2025/part-0000000000.parquet
+#   <dir>/payments/session=2025/part-0000000000.parquet
+#   <dir>/payments/session=2025/part-0000042624.parquet   (ids from 42624)
+#   <dir>/_state.json
+#
+# Students and fees change in place and carry no modification time, so
+# they are rewritten on every refresh; both are small. Payments are only
+# ever inserted or deleted, so a refresh fetches the rows past the
+# high-water mark (the largest id already copied) and re-copies just the
+# sessions whose older rows changed. Names starting with "_" are ignored
+# by readers.
+
+import argparse
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from urllib.parse import quote
+
+from sqlalchemy import text
+
+import exporter
+
+
+SNAPSHOT_DIR = "analytics_snapshot"
+
+SNAPSHOT_TABLES = ("students", "school_fee_settings", "payments")
+
+STATE_FILE = "_state.json"
+
+# Written for sessions that are NULL or ''; read back as null.
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# A payments partition with more files than this is rewritten as one.
+SNAPSHOT_MAX_PARTS = 20
+
+# Postgres advisory lock held while a refresh runs.
+SNAPSHOT_LOCK_KEY = 719_200_020
+
+
+def partition_name(session):
+    if session is None or session == "":
+        return "session=" + NULL_PARTITION
+    return "session=" + quote(str(session), safe="")
+
+
+def _part_file(first_id):
+    return f"part-{first_id:010d}.parquet"
+
+
+def _part_start(filename):
+    return int(filename[len("part-"):-len(".parquet")])
+
+
+# =========================================================
+# STATE
+# =========================================================
+# _state.json records the high-water mark, each payments partition's
+# [row count, sum of ids] up to it, and the column types of every table.
+
+def load_state(path=SNAPSHOT_DIR):
+    # None when there is no snapshot yet.
+    try:
+        with open(os.path.join(path, STATE_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _save_state(path, state):
+    # Replaced atomically: readers and the next refresh see the old state
+    # or the new one, never half of it.
+    target = os.path.join(path, STATE_FILE)
+
+    with open(target + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+
+    os.replace(target + ".tmp", target)
+
+
+def _swap_dir(new, target):
+    old = os.path.join(os.path.dirname(target), "_old-" + os.path.basename(target))
+
+    if os.path.exists(target):
+        os.rename(target, old)
+
+    os.rename(new, target)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def _recover(path, state):
+    # Undoes what an interrupted refresh left behind: half-swapped
+    # directories, scratch directories and payment files past the
+    # recorded high-water mark.
+    for table in SNAPSHOT_TABLES:
+        for directory in (path, os.path.join(path, table)):
+            if not os.path.isdir(directory):
+                continue
+
+            for entry in os.listdir(directory):
+                full = os.path.join(directory, entry)
+
+                if entry.startswith("_old-"):
+                    target = os.path.join(directory, entry[len("_old-"):])
+                    if os.path.exists(target):
+                        shutil.rmtree(full)
+                    else:
+                        os.rename(full, target)
+
+                elif entry.startswith("_tmp-"):
+                    shutil.rmtree(full)
+
+    payments = os.path.join(path, "payments")
+
+    for partition in os.listdir(payments) if os.path.isdir(payments) else []:
+        for filename in os.listdir(os.path.join(payments, partition)):
+            if _part_start(filename) > state["high_water"]:
+                os.remove(os.path.join(payments, partition, filename))
+
+
+# =========================================================
+# WRITING
+# =========================================================
+
+def _stream(conn, table, columns, where="", params=None,
+            batch_size=exporter.EXPORT_BATCH_SIZE):
+    # exporter.stream_rows on an open connection, so every table is read
+    # from the same transaction.
+    names = ", ".join(name for name, _ in columns)
+    result = conn.execution_options(
+        stream_results=True, max_row_buffer=batch_size
+    ).execute(
+        text(f"SELECT {names} FROM {table} {where} ORDER BY id"),
+        params or {},
+    )
+
+    for batch in result.partitions(batch_size):
+        yield batch
+
+
+def _write_partitions(batches, columns, table_dir, filename):
+    # Writes each row to <table_dir>/<partition>/<filename>, dropping the
+    # session column the directory name already holds. Returns
+    # {partition: [rows, sum of ids]}.
+    import pyarrow.parquet as pq
+
+    names = [name for name, _ in columns]
+    session_at = names.index("session")
+    id_at = names.index("id")
+    schema = exporter.arrow_schema(
+        [column for column in columns if column[0] != "session"]
+    )
+
+    writers = {}
+    stats = {}
+
+    try:
+        for batch in batches:
+            partitions = {}
+
+            for row in batch:
+                partition = partition_name(row[session_at])
+                partitions.setdefault(partition, []).append(
+                    row[:session_at] + row[session_at + 1:]
+                )
+                counts = stats.setdefault(partition, [0, 0])
+                counts[0] += 1
+                counts[1] += row[id_at]
+
+            for partition, rows in partitions.items():
+                if partition not in writers:
+                    os.makedirs(os.path.join(table_dir, partition), exist_ok=True)
+                    writers[partition] = pq.ParquetWriter(
+                        os.path.join(table_dir, partition, filename), schema
+                    )
+
+                writers[partition].write_table(exporter.arrow_table(rows, schema))
+
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    return stats
+
+
+def _copy_table(conn, table, columns, path, where="", params=None):
+    # Rewrites the whole table beside the old copy and swaps it in.
+    scratch = os.path.join(path, "_tmp-" + table)
+    shutil.rmtree(scratch, ignore_errors=True)
+    os.makedirs(scratch)
+
+    stats = _write_partitions(
+        _stream(conn, table, columns, where, params), columns, scratch, _part_file(0)
+    )
+    _swap_dir(scratch, os.path.join(path, table))
+    return stats
+
+
+def _changed_partitions(conn, state):
+    # Compares each session's [rows, sum of ids] up to the high-water mark
+    # with what was copied. Deletes change both. So does a payment whose
+    # id is below the mark but committed after the last refresh, as
+    # serial ids are not committed in order.
+    current = {}
+
+    for session, count, id_sum in conn.execute(text("""
+        SELECT session, COUNT(*), COALESCE(SUM(id), 0)
+        FROM payments
+        WHERE id <= :high_water
+        GROUP BY session
+    """), {"high_water": state["high_water"]}):
+        entry = current.setdefault(partition_name(session), [[], 0, 0])
+        entry[0].append(session)
+        entry[1] += count
+        entry[2] += int(id_sum)
+
+    copied = state["partitions"]
+    changed = sorted(
+        partition for partition in set(current) | set(copied)
+        if (current[partition][1:] if partition in current else None)
+        != copied.get(partition)
+    )
+
+    return changed, {p: current[p][0] for p in changed if p in current}
+
+
+def _refresh_payments(conn, columns, path, state, high_water):
+    # Returns (partitions, sessions re-copied, new rows).
+    table_dir = os.path.join(path, "payments")
+    partitions = dict(state["partitions"])
+    changed, sessions = _changed_partitions(conn, state)
+
+    if changed:
+        values = [s for values in sessions.values() for s in values]
+        scratch = os.path.join(table_dir, "_tmp-rebuild")
+        shutil.rmtree(scratch, ignore_errors=True)
+
+        rebuilt = _write_partitions(
+            _stream(conn, "payments", columns, """
+                WHERE id <= :high_water
+                AND (session = ANY(:sessions) OR (:nulls AND session IS NULL))
+            """, {
+                "high_water": state["high_water"],
+                "sessions": [s for s in values if s is not None],
+                "nulls": None in values,
+            }),
+            columns, scratch, _part_file(0),
+        )
+
+        for partition in changed:
+            target = os.path.join(table_dir, partition)
+
+            if partition in rebuilt:
+                _swap_dir(os.path.join(scratch, partition), target)
+                partitions[partition] = rebuilt[partition]
+            else:
+                shutil.rmtree(target, ignore_errors=True)
+                partitions.pop(partition, None)
+
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    added = _write_partitions(
+        _stream(conn, "payments", columns, """
+            WHERE id > :previous AND id <= :high_water
+        """, {"previous": state["high_water"], "high_water": high_water}),
+        columns, table_dir, _part_file(state["high_water"] + 1),
+    )
+
+    for partition, (count, id_sum) in added.items():
+        total = partitions.setdefault(partition, [0, 0])
+        partitions[partition] = [total[0] + count, total[1] + id_sum]
+
+    return partitions, changed, sum(count for count, _ in added.values())
+
+
+def _compact(path):
+    # Every incremental refresh adds a file per session it touched.
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    table_dir = os.path.join(path, "payments")
+    compacted = []
+
+    for partition in sorted(os.listdir(table_dir)):
+        source = os.path.join(table_dir, partition)
+
+        if partition.startswith("_") or len(os.listdir(source)) <= SNAPSHOT_MAX_PARTS:
+            continue
+
+        files = sorted(os.path.join(source, f) for f in os.listdir(source))
+        dataset = ds.dataset(files, format="parquet")
+        scratch = os.path.join(table_dir, "_tmp-compact")
+        shutil.rmtree(scratch, ignore_errors=True)
+        os.makedirs(scratch)
+
+        with pq.ParquetWriter(os.path.join(scratch, _part_file(0)), dataset.schema) as writer:
+            for batch in dataset.to_batches():
+                writer.write_batch(batch)
+
+        _swap_dir(scratch, source)
+        compacted.append(partition)
+
+    return compacted
+
+
+def refresh_snapshot(engine, path=SNAPSHOT_DIR, full=False):
+    # Brings the snapshot up to date and returns a summary, or None when
+    # another refresh (a second admin, a scheduled job) is running: two at
+    # once would both write the scratch directories and _state.json.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock:
+        if not lock.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": SNAPSHOT_LOCK_KEY}
+        ).scalar():
+            return None
+
+        try:
+            return _refresh(engine, path, full)
+        finally:
+            lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SNAPSHOT_LOCK_KEY})
+
+
+def _refresh(engine, path, full):
+    # All three tables are read in one REPEATABLE READ transaction, so the
+    # copy is consistent; being read only, it never blocks cashier writes.
+    started = time.perf_counter()
+    os.makedirs(path, exist_ok=True)
+
+    state = None if full else load_state(path)
+    if state:
+        _recover(path, state)
+
+    columns = {table: exporter.table_columns(engine, table) for table in SNAPSHOT_TABLES}
+
+    with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+        with conn.begin():
+            conn.execute(text("SET TRANSACTION READ ONLY"))
+
+            high_water = conn.execute(
+                text("SELECT COALESCE(MAX(id), 0) FROM payments")
+            ).scalar()
+
+            rows = {}
+
+            for table in ("students", "school_fee_settings"):
+                stats = _copy_table(conn, table, columns[table], path)
+                rows[table] = sum(count for count, _ in stats.values())
+
+            if state is None:
+                partitions = _copy_table(
+                    conn, "payments", columns["payments"], path,
+                    "WHERE id <= :high_water", {"high_water": high_water},
+                )
+                rebuilt = sorted(partitions)
+                added = sum(count for count, _ in partitions.values())
+            else:
+                partitions, rebuilt, added = _refresh_payments(
+                    conn, columns["payments"], path, state, high_water
+                )
+
+    rows["payments"] = sum(count for count, _ in partitions.values())
+
+    _save_state(path, {
+        "refreshed_at": datetime.now().isoformat(timespec="seconds"),
+        "high_water": high_water,
+        "partitions": partitions,
+        "columns": columns,
+        "rows": rows,
+    })
+
+    compacted = _compact(path)
+
+    return {
+        "full": state is None,
+        "rows": rows,
+        "new_payments": added,
+        "rebuilt": rebuilt,
+        "compacted": compacted,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+# =========================================================
+# READING
+# =========================================================
+
+def read_table(path, table, columns=None, session=None):
+    # The snapshot of `table` as an Arrow table. Giving a session only
+    # opens that session's directory.
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    state = load_state(path)
+    if state is None:
+        raise FileNotFoundError(f"No snapshot in {path}; refresh it first")
+
+    table_dir = os.path.join(path, table)
+    dataset = ds.dataset(
+        table_dir if os.path.isdir(table_dir) else [],
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([("session", pa.string())]), flavor="hive"),
+    )
+
+    if not dataset.files:
+        schema = exporter.arrow_schema(state["columns"][table])
+        empty = schema.empty_table()
+        return empty.select(columns) if columns else empty
+
+    return dataset.to_table(
+        columns=columns,
+        filter=None if session is None else ds.field("session") == session,
+    )
+
+
+def _sections(path):
+    # One section per student (the smallest, should the id repeat); like
+    # revenue_rollup, payments count under their student's current section.
+    import pyarrow.compute as pc
+
+    students = read_table(path, "students", ["student_id", "section"])
+    sections = students.group_by("student_id").aggregate([("section", "min")])
+    return sections.set_column(
+        1, "section", pc.fill_null(sections["section_min"], "")
+    )
+
+
+def _fill(table, column, value=""):
+    import pyarrow.compute as pc
+
+    at = table.schema.get_field_index(column)
+    return table.set_column(at, column, pc.fill_null(table[column], value))
+
+
+# =========================================================
+# REPORTS
+# =========================================================
+# Aggregation runs in Arrow; each returns a DataFrame shaped like the
+# live report it replaces.
+
+def totals(path=SNAPSHOT_DIR):
+    import pyarrow.compute as pc
+
+    revenue = pc.sum(read_table(path, "payments", ["amount_paid"])["amount_paid"]).as_py()
+    rows = load_state(path)["rows"]
+
+    return {
+        "students": rows["students"],
+        "payments": rows["payments"],
+        "revenue": revenue or 0.0,
+    }
+
+
+def revenue_by_session(path=SNAPSHOT_DIR):
+    payments = _fill(read_table(path, "payments", ["session", "amount_paid"]), "session")
+
+    return (
+        payments.group_by("session")
+        .aggregate([("amount_paid", "sum")])
+        .sort_by("session")
+        .rename_columns(["Session", "Revenue"])
+        .to_pandas()
+    )
+
+
+def revenue_breakdown(path, session):
+    payments = read_table(path, "payments", ["student_id", "term", "amount_paid"], session)
+    payments = payments.join(_sections(path), "student_id")
+    payments = _fill(_fill(payments, "term"), "section")
+
+    return (
+        payments.group_by(["term", "section"])
+        .aggregate([([], "count_all"), ("amount_paid", "sum")])
+        .sort_by([("term", "ascending"), ("section", "ascending")])
+        .rename_columns(["Term", "Section", "Payments", "Revenue"])
+        .to_pandas()
+    )
+
+
+def debt_report(path=SNAPSHOT_DIR):
+    # SUM(balance) per student, named as rebuild_balances names them.
+    import pyarrow.compute as pc
+
+    payments = read_table(path, "payments", ["student_id", "student_name", "balance"])
+    payments = payments.filter(pc.is_valid(payments["student_id"]))
+
+    debts = payments.group_by("student_id").aggregate([
+        ("student_name", "max"),
+        ("balance", "sum"),
+    ])
+    debts = debts.filter(pc.greater(debts["balance_sum"], 0))
+
+    return (
+        debts.sort_by([("balance_sum", "descending")])
+        .select(["student_name_max", "balance_sum"])
+        .rename_columns(["Student", "Debt"])
+        .to_pandas()
+    )
+
+
+def collection_report(path, session):
+    # Fees billed against payments collected per term and section. A
+    # student is billed for every session from admission_session to their
+    # current session, at their class's fee for the term if one is set,
+    # otherwise their section's. Fee is the section's own fee.
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    students = read_table(
+        path, "students",
+        ["student_id", "section", "student_class", "admission_session", "session"],
+    )
+    enrolled = students.filter(
+        pc.and_kleene(
+            pc.or_kleene(
+                pc.is_null(students["admission_session"]),
+                pc.less_equal(students["admission_session"], session),
+            ),
+            pc.or_kleene(
+                pc.is_null(students["session"]),
+                pc.greater_equal(students["session"], session),
+            ),
+        )
+    )
+    headcount = (
+        enrolled.group_by("student_id")
+        .aggregate([("section", "min"), ("student_class", "min")])
+        .rename_columns(["student_id", "section", "student_class"])
+    )
+    headcount = _fill(_fill(headcount, "section"), "student_class").group_by(
+        ["section", "student_class"]
+    ).aggregate([([], "count_all")]).rename_columns(["section", "student_class", "students"])
+
+    fees = read_table(
+        path, "school_fee_settings", ["section", "student_class", "term", "fee_amount"], session
+    )
+    fees = _fill(_fill(_fill(fees, "section"), "term"), "student_class")
+    is_section_fee = pc.equal(fees["student_class"], "")
+    section_fees = fees.filter(is_section_fee).drop_columns(["student_class"])
+
+    class_billed = headcount.join(
+        fees.filter(pc.invert(is_section_fee)), ["section", "student_class"],
+        join_type="inner",
+    )
+    section_billed = headcount.join(section_fees, "section", join_type="inner").join(
+        class_billed.select(["section", "student_class", "term"]),
+        ["section", "student_class", "term"], join_type="left anti",
+    )
+    billed = pa.concat_tables([
+        class_billed, section_billed.select(class_billed.column_names),
+    ])
+    billed = billed.append_column(
+        "expected", pc.multiply(billed["fee_amount"], billed["students"])
+    ).group_by(["term", "section"]).aggregate(
+        [("students", "sum"), ("expected", "sum")]
+    ).rename_columns(["term", "section", "students", "expected"])
+
+    payments = read_table(path, "payments", ["student_id", "term", "amount_paid"], session)
+    payments = _fill(_fill(payments.join(_sections(path), "student_id"), "term"), "section")
+    collected = payments.group_by(["term", "section"]).aggregate(
+        [("amount_paid", "sum")]
+    ).rename_columns(["term", "section", "collected"])
+
+    report = (
+        fees.group_by(["term", "section"]).aggregate([])
+        .join(section_fees.select(["term", "section", "fee_amount"]), ["term", "section"])
+        .join(billed, ["term", "section"])
+        .join(collected, ["term", "section"], join_type="full outer")
+        .to_pandas()
+        .fillna({"students": 0, "fee_amount": 0, "expected": 0, "collected": 0})
+    )
+    report["students"] = report["students"].astype("int64")
+    report["outstanding"] = report["expected"] - report["collected"]
+    report["rate"] = (
+        report["collected"] / report["expected"].where(report["expected"] > 0)
+    ).round(4)
+
+    return report.sort_values(["term", "section"])[[
+        "term", "section", "students", "fee_amount",
+        "expected", "collected", "outstanding", "rate",
+    ]].rename(columns={
+        "term": "Term",
+        "section": "Section",
+        "students": "Students",
+        "fee_amount": "Fee",
+        "expected": "Expected",
+        "collected": "Collected",
+        "outstanding": "Outstanding",
+        "rate": "Collection Rate",
+    }).reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh the Parquet reporting snapshot")
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--path", default=SNAPSHOT_DIR)
+    parser.add_argument("--full", action="store_true", help="discard and copy everything")
+    args = parser.parse_args(argv)
+
+    from sqlalchemy import create_engine
+
+    engine = create_engine(args.database_url)
+    summary = refresh_snapshot(engine, args.path, full=args.full)
+    engine.dispose()
+
+    if summary is None:
+        print("Another refresh is running; skipped.")
+        return
+
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
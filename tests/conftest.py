@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    # A database file of its own; the pool migrates it on first connect.
+    path = str(tmp_path / "school.db")
+    monkeypatch.setattr(database, "DB_NAME", path)
+
+    yield path
+
+    database.close_all_connections()
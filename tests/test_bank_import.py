@@ -0,0 +1,34 @@
+import io
+
+import bank_import
+import importer
+
+
+STATEMENT = (
+    "Date,Narration,Credit\r\n"
+    "2026-01-05,Fees STU001,50000\r\n"
+    "2026-01-05,Fees STU001,50000\r\n"
+    "2026-01-06,Transfer Ada Obi,\"12,500.00\"\r\n"
+)
+
+
+def _parse(data):
+    return bank_import.parse_statement(
+        importer.read_rows(io.BytesIO(data.encode()), "statement.csv")
+    )
+
+
+def test_fingerprints_ignore_blank_rows():
+    lines = _parse(STATEMENT)
+    padded = _parse(STATEMENT.replace("\r\n", "\r\n\r\n", 2))
+
+    assert [line["fingerprint"] for line in padded] == \
+        [line["fingerprint"] for line in lines]
+    assert len({line["fingerprint"] for line in lines}) == 3
+
+
+def test_lines_report_file_line_numbers():
+    lines = _parse(STATEMENT.replace("\r\n", "\r\n\r\n", 2))
+
+    assert [line["row"] for line in lines] == [3, 5, 6]
+    assert lines[2]["amount"] == 12500.0
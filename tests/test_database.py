@@ -0,0 +1,175 @@
+import sqlite3
+
+import pytest
+
+import database
+import models
+
+
+def test_second_close_does_not_pool_the_connection_twice(db_path):
+    conn = database.get_connection()
+    conn.close()
+    conn.close()
+
+    first = database.get_connection()
+    second = database.get_connection()
+
+    try:
+        assert first is conn
+        assert second is not first
+    finally:
+        first.close()
+        second.close()
+
+
+def test_foreign_keys_are_enforced(db_path):
+    conn = database.get_connection()
+
+    try:
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute(
+                "INSERT INTO payments (payment_id, student_id) VALUES ('p1', 'missing')"
+            )
+    finally:
+        conn.close()
+
+
+def test_delete_student_with_payments(db_path):
+    student_id = models.add_student(
+        "Ada", "Obi", "Female", "Primary", "1", "080", "2025-09-01", "Active"
+    )
+    models.add_payment(student_id, "First Term", "2025", 5000, "2025-10-01")
+    models.add_payment(student_id, "Second Term", "2025", 2500, "2025-12-01")
+
+    models.delete_student(student_id)
+
+    assert models.get_student(student_id) is None
+    assert models.get_student_payments(student_id) == []
+    assert models.get_total_paid(student_id, "First Term", "2025") == 0
+    assert models.total_revenue() == 0
+
+
+def _add_school():
+    # Six students over two sections, each paying in two terms.
+    student_ids = [
+        models.add_student(
+            f"First{n}", f"Last{n}", "Male", ("Primary", "Secondary")[n % 2],
+            "1", "080", "2025-09-01", "Active"
+        )
+        for n in range(6)
+    ]
+    payment_ids = [
+        models.add_payment(student_id, term, "2025", 1000 * (n + 1), day)
+        for n, student_id in enumerate(student_ids)
+        for term, day in (("First Term", "2025-10-01"), ("Second Term", "2026-01-10"))
+    ]
+    return student_ids, payment_ids
+
+
+def _edit_payments(conn, student_ids, payment_ids):
+    conn.execute("UPDATE payments SET amount_paid = 7777 WHERE payment_id = ?", (payment_ids[0],))
+    conn.execute("UPDATE payments SET term = 'Third Term' WHERE payment_id = ?", (payment_ids[1],))
+    conn.execute(
+        "UPDATE payments SET session = '2026', payment_date = '2026-02-02' WHERE payment_id = ?",
+        (payment_ids[2],)
+    )
+    conn.execute("UPDATE payments SET amount_paid = NULL WHERE payment_id = ?", (payment_ids[3],))
+    conn.execute("DELETE FROM payments WHERE payment_id = ?", (payment_ids[4],))
+    conn.execute("UPDATE students SET section = 'Nursery' WHERE student_id = ?", (student_ids[1],))
+    conn.commit()
+
+
+def test_revenue_rollup_follows_payment_and_student_changes(db_path):
+    student_ids, payment_ids = _add_school()
+
+    conn = database.get_connection()
+
+    try:
+        _edit_payments(conn, student_ids, payment_ids)
+    finally:
+        conn.close()
+
+    models.delete_student(student_ids[5])
+    models.add_payment(student_ids[0], "First Term", "2025", 300, "2025-10-01")
+
+    conn = database.get_connection()
+
+    try:
+        rollup = conn.execute("""
+            SELECT session, term, section, day, payments, total_paid
+            FROM revenue_rollup
+            WHERE payments <> 0 OR total_paid <> 0
+            ORDER BY 1, 2, 3, 4
+        """).fetchall()
+        expected = conn.execute("""
+            SELECT p.session, p.term, s.section, date(p.payment_date),
+                   COUNT(*), IFNULL(SUM(p.amount_paid), 0)
+            FROM payments p
+            JOIN students s ON s.student_id = p.student_id
+            GROUP BY 1, 2, 3, 4
+            ORDER BY 1, 2, 3, 4
+        """).fetchall()
+        counters = dict(conn.execute("SELECT name, value FROM kpi_counters"))
+        students, payments, revenue = conn.execute("""
+            SELECT (SELECT COUNT(*) FROM students),
+                   (SELECT COUNT(*) FROM payments),
+                   (SELECT IFNULL(SUM(amount_paid), 0) FROM payments)
+        """).fetchone()
+        session_revenue = conn.execute(
+            "SELECT IFNULL(SUM(amount_paid), 0) FROM payments WHERE session = '2025'"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+    assert [tuple(row) for row in rollup] == [tuple(row) for row in expected]
+    assert any(row[2] == "Nursery" for row in rollup)
+    assert counters == {"students": students, "payments": payments, "revenue": revenue}
+    assert models.total_students() == students == 5
+    assert models.total_revenue() == revenue
+    assert models.total_revenue("2025") == session_revenue
+
+
+def test_payment_totals_follow_moved_and_deleted_payments(db_path):
+    student_ids, payment_ids = _add_school()
+
+    conn = database.get_connection()
+
+    try:
+        _edit_payments(conn, student_ids, payment_ids)
+        # A payment handed to another student.
+        conn.execute(
+            "UPDATE payments SET student_id = ? WHERE payment_id = ?",
+            (student_ids[3], payment_ids[5])
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    models.delete_student(student_ids[4])
+
+    conn = database.get_connection()
+
+    try:
+        totals = conn.execute("""
+            SELECT student_id, session, term, total_paid
+            FROM payment_totals
+            WHERE total_paid <> 0
+            ORDER BY 1, 2, 3
+        """).fetchall()
+        expected = conn.execute("""
+            SELECT student_id, session, term, IFNULL(SUM(amount_paid), 0)
+            FROM payments
+            GROUP BY 1, 2, 3
+            HAVING IFNULL(SUM(amount_paid), 0) <> 0
+            ORDER BY 1, 2, 3
+        """).fetchall()
+    finally:
+        conn.close()
+
+    assert [tuple(row) for row in totals] == [tuple(row) for row in expected]
+
+    for student_id, session, term, total_paid in expected:
+        assert models.get_total_paid(student_id, term, session) == total_paid
+
+    assert models.get_total_paid(student_ids[0], "Second Term", "2025") == 0
+    assert models.get_total_paid(student_ids[1], "Second Term", "2025") == 0
@@ -0,0 +1,162 @@
+import sqlite3
+
+import database
+import migrations
+import models
+
+
+SESSIONS = ["2024", "2025", "2026"]
+
+STUDENTS = [
+    ("s1", "Primary", "1"),
+    ("s2", "Primary", "5"),
+    ("s3", "Primary", None),
+    ("s4", "Nursery", "1"),
+    ("s5", "Secondary", "6"),
+]
+
+# As the app wrote them before the fee matrix: classes that were never
+# read, NULLs, and two rows for one (section, term, session).
+FEES = [
+    ("Nursery", "1", "1st", "2025", 20000),
+    ("Primary", "1", "1st", "2025", 25000),
+    ("Primary", "", "3rd", "2025", 3999),
+    ("Primary", "5", "3rd", "2025", 30000),
+    ("Primary", "5", "3rd", "2026", 24000),
+    ("Primary", "6", "1st", "2026", 39000),
+    ("Primary", None, "2nd", "2025", 40000),
+    ("Nursery", None, "2nd", "2025", 30000),
+    ("Secondary", " 6 ", "1st", "2024", 50000),
+]
+
+PAYMENTS = [
+    ("p1", "s1", "1st", "2025", 10000),
+    ("p2", "s2", "3rd", "2025", 33999),
+    ("p3", "s2", "1st", "2026", 500),
+    ("p4", "s3", "2nd", "2025", 45000),
+    ("p5", "s4", "1st", "2025", 20000),
+    ("p6", "s5", "1st", "2024", 1000),
+]
+
+
+def _legacy_db(path):
+    conn = sqlite3.connect(path)
+
+    for statement in database.BASE_SCHEMA:
+        conn.execute(statement)
+
+    conn.executemany(
+        "INSERT INTO students (student_id, section, class) VALUES (?, ?, ?)", STUDENTS
+    )
+    conn.executemany(
+        "INSERT INTO fees (section, class, term, session, total_fee) VALUES (?, ?, ?, ?, ?)",
+        FEES,
+    )
+    conn.executemany(
+        "INSERT INTO payments (payment_id, student_id, term, session, amount_paid)"
+        " VALUES (?, ?, ?, ?, ?)",
+        PAYMENTS,
+    )
+    conn.commit()
+    return conn
+
+
+def _expected_outstanding(conn, student_id, current_session):
+    # get_previous_outstanding as it was, except that a (section, term,
+    # session) with several fee rows bills only the latest one: the
+    # others were re-saves. Classes are ignored, as they always were.
+    section = conn.execute(
+        "SELECT section FROM students WHERE student_id = ?", (student_id,)
+    ).fetchone()[0]
+    sessions = conn.execute(
+        "SELECT DISTINCT session FROM fees WHERE session != ?", (current_session,)
+    ).fetchall()
+
+    total = 0
+
+    for (session,) in sessions:
+        fee = conn.execute("""
+            SELECT SUM(total_fee) FROM fees
+            WHERE id IN (
+                SELECT MAX(id) FROM fees
+                WHERE section = ? AND session = ?
+                GROUP BY term
+            )
+        """, (section, session)).fetchone()[0] or 0
+        paid = conn.execute(
+            "SELECT SUM(amount_paid) FROM payments WHERE student_id = ? AND session = ?",
+            (student_id, session),
+        ).fetchone()[0] or 0
+        total += max(fee - paid, 0)
+
+    return total
+
+
+def _outstanding():
+    return {
+        (student_id, session): models.get_previous_outstanding(student_id, session)
+        for student_id, _, _ in STUDENTS
+        for session in SESSIONS
+    }
+
+
+def test_migration_bills_the_latest_fee_per_term(db_path):
+    conn = _legacy_db(db_path)
+    expected = {
+        (student_id, session): _expected_outstanding(conn, student_id, session)
+        for student_id, _, _ in STUDENTS
+        for session in SESSIONS
+    }
+    conn.close()
+
+    database.create_tables()
+
+    assert _outstanding() == expected
+
+
+def test_databases_that_ran_migration_6_end_up_the_same(db_path, tmp_path, monkeypatch):
+    fresh = str(tmp_path / "fresh.db")
+    _legacy_db(fresh).close()
+    monkeypatch.setattr(database, "DB_NAME", fresh)
+    expected = _outstanding()
+    database.close_all_connections()
+
+    # Upgraded before migration 7 existed: classes kept as overrides.
+    conn = _legacy_db(db_path)
+    migrations.migrate_sqlite(conn, database.SQLITE_MIGRATIONS[:6])
+    conn.close()
+    monkeypatch.setattr(database, "DB_NAME", db_path)
+
+    assert _outstanding() == expected
+
+
+def test_migration_makes_legacy_fees_section_fees(db_path):
+    _legacy_db(db_path).close()
+    database.create_tables()
+
+    conn = database.get_connection()
+    try:
+        classes = {row[0] for row in conn.execute("SELECT class FROM fees")}
+    finally:
+        conn.close()
+
+    assert classes == {""}
+
+    # A class no fee row ever named is billed its section's fee.
+    assert models.get_current_fee("Primary", "1st", "2025", "3") == 25000
+    assert models.get_current_fee("Nursery", "1st", "2025") == 20000
+    assert models.get_current_fee("Secondary", "1st", "2024", "2") == 50000
+
+    # Of the rows sharing a key, the latest is kept.
+    assert models.get_current_fee("Primary", "3rd", "2025", "5") == 30000
+    assert models.get_current_fee("Primary", "3rd", "2025") == 30000
+
+
+def test_class_fee_set_after_migration_overrides_section(db_path):
+    _legacy_db(db_path).close()
+    database.create_tables()
+
+    models.set_fee("Primary", "1st", "2025", 27000, student_class="1")
+
+    assert models.get_current_fee("Primary", "1st", "2025", "1") == 27000
+    assert models.get_current_fee("Primary", "1st", "2025", "5") == 25000
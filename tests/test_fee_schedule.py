@@ -0,0 +1,84 @@
+import sqlite3
+
+import fee_schedule
+import models
+from fee_schedule import ALL_CLASSES, FeeSchedule
+
+
+def _matrix(session):
+    return [tuple(row) for row in models.get_fee_matrix(session)]
+
+
+def test_set_fee_is_seen_at_once(db_path):
+    models.set_fee("Primary", "1st", "2025", 20000)
+    assert models.get_current_fee("Primary", "1st", "2025") == 20000
+
+    loads = models.fee_schedule().loads
+    assert models.get_current_fee("Primary", "1st", "2025", "3") == 20000
+    assert models.fee_schedule().loads == loads
+
+    models.set_fee("Primary", "1st", "2025", 26000, student_class="3")
+
+    assert models.get_current_fee("Primary", "1st", "2025", "3") == 26000
+    assert models.get_current_fee("Primary", "1st", "2025", "4") == 20000
+    assert models.get_current_fee("Primary", "1st", "2025") == 20000
+
+    models.set_fee("Primary", "1st", "2025", 21000)
+
+    assert models.get_current_fee("Primary", "1st", "2025", "3") == 26000
+    assert models.get_current_fee("Primary", "1st", "2025", "4") == 21000
+
+
+def test_save_fee_matrix_is_seen_at_once(db_path):
+    models.set_fee("Primary", "1st", "2025", 20000)
+    models.set_fee("Primary", "1st", "2025", 26000, student_class="3")
+    assert models.get_current_fee("Primary", "1st", "2025", "3") == 26000
+
+    # Dropping the class row leaves the class on its section's fee.
+    models.save_fee_matrix("2025", [
+        (section, student_class, term, 22000)
+        for section, student_class, term, _ in _matrix("2025")
+        if student_class == ALL_CLASSES
+    ])
+
+    assert models.get_current_fee("Primary", "1st", "2025", "3") == 22000
+    assert models.get_current_fee("Primary", "1st", "2025") == 22000
+
+
+def test_other_writers_are_seen_after_max_age(db_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(fee_schedule.time, "monotonic", lambda: now[0])
+
+    models.set_fee("Primary", "1st", "2025", 20000)
+    assert models.get_current_fee("Primary", "1st", "2025", "3") == 20000
+
+    # Another process writes straight to the file.
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO fees (section, class, term, session, total_fee)"
+        " VALUES ('Primary', '3', '1st', '2025', 30000)"
+    )
+    conn.commit()
+    conn.close()
+
+    now[0] += fee_schedule.FEE_SCHEDULE_MAX_AGE - 1
+    assert models.get_current_fee("Primary", "1st", "2025", "3") == 20000
+
+    now[0] += 2
+    assert models.get_current_fee("Primary", "1st", "2025", "3") == 30000
+
+
+def test_invalidate_during_a_load_is_not_lost():
+    rows = [("Primary", "", "1st", "2025", 20000)]
+
+    def load():
+        result = list(rows)
+        # A write commits and invalidates while this load is running.
+        rows[0] = ("Primary", "", "1st", "2025", 25000)
+        schedule.invalidate()
+        return result
+
+    schedule = FeeSchedule(load)
+
+    assert schedule.get("Primary", "1st", "2025") == 20000
+    assert schedule.get("Primary", "1st", "2025") == 25000
@@ -0,0 +1,51 @@
+import io
+
+import importer
+
+
+def _prepare(row):
+    if not row["full_name"].strip():
+        raise importer.RowError("Full name is required")
+    return row["full_name"]
+
+
+def test_csv_errors_report_file_line_numbers():
+    data = (
+        "Full Name,Section\r\n"
+        "Ada,Primary\r\n"
+        "\r\n"
+        ",,\r\n"
+        "\"Bola\nAde\",Primary\r\n"
+        ",Secondary\r\n"
+    ).encode()
+    inserted = []
+
+    report = importer.import_rows(
+        importer.read_rows(io.BytesIO(data), "students.csv"),
+        _prepare,
+        inserted.extend,
+    )
+
+    assert inserted == ["Ada", "Bola\nAde"]
+    assert report["rows"] == 3
+    assert report["errors"] == [{"row": 7, "error": "Full name is required"}]
+
+
+def test_xlsx_rows_carry_sheet_row_numbers():
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Full Name", "Section"])
+    sheet.append(["Ada", "Primary"])
+    sheet.append([])
+    sheet.append([None, "Secondary"])
+
+    file = io.BytesIO()
+    workbook.save(file)
+    file.seek(0)
+
+    rows = list(importer.read_rows(file, "students.xlsx"))
+
+    assert [line for line, _ in rows] == [2, 4]
+    assert rows[1][1] == {"full_name": "", "section": "Secondary"}
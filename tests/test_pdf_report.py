@@ -0,0 +1,26 @@
+import io
+import zipfile
+
+import pdf_report
+
+
+def test_zip_entries_are_unique_per_student():
+    statements = [
+        {"student_name": "Ada Obi", "student_id": "S1"},
+        {"student_name": "Ada Obi", "student_id": "S2"},
+        {"student_name": "Ada Obi"},
+        {"student_name": None, "student_id": None},
+        {"student_name": "", "student_id": None},
+        {"student_name": "Ada Obi", "student_id": "S1"},
+    ]
+    pdfs = [f"pdf {n}".encode() for n in range(len(statements))]
+
+    archive = zipfile.ZipFile(io.BytesIO(
+        pdf_report._zip_statements(statements, pdfs)
+    ))
+
+    names = archive.namelist()
+
+    assert len(set(names)) == len(statements)
+    assert names[:2] == ["Ada_Obi_S1_statement.pdf", "Ada_Obi_S2_statement.pdf"]
+    assert [archive.read(name) for name in names] == pdfs
@@ -0,0 +1,29 @@
+import database
+import models
+from benchmarks import plan_checks
+
+
+def test_sqlite_hot_queries_use_their_indexes(db_path):
+    # A small school; pending migrations run on the first connection.
+    for n in range(40):
+        student_id = models.add_student(
+            f"First{n}", f"Last{n}", "Female", ("Primary", "Secondary")[n % 2],
+            str(n % 6 + 1), "080", "2025-09-01", "Active"
+        )
+
+        for term in ("1st", "2nd"):
+            models.add_payment(student_id, term, "2025", 1000 + n, "2025-10-01")
+
+    for section in ("Primary", "Secondary"):
+        for term in ("1st", "2nd", "3rd"):
+            models.set_fee(section, term, "2025", 20000)
+            models.set_fee(section, term, "2025", 25000, "3")
+
+    conn = database.get_connection()
+
+    try:
+        failures = plan_checks.check_sqlite(conn)
+    finally:
+        conn.close()
+
+    assert failures == {}
@@ -0,0 +1,149 @@
+import random
+
+import pytest
+
+import database
+import models
+
+
+SECTIONS = ["Nursery", "Primary", "Secondary", "Creche"]
+CLASSES = ["1", "2", "3", None]
+TERMS = ["First Term", "Second Term", "Third Term"]
+SESSIONS = ["2023", "2024", "2025", "2026"]
+
+
+def _random_school(rng):
+    students = [
+        (f"s{i}", rng.choice(SECTIONS + [None]), rng.choice(CLASSES))
+        for i in range(rng.randint(1, 60))
+    ]
+
+    # Creche never has fees, and a section may have only class fees for
+    # a term, only its own fee, both or neither.
+    fees = []
+    for section in SECTIONS[:3]:
+        for session in SESSIONS:
+            for term in TERMS:
+                for student_class in ["", "1", "2", "3"]:
+                    if rng.random() < 0.4:
+                        fees.append((
+                            section, student_class, term, session,
+                            rng.choice([None, 0, rng.randint(1, 100) * 500]),
+                        ))
+
+    payments = [
+        (
+            f"p{i}",
+            rng.choice(students)[0],
+            rng.choice(TERMS + [None]),
+            rng.choice(SESSIONS + ["2019", None]),
+            rng.randint(0, 80) * 500,
+        )
+        for i in range(rng.randint(0, 300))
+    ]
+
+    return students, fees, payments
+
+
+def _load(students, fees, payments):
+    conn = database.get_connection()
+
+    try:
+        conn.executemany(
+            "INSERT INTO students (student_id, section, class) VALUES (?, ?, ?)", students
+        )
+        conn.executemany(
+            "INSERT INTO fees (section, class, term, session, total_fee)"
+            " VALUES (?, ?, ?, ?, ?)",
+            fees,
+        )
+        conn.executemany(
+            "INSERT INTO payments (payment_id, student_id, term, session, amount_paid)"
+            " VALUES (?, ?, ?, ?, ?)",
+            payments,
+        )
+        conn.commit()
+
+    finally:
+        conn.close()
+
+
+def _loop_outstanding(students, fees, payments, student_id, current_session):
+    # The per-session loop get_previous_outstanding used to run, with each
+    # term billed at the class's fee if there is one, else the section's.
+    section, student_class = next((s[1], s[2] or "") for s in students if s[0] == student_id)
+    fee_at = {(f[0], f[1], f[2], f[3]): f[4] for f in fees}
+
+    total = 0
+
+    for session in {f[3] for f in fees if f[3] != current_session}:
+        billed = False
+        fee = 0
+
+        for term in TERMS:
+            for key in ((section, student_class, term, session), (section, "", term, session)):
+                if key in fee_at:
+                    billed = True
+                    fee += fee_at[key] or 0
+                    break
+
+        if not billed:
+            continue
+
+        paid = sum(
+            p[4] for p in payments if p[1] == student_id and p[3] == session
+        )
+        total += max(fee - paid, 0)
+
+    return total
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_matches_per_session_loop(db_path, seed, monkeypatch):
+    rng = random.Random(seed)
+    students, fees, payments = _random_school(rng)
+    _load(students, fees, payments)
+
+    # Small chunks, so one call spans several statements.
+    monkeypatch.setattr(models, "ID_CHUNK_SIZE", 7)
+
+    for current_session in SESSIONS + ["2030"]:
+        student_ids = [s[0] for s in students] + ["missing"]
+        outstanding = models.get_previous_outstanding_bulk(student_ids, current_session)
+
+        assert outstanding.pop("missing") == 0
+        assert outstanding == {
+            s[0]: pytest.approx(_loop_outstanding(students, fees, payments, s[0], current_session))
+            for s in students
+        }
+
+
+def test_class_fee_replaces_section_fee(db_path):
+    _load(
+        [("a", "Primary", "1"), ("b", "Primary", "2"), ("c", "Primary", None)],
+        [
+            ("Primary", "", "First Term", "2024", 1000),
+            ("Primary", "1", "First Term", "2024", 3000),
+            ("Primary", "2", "Second Term", "2024", 500),
+        ],
+        [("p1", "b", "First Term", "2024", 200)],
+    )
+
+    assert models.get_previous_outstanding("a", "2025") == 3000
+    assert models.get_previous_outstanding("b", "2025") == 1300
+    assert models.get_previous_outstanding("c", "2025") == 1000
+
+
+def test_sessions_without_fees_are_not_owed(db_path):
+    _load(
+        [("a", "Primary", "1"), ("b", "Creche", None)],
+        [("Primary", "", "First Term", "2024", 1000)],
+        [
+            ("p1", "a", "First Term", "2023", 5000),
+            ("p2", "b", "First Term", "2024", 100),
+        ],
+    )
+
+    assert models.get_previous_outstanding("a", "2025") == 1000
+    assert models.get_previous_outstanding("b", "2025") == 0
+    assert models.get_previous_outstanding("a", "2024") == 0
@@ -0,0 +1,160 @@
+import os
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import promotion
+
+
+# Promotion runs on Postgres only; these tests need a server to run on.
+DATABASE_URL = os.environ.get("DATABASE_URL")
+
+needs_postgres = pytest.mark.skipif(
+    not DATABASE_URL, reason="set DATABASE_URL to a Postgres database"
+)
+
+STUDENTS = [
+    ("s1", "Ada Obi", "Primary 1", "Primary", "2025", 5000),
+    ("s2", "Bola Ade", "primary 1 ", "Primary", "2025", 0),
+    ("s3", "Chidi Eze", "Primary 6", "Primary", "2025", 1200),
+    ("s4", "Dayo Ola", "SS3", "Secondary", "2025", 800),
+    ("s5", "Emeka Nwosu", "Creche", "Nursery", "2025", 0),
+]
+
+
+def test_progression_rows_keep_one_mapping_per_class():
+    rows = promotion.progression_rows([
+        ("Primary 1", "Primary 2", "Primary"),
+        ("JSS3", "SS1", "Secondary"),
+        ("primary 1 ", "Primary 3", " Primary "),
+        ("", "Nowhere", None),
+        (None, "Nowhere", None),
+        ("SS3", None, None),
+    ])
+
+    assert rows == [
+        {"student_class": "primary 1", "next_class": "Primary 3", "next_section": "Primary"},
+        {"student_class": "JSS3", "next_class": "SS1", "next_section": "Secondary"},
+        {"student_class": "SS3", "next_class": None, "next_section": None},
+    ]
+
+
+@pytest.fixture
+def engine():
+    # A schema of its own, dropped afterwards, holding just the tables
+    # promotion reads and writes.
+    schema = f"test_promotion_{uuid.uuid4().hex[:8]}"
+    admin = create_engine(DATABASE_URL)
+
+    with admin.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+
+    engine = create_engine(
+        DATABASE_URL, connect_args={"options": f"-csearch_path={schema}"}
+    )
+
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE students (
+                id SERIAL PRIMARY KEY,
+                student_id TEXT,
+                full_name TEXT,
+                student_class TEXT,
+                section TEXT,
+                session TEXT
+            )
+        """))
+        conn.execute(text("""
+            CREATE TABLE student_balances (
+                student_id TEXT PRIMARY KEY,
+                student_name TEXT,
+                balance DOUBLE PRECISION NOT NULL DEFAULT 0
+            )
+        """))
+
+        for statement in promotion.PROMOTION_SCHEMA:
+            conn.execute(text(statement))
+        promotion.seed_progression(conn)
+
+        conn.execute(text("""
+            INSERT INTO students (student_id, full_name, student_class, section, session)
+            VALUES (:id, :name, :class, :section, :session)
+        """), [
+            {"id": i, "name": n, "class": c, "section": sec, "session": ses}
+            for i, n, c, sec, ses, _ in STUDENTS
+        ])
+        conn.execute(text("""
+            INSERT INTO student_balances (student_id, student_name, balance)
+            VALUES (:id, :name, :balance)
+        """), [{"id": i, "name": n, "balance": b} for i, n, _, _, _, b in STUDENTS])
+
+    yield engine
+
+    engine.dispose()
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+    admin.dispose()
+
+
+def _students(engine):
+    with engine.begin() as conn:
+        return {
+            row.student_id: (row.student_class, row.section, row.session, row.status)
+            for row in conn.execute(text("SELECT * FROM students"))
+        }
+
+
+@needs_postgres
+def test_dry_run_changes_nothing(engine):
+    before = _students(engine)
+
+    summary = promotion.promote_students(engine, "2026", dry_run=True)
+
+    assert (summary["promoted"], summary["graduated"], summary["unmapped"]) == (3, 1, 1)
+    assert _students(engine) == before
+
+
+@needs_postgres
+def test_promotion_moves_students_and_graduates_the_last_class(engine):
+    summary = promotion.promote_students(engine, " 2026 ")
+
+    assert (summary["promoted"], summary["graduated"], summary["unmapped"]) == (3, 1, 1)
+    assert summary["carried_forward"] == 7000
+
+    assert _students(engine) == {
+        "s1": ("Primary 2", "Primary", "2026", "Active"),
+        "s2": ("Primary 2", "Primary", "2026", "Active"),
+        "s3": ("JSS1", "Secondary", "2026", "Active"),
+        "s4": ("SS3", "Secondary", "2025", "Graduated"),
+        "s5": ("Creche", "Nursery", "2026", "Active"),
+    }
+
+    with engine.begin() as conn:
+        carried = {
+            row.student_id: (row.from_class, row.to_class, row.balance)
+            for row in conn.execute(text(
+                "SELECT * FROM balance_carry_forward WHERE to_session = '2026'"
+            ))
+        }
+
+    assert carried["s1"] == ("Primary 1", "Primary 2", 5000)
+    assert carried["s4"] == ("SS3", None, 800)
+    assert len(carried) == 5
+
+
+@needs_postgres
+def test_second_promotion_to_the_same_session_is_a_no_op(engine):
+    promotion.promote_students(engine, "2026")
+    after_first = _students(engine)
+
+    summary = promotion.promote_students(engine, "2026")
+
+    assert (summary["promoted"], summary["graduated"], summary["unmapped"]) == (0, 0, 0)
+    assert summary["moves"] == []
+    assert _students(engine) == after_first
+
+
+def test_promotion_needs_a_session():
+    with pytest.raises(ValueError):
+        promotion.promote_students(None, "  ")
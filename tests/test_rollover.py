@@ -0,0 +1,96 @@
+import random
+import uuid
+
+import pytest
+
+import database
+import models
+
+
+class Interrupted(Exception):
+    pass
+
+
+class _StopAfterCommits:
+    # Wraps a pooled connection; its commit() fails once `commits` have
+    # gone through, as if the process died mid-rollover.
+    def __init__(self, conn, commits):
+        self._conn = conn
+        self._commits = commits
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def commit(self):
+        if self._commits == 0:
+            raise Interrupted()
+        self._commits -= 1
+        self._conn.commit()
+
+
+def _add_school(rng, count):
+    for section in ("Primary", "Secondary"):
+        for session in ("2024", "2025"):
+            for term in ("1st", "2nd"):
+                models.set_fee(section, term, session, rng.randrange(1, 5) * 10000)
+
+    for _ in range(count):
+        _add_student(rng, str(uuid.uuid4()))
+
+
+def _add_student(rng, student_id):
+    conn = database.get_connection()
+
+    try:
+        conn.execute(
+            "INSERT INTO students (student_id, first_name, section, class) VALUES (?, ?, ?, ?)",
+            (student_id, "Pupil", rng.choice(["Primary", "Secondary"]), "1")
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    for session in ("2024", "2025"):
+        if rng.random() < 0.7:
+            models.add_payment(
+                student_id, "1st", session, rng.randrange(0, 50) * 1000, f"{session}-10-01"
+            )
+
+
+def test_resumed_rollover_covers_every_student(db_path, monkeypatch):
+    rng = random.Random(3)
+    _add_school(rng, 20)
+
+    get_connection = models.get_connection
+    monkeypatch.setattr(
+        models, "get_connection", lambda: _StopAfterCommits(get_connection(), 2)
+    )
+
+    with pytest.raises(Interrupted):
+        models.rollover_outstanding("2026", chunk_size=3)
+
+    monkeypatch.setattr(models, "get_connection", get_connection)
+
+    # Added between the runs, with ids sorting before and after the rows
+    # the interrupted run wrote.
+    for student_id in ("00000000-early", "ffffffff-late"):
+        _add_student(rng, student_id)
+
+    conn = database.get_connection()
+    try:
+        written = conn.execute(
+            "SELECT COUNT(*) FROM outstanding_balances WHERE session = '2026'"
+        ).fetchone()[0]
+        student_ids = [row[0] for row in conn.execute("SELECT student_id FROM students")]
+    finally:
+        conn.close()
+
+    assert written == 6
+
+    rows = models.rollover_outstanding("2026", chunk_size=3, resume=True)
+
+    expected = models.get_previous_outstanding_bulk(student_ids, "2026")
+
+    assert {row["student_id"]: row["outstanding"] for row in rows} == expected
+    assert len(rows) == 22
+    assert any(amount > 0 for amount in expected.values())
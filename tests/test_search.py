@@ -0,0 +1,72 @@
+import sqlite3
+
+import database
+import models
+
+
+def _found(query):
+    return [row[0] for row in models.search_students(query)]
+
+
+def test_search_follows_insert_rename_and_delete(db_path):
+    student_id = models.add_student(
+        "Adaeze", "Okafor", "Female", "Primary", "3", "0803555", "2025-09-01", "Active"
+    )
+
+    assert _found("adae") == [student_id]
+    assert _found("oka ada") == [student_id]
+
+    conn = database.get_connection()
+
+    try:
+        conn.execute(
+            "UPDATE students SET first_name = 'Ngozi' WHERE student_id = ?", (student_id,)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    assert _found("adae") == []
+    assert _found("ngo") == [student_id]
+
+    models.delete_student(student_id)
+
+    assert _found("ngo") == []
+    assert _found("okafor") == []
+
+
+def test_search_index_waits_for_the_name_columns(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE students (
+            student_id TEXT PRIMARY KEY,
+            gender TEXT,
+            section TEXT,
+            class TEXT,
+            admission_date TEXT,
+            status TEXT
+        )
+    """)
+    conn.execute("INSERT INTO students (student_id, section) VALUES ('s1', 'Primary')")
+    conn.commit()
+    conn.close()
+
+    database.create_tables()
+
+    conn = database.get_connection()
+
+    try:
+        versions = {row[0] for row in conn.execute("SELECT version FROM schema_version")}
+        for column in ("first_name", "last_name", "parent_phone"):
+            conn.execute(f"ALTER TABLE students ADD COLUMN {column} TEXT")
+        conn.execute("UPDATE students SET first_name = 'Chidi' WHERE student_id = 's1'")
+        conn.commit()
+    finally:
+        conn.close()
+
+    assert 4 not in versions
+
+    # The next process to open the file builds the index.
+    database.close_all_connections()
+
+    assert _found("chi") == ["s1"]